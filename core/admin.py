@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Profile, Product, Enquiry, Message, Order, Transaction, AuditLog
+from .models import User, Profile, Product, Enquiry, Message, Order, Transaction, AuditLog, Location
 
 admin.site.register(User)
 admin.site.register(Profile)
@@ -9,3 +9,4 @@ admin.site.register(Message)
 admin.site.register(Order)
 admin.site.register(Transaction)
 admin.site.register(AuditLog)
+admin.site.register(Location)
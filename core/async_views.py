@@ -0,0 +1,158 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from .authentication import ClaimsJWTAuthentication
+from .filters import ProductFilter, MessageFilter, OrderFilter
+from .models import Product, Message, Order
+from .pagination import CreatedAtCursorPagination, TimestampCursorPagination
+from .permissions import IsBuyer, IsSeller, IsTransporter, IsAdmin
+from .realtime import format_event, get_broker, user_channel
+from .serializers import ProductSerializer, MessageSerializer, OrderSerializer, apply_eager_loading, get_row_encoder
+from .views import ProductViewSet, MessageViewSet, OrderViewSet
+
+# Native async views for the read-heavy endpoints. Under ASGI they run on the
+# event loop end to end: claim tokens authenticate without a query (see
+# core.authentication), rows come from the async ORM as .values() dicts and
+# render through the compiled row encoders, so each request holds no thread
+# while it waits on the database or a slow client. Output matches the DRF
+# endpoints byte for byte.
+
+_authentication = ClaimsJWTAuthentication()
+_renderer = JSONRenderer()
+
+
+async def get_request_user(request, query_token=False):
+    """Authenticate the bearer token; only lookups the claims cannot answer run in a thread"""
+    header = _authentication.get_header(request)
+    raw_token = _authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None and query_token:
+        # EventSource cannot send headers, so streams also take ?access_token=
+        raw_token = request.GET.get('access_token', '').encode() or None
+    if raw_token is None:
+        return AnonymousUser()
+    validated = _authentication.get_validated_token(raw_token)
+    user = _authentication.get_cached_claims_user(validated)
+    if user is None:
+        user = await sync_to_async(_authentication.get_user)(validated)
+    return user
+
+
+def async_api_view(permission_class=IsAuthenticated, query_token=False):
+    """GET-only async endpoint with JWT authentication and a DRF permission class"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+            try:
+                user = await get_request_user(request, query_token)
+            except (AuthenticationFailed, InvalidToken, TokenError) as exc:
+                detail = getattr(exc, 'detail', str(exc))
+                return JsonResponse(detail if isinstance(detail, dict) else {'detail': detail}, status=401)
+            request.user = user
+            if not permission_class().has_permission(request, None):
+                if not user.is_authenticated:
+                    return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+                return JsonResponse({'detail': 'You do not have permission to perform this action.'}, status=403)
+            drf_request = Request(request)
+            drf_request.user = user
+            return await view(drf_request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render(data, status=200):
+    return HttpResponse(_renderer.render(data), content_type='application/json', status=status)
+
+async def filter_rows(request, filterset_class, queryset):
+    """Apply a FilterSet; validating model choices can query, so that runs in a thread only when filters are given"""
+    if not any(name in request.query_params for name in filterset_class.base_filters):
+        return queryset, None
+    filterset = filterset_class(request.query_params, queryset=queryset, request=request)
+
+    def apply():
+        return (filterset.qs, None) if filterset.is_valid() else (None, filterset.errors)
+    return await sync_to_async(apply)()
+
+async def list_response(request, serializer_class, queryset, pagination_class, view_class):
+    """One cursor page of rows rendered through the serializer's compiled row encoder.
+
+    view_class is the matching DRF viewset: its filter backends and
+    ordering_fields decide ?ordering=, as on the sync endpoint.
+    """
+    serializer = serializer_class(context={'request': request})
+    paginator = pagination_class()
+    view = view_class()
+    encoder = get_row_encoder(serializer)
+    if encoder is None:
+        # Not compilable (e.g. an unusual ?expand=): fetch instances, serialize in a thread
+        page = await paginator.apaginate_queryset(apply_eager_loading(queryset, serializer), request, view)
+        results = await sync_to_async(lambda: serializer_class(page, many=True, context={'request': request}).data)()
+    else:
+        lookups, encode = encoder
+        ordering = paginator.get_ordering(request, queryset, view)
+        ordering_lookups = [field.lstrip('-') for field in ordering if field.lstrip('-') not in lookups]
+        page = await paginator.apaginate_queryset(queryset.values(*lookups, *ordering_lookups), request, view)
+        results = [encode(row) for row in page]
+    return render({'next': paginator.get_next_link(), 'previous': paginator.get_previous_link(), 'results': results})
+
+
+@async_api_view(AllowAny)
+async def product_list(request):
+    queryset, errors = await filter_rows(request, ProductFilter, Product.objects.all())
+    if errors:
+        return render(errors, status=400)
+    return await list_response(request, ProductSerializer, queryset, CreatedAtCursorPagination, ProductViewSet)
+
+@async_api_view(AllowAny)
+async def product_detail(request, pk):
+    serializer = ProductSerializer(context={'request': request})
+    encoder = get_row_encoder(serializer)
+    try:
+        if encoder is None:
+            product = await apply_eager_loading(Product.objects.all(), serializer).aget(pk=pk)
+            return render(await sync_to_async(lambda: ProductSerializer(product, context={'request': request}).data)())
+        lookups, encode = encoder
+        return render(encode(await Product.objects.values(*lookups).aget(pk=pk)))
+    except Product.DoesNotExist:
+        return render({'detail': 'No Product matches the given query.'}, status=404)
+
+@async_api_view(IsTransporter)
+async def available_jobs(request):
+    queryset, errors = await filter_rows(request, OrderFilter, Order.objects.filter(status='Requested', transporter__isnull=True))
+    if errors:
+        return render(errors, status=400)
+    return await list_response(request, OrderSerializer, queryset, CreatedAtCursorPagination, OrderViewSet)
+
+@async_api_view(IsBuyer | IsSeller | IsAdmin)
+async def message_list(request):
+    queryset, errors = await filter_rows(request, MessageFilter, Message.objects.all())
+    if errors:
+        return render(errors, status=400)
+    return await list_response(request, MessageSerializer, queryset, TimestampCursorPagination, MessageViewSet)
+
+@async_api_view(query_token=True)
+async def event_stream(request):
+    """Server-Sent Events for the user: message.created, enquiry.created, enquiry.updated"""
+    config = getattr(settings, 'REALTIME', {})
+    last_event_id = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('last_event_id')
+    events = get_broker().listen(user_channel(request.user.pk), last_event_id, timeout=config.get('HEARTBEAT', 15))
+
+    async def stream():
+        yield f"retry: {config.get('RETRY_MS', 3000)}\n\n"
+        async for message in events:
+            yield format_event(message)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Nginx would otherwise buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
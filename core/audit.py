@@ -0,0 +1,168 @@
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, connection, transaction
+from django.dispatch import receiver
+
+from .models import AuditLog
+from .utils.audit_utils import apply_audit_rollups
+
+logger = logging.getLogger(__name__)
+
+# Audit entries are captured on the request thread with a queue put and
+# written by one background thread per process with bulk_create, so a
+# mutating request never waits on the audit INSERT. The queue is bounded:
+# when the writer falls behind, producers wait briefly and then write a batch
+# themselves (backpressure instead of dropping entries).
+
+
+def write_audit_entries(entries):
+    """Insert queued entries as AuditLog rows in one bulk_create and count them into the rollups"""
+    with transaction.atomic():
+        logs = AuditLog.objects.bulk_create(
+            [AuditLog(user_id=entry['user_id'], action=entry['action'], details=entry['details']) for entry in entries]
+        )
+        apply_audit_rollups(logs)
+
+
+class AuditQueue:
+    """Bounded in-process queue drained in batches by a daemon writer thread.
+
+    The thread starts with the first entry and atexit drains whatever is
+    still queued, so a clean shutdown loses nothing. With run_async=False
+    entries are written immediately on the caller's thread.
+    """
+    _stop = object()
+
+    def __init__(self, batch_size=500, max_size=10_000, flush_interval=1.0, put_timeout=0.05,
+                 run_async=True, writer=write_audit_entries):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.run_async = run_async
+        self.writer = writer
+        self._queue = queue.Queue(maxsize=max_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+
+    def put(self, entry):
+        if not self.run_async:
+            self._write([entry])
+            return
+        self._ensure_started()
+        try:
+            self._queue.put(entry, timeout=self.put_timeout)
+        except queue.Full:
+            # The writer is behind: this producer pays for one batch
+            self._write(self._drain([]) + [entry])
+
+    def flush(self):
+        """Block until every queued entry is written"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+        else:
+            self._write_queued()
+
+    def stop(self, timeout=5.0):
+        """Write what is queued and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(self._stop)
+            thread.join(timeout)
+        self._write_queued()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            # Also restarts a writer that died, so entries never pile up unwritten
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+                if not self._atexit_registered:
+                    atexit.register(self.stop)
+                    self._atexit_registered = True
+
+    def _drain(self, batch):
+        while len(batch) < self.batch_size:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            if entry is not self._stop:
+                batch.append(entry)
+        return batch
+
+    def _write_queued(self):
+        while not self._queue.empty():
+            self._write(self._drain([]))
+
+    def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                try:
+                    entries = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                while len(entries) < self.batch_size:
+                    try:
+                        entries.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stopping = any(entry is self._stop for entry in entries)
+                try:
+                    close_old_connections()
+                    self._write([entry for entry in entries if entry is not self._stop])
+                except Exception:
+                    logger.exception('Audit writer failed on a batch of %d entries', len(entries))
+                finally:
+                    for _ in entries:
+                        self._queue.task_done()
+        finally:
+            connection.close()
+
+    def _write(self, entries):
+        if not entries:
+            return
+        try:
+            self.writer(entries)
+        except Exception:
+            # Any failure costs this batch only; the writer thread keeps running
+            logger.exception('Failed to write %d audit log entries', len(entries))
+
+
+_audit_queue = None
+
+def get_audit_queue():
+    """The process-wide audit queue configured by settings.AUDIT_LOG"""
+    global _audit_queue
+    if _audit_queue is None:
+        config = getattr(settings, 'AUDIT_LOG', {})
+        _audit_queue = AuditQueue(
+            batch_size=config.get('BATCH_SIZE', 500), max_size=config.get('MAX_QUEUE', 10_000),
+            flush_interval=config.get('FLUSH_INTERVAL', 1.0), run_async=config.get('ASYNC', True),
+        )
+    return _audit_queue
+
+def record_audit(user, action, details):
+    """Queue an audit entry once the current transaction commits (rolled back work is not audited)"""
+    if user is None or not user.is_authenticated:
+        return
+    entry = {'user_id': user.pk, 'action': action[:255], 'details': details}
+    transaction.on_commit(lambda: get_audit_queue().put(entry))
+
+@receiver(setting_changed)
+def reset_audit_queue(setting, **kwargs):
+    global _audit_queue
+    if setting == 'AUDIT_LOG':
+        if _audit_queue is not None:
+            _audit_queue.stop()
+        _audit_queue = None
@@ -0,0 +1,161 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+# Access tokens carry the claims the permission classes read (role,
+# is_verified), so authenticating a request needs no User query. token_version
+# is bumped whenever one of TOKEN_CLAIM_FIELDS changes (core.signals) and
+# published to TOKEN_VERSION_CACHE once that commits; tokens minted before the
+# bump are refused, and every refresh re-reads the claims from the database.
+# Claims are only trusted when that cache is shared by every worker: with a
+# per-process cache (the LocMemCache default) a bump would reach one worker
+# only, so each request loads the user from the database instead.
+# Refresh tokens carry credential_version: a password or activation change
+# bumps it, and refresh tokens minted before that are refused outright.
+
+TOKEN_VERSION_CLAIM = 'ver'
+TOKEN_CLAIM_FIELDS = ('role', 'is_verified', 'is_active', 'password')
+CREDENTIAL_VERSION_CLAIM = 'cred'
+CREDENTIAL_FIELDS = ('is_active', 'password')
+
+
+def _version_cache():
+    return caches[getattr(settings, 'TOKEN_VERSION_CACHE', 'default')]
+
+def token_versions_shared():
+    """Whether published token versions reach every worker (a cross-process cache)"""
+    return not isinstance(_version_cache(), (LocMemCache, DummyCache))
+
+def publish_token_version(user_id, version, replace=True):
+    """Make the user's current token version visible to the authentication class.
+
+    replace=False only fills a missing entry, for versions read outside the
+    transaction that bumped them (a racing bump must not be overwritten).
+    """
+    timeout = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    if replace:
+        _version_cache().set(f'token_version:{user_id}', version, timeout)
+    else:
+        _version_cache().add(f'token_version:{user_id}', version, timeout)
+
+def get_token_version(user_id):
+    """The published token version, or None if this cache has not seen one"""
+    return _version_cache().get(f'token_version:{user_id}')
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token whose access tokens embed role, is_verified and the token version.
+
+    The refresh token itself carries the user's credential version.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[CREDENTIAL_VERSION_CLAIM] = user.credential_version
+        token.set_user_claims(user)
+        publish_token_version(user.pk, user.token_version, replace=False)
+        return token
+
+    def set_user_claims(self, user):
+        self['role'] = user.role
+        self['is_verified'] = user.is_verified
+        self[TOKEN_VERSION_CLAIM] = user.token_version
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that builds request.user from the token claims.
+
+    The user is a User instance with only id, role, is_verified and
+    token_version loaded; other fields are deferred and load on first access.
+    Tokens without the claims (issued before they existed), or any token when
+    the version cache is not shared, fall back to the database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if not self.has_trusted_claims(validated_token):
+            user = super().get_user(validated_token)
+            if TOKEN_VERSION_CLAIM in validated_token and validated_token[TOKEN_VERSION_CLAIM] != user.token_version:
+                raise InvalidToken('Token claims are out of date; refresh the token')
+            return user
+        user_id = self.get_user_id(validated_token)
+        current = get_token_version(user_id)
+        if current is None:
+            # Evicted, or a worker that never saw it: the database has the answer
+            current = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values_list('token_version', flat=True).first()
+            if current is None:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+            publish_token_version(user_id, current, replace=False)
+        return self.get_claims_user(validated_token, current)
+
+    def get_cached_claims_user(self, validated_token):
+        """The claims user when no query is needed (trusted claims, version cached), else None"""
+        if not self.has_trusted_claims(validated_token):
+            return None
+        current = get_token_version(self.get_user_id(validated_token))
+        return None if current is None else self.get_claims_user(validated_token, current)
+
+    def has_trusted_claims(self, validated_token):
+        return 'role' in validated_token and TOKEN_VERSION_CLAIM in validated_token and token_versions_shared()
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+    def get_claims_user(self, validated_token, current_version):
+        if current_version != validated_token[TOKEN_VERSION_CLAIM]:
+            raise InvalidToken('Token claims are out of date; refresh the token')
+        loaded = {
+            api_settings.USER_ID_FIELD: User._meta.get_field(api_settings.USER_ID_FIELD).to_python(self.get_user_id(validated_token)),
+            'role': validated_token['role'], 'is_verified': validated_token['is_verified'],
+            'is_active': True, 'token_version': validated_token[TOKEN_VERSION_CLAIM],
+        }
+        # from_db takes the loaded values in concrete field order
+        field_names = [field.attname for field in User._meta.concrete_fields if field.attname in loaded]
+        return User.from_db(router.db_for_read(User), field_names, [loaded[name] for name in field_names])
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh that re-reads the claims, so a role change reaches the next access token.
+
+    Refresh tokens minted before a password or activation change are refused
+    (tokens without the claim count as version 0).
+    """
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first() if user_id else None
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        if refresh.payload.get(CREDENTIAL_VERSION_CLAIM, 0) != user.credential_version:
+            raise InvalidToken('Token was issued before a password or activation change')
+        refresh.set_user_claims(user)
+        publish_token_version(user.pk, user.token_version)
+
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # Blacklist app not installed
+                    pass
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+        return data
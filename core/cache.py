@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import CacheVersion
+
+# Cached responses are keyed under a namespace version. Writes bump the
+# version instead of deleting keys, so a bump atomically orphans every entry
+# of the namespace; orphans age out through LRU eviction or TTL.
+
+CATALOG_NAMESPACE = 'catalog'
+# Versions without cached entries: they only feed the ETags of these endpoints
+PROFILES_NAMESPACE = 'profiles'
+ROUTES_NAMESPACE = 'routes'
+
+
+class LocalLRUCache:
+    """Per-process LRU with a TTL per entry.
+
+    The version counter lives in the database (one indexed lookup per
+    request) so a write in any worker invalidates every worker's entries.
+    """
+
+    def __init__(self, max_entries=512, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_version(self, namespace):
+        return CacheVersion.objects.filter(name=namespace).values_list('version', flat=True).first() or 0
+
+    def bump_version(self, namespace):
+        rows = CacheVersion.objects.filter(name=namespace)
+        if rows.update(version=F('version') + 1):
+            return
+        try:
+            with transaction.atomic():
+                CacheVersion.objects.create(name=namespace, version=1)
+        except IntegrityError:
+            # Another writer created the row first
+            rows.update(version=F('version') + 1)
+
+
+class DjangoCacheBackend:
+    """Entries and version in a shared Django cache (Redis, Memcached).
+
+    Every worker reads the same version key, so cache hits need no database
+    query at all.
+    """
+
+    def __init__(self, alias='default', ttl=300):
+        self.alias = alias
+        self.ttl = ttl
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.ttl)
+
+    def get_version(self, namespace):
+        # A missing (never set or evicted) version restarts from the clock so
+        # it cannot collide with versions that older entries were stored under
+        key = f'{namespace}:version'
+        self.cache.add(key, time.time_ns(), None)
+        return self.cache.get(key)
+
+    def bump_version(self, namespace):
+        key = f'{namespace}:version'
+        self.cache.add(key, time.time_ns(), None)
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            # Evicted between add and incr
+            self.cache.set(key, time.time_ns(), None)
+
+
+_catalog_cache = None
+
+def get_catalog_cache():
+    """The response cache backend configured by settings.CATALOG_CACHE"""
+    global _catalog_cache
+    if _catalog_cache is None:
+        config = getattr(settings, 'CATALOG_CACHE', {})
+        backend = import_string(config.get('BACKEND', 'core.cache.LocalLRUCache'))
+        _catalog_cache = backend(**config.get('OPTIONS', {}))
+    return _catalog_cache
+
+def bump_version(namespace):
+    """Invalidate every cached response and ETag of the namespace"""
+    get_catalog_cache().bump_version(namespace)
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response"""
+    bump_version(CATALOG_NAMESPACE)
+
+@receiver(setting_changed)
+def reset_catalog_cache(setting, **kwargs):
+    global _catalog_cache
+    if setting == 'CATALOG_CACHE':
+        _catalog_cache = None
@@ -0,0 +1,92 @@
+import django_filters
+from django.db.models import Q
+
+from .models import Product, Enquiry, Message, Order
+from .utils.location_utils import get_matching_locations
+from .utils.search_utils import search_ids
+
+# FilterSets mirror the lookups in core/utils so list pages can filter in SQL
+# instead of downloading whole tables and filtering in the browser. ?q= matches
+# the entity's full-text search documents (every term, as a prefix).
+
+
+class SearchFilterSet(django_filters.FilterSet):
+    q = django_filters.CharFilter(method='filter_search')
+    search_entity = None
+
+    def filter_search(self, queryset, name, value):
+        return queryset.filter(pk__in=search_ids(self.search_entity, value))
+
+
+class ProductFilter(SearchFilterSet):
+    search_entity = 'product'
+    min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+    min_quantity = django_filters.NumberFilter(field_name='quantity', lookup_expr='gte')
+    max_quantity = django_filters.NumberFilter(field_name='quantity', lookup_expr='lte')
+    location = django_filters.CharFilter(method='filter_location')
+    unit = django_filters.CharFilter(field_name='unit_of_measure')
+    min_rating = django_filters.NumberFilter(field_name='seller__profile__rating', lookup_expr='gte')
+    available = django_filters.BooleanFilter(method='filter_available')
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lte')
+
+    class Meta:
+        model = Product
+        fields = ['commodity_type', 'seller']
+
+    def filter_available(self, queryset, name, value):
+        return queryset.filter(quantity__gt=0) if value else queryset.filter(quantity__lte=0)
+
+    def filter_location(self, queryset, name, value):
+        return queryset.filter(pickup_place__in=get_matching_locations(value))
+
+
+class EnquiryFilter(SearchFilterSet):
+    search_entity = 'enquiry'
+    seller = django_filters.NumberFilter(field_name='product__seller_id')
+    min_price = django_filters.NumberFilter(field_name='offered_price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='offered_price', lookup_expr='lte')
+    min_quantity = django_filters.NumberFilter(field_name='quantity', lookup_expr='gte')
+    max_quantity = django_filters.NumberFilter(field_name='quantity', lookup_expr='lte')
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lte')
+
+    class Meta:
+        model = Enquiry
+        fields = ['status', 'buyer', 'product']
+
+
+class OrderFilter(SearchFilterSet):
+    search_entity = 'order'
+    buyer = django_filters.NumberFilter(field_name='enquiry__buyer_id')
+    seller = django_filters.NumberFilter(field_name='enquiry__product__seller_id')
+    available = django_filters.BooleanFilter(method='filter_available')
+    created_after = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.IsoDateTimeFilter(field_name='created_at', lookup_expr='lte')
+
+    class Meta:
+        model = Order
+        fields = ['status', 'transporter', 'enquiry']
+
+    def filter_available(self, queryset, name, value):
+        available = Q(status='Requested', transporter__isnull=True)
+        return queryset.filter(available) if value else queryset.exclude(available)
+
+
+class MessageFilter(SearchFilterSet):
+    search_entity = 'message'
+    user = django_filters.NumberFilter(method='filter_user')
+    sent_after = django_filters.IsoDateTimeFilter(field_name='timestamp', lookup_expr='gte')
+    sent_before = django_filters.IsoDateTimeFilter(field_name='timestamp', lookup_expr='lte')
+
+    class Meta:
+        model = Message
+        fields = ['enquiry', 'sender']
+
+    def filter_user(self, queryset, name, value):
+        return queryset.filter(
+            Q(sender_id=value) |
+            Q(enquiry__buyer_id=value) |
+            Q(enquiry__product__seller_id=value)
+        )
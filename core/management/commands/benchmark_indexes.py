@@ -0,0 +1,199 @@
+import random
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.models import User, Product, Enquiry, Message, Order, AuditLog, Route
+
+BENCH_EMAIL_DOMAIN = 'bench.tivra.local'
+
+# Indexes added in 0004_hot_path_indexes, dropped for the "before" plans
+HOT_PATH_INDEXES = {
+    Order: ['order_status_transporter_idx', 'order_available_jobs_idx'],
+    Enquiry: ['enquiry_product_status_idx', 'enquiry_buyer_created_idx'],
+    Message: ['message_enquiry_timestamp_idx'],
+    Product: ['product_commodity_price_idx'],
+    AuditLog: ['auditlog_user_timestamp_idx'],
+    Route: ['route_origin_dest_idx'],
+}
+
+# Share of --rows seeded into each table
+SEED_RATIOS = {
+    'products': 0.10,
+    'enquiries': 0.20,
+    'messages': 0.25,
+    'orders': 0.20,
+    'audit_logs': 0.20,
+    'routes': 0.05,
+}
+
+COMMODITIES = ['Biomass', 'Briquettes', 'Biodiesel']
+LOCATIONS = [f'Warehouse {i}' for i in range(1, 201)]
+
+
+class Command(BaseCommand):
+    help = 'Seed a large dataset and compare EXPLAIN plans for the hot queries with and without the composite indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Total rows to seed across the hot tables')
+        parser.add_argument('--users', type=int, default=1000, help='Users per role to seed')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--skip-seed', action='store_true', help='Reuse a previously seeded dataset')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the seeded dataset when done')
+        parser.add_argument(
+            '--database', help='Database alias to benchmark; required unless DEBUG is on, since the '
+                               'run drops indexes and seeds rows (point it at a scratch copy)',
+        )
+
+    def handle(self, *args, **options):
+        if options['database'] is None and not settings.DEBUG:
+            raise CommandError(
+                'benchmark_indexes drops the hot-path indexes and bulk-inserts rows; '
+                'pass --database <alias> for a scratch database (or run with DEBUG on)'
+            )
+        self.database = options['database'] or DEFAULT_DB_ALIAS
+        if self.database not in connections:
+            raise CommandError(f'Unknown database alias: {self.database}')
+        self.connection = connections[self.database]
+        self.batch_size = options['batch_size']
+        if not options['skip_seed']:
+            started = time.perf_counter()
+            self.seed(options['rows'], options['users'])
+            self.stdout.write(f'Seeded in {time.perf_counter() - started:.1f}s')
+
+        sample = self.sample_arguments()
+        queries = self.hot_queries(sample)
+
+        self.drop_indexes()
+        try:
+            before = self.explain_all(queries)
+        finally:
+            self.create_indexes()
+        after = self.explain_all(queries)
+
+        for label in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n=== {label} ==='))
+            self.stdout.write(self.style.WARNING('--- before ---'))
+            self.stdout.write(before[label])
+            self.stdout.write(self.style.SUCCESS('--- after ---'))
+            self.stdout.write(after[label])
+
+        if options['cleanup']:
+            self.objects(User).filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').delete()
+            self.stdout.write('Removed seeded dataset')
+
+    def seed(self, rows, users_per_role):
+        counts = {table: max(1, int(rows * ratio)) for table, ratio in SEED_RATIOS.items()}
+        users = {}
+        for role in ['Buyer', 'Seller', 'Transporter']:
+            self.objects(User).bulk_create(
+                (
+                    User(email=f'{role.lower()}{i}@{BENCH_EMAIL_DOMAIN}', username=f'bench-{role.lower()}-{i}', role=role)
+                    for i in range(users_per_role)
+                ),
+                batch_size=self.batch_size, ignore_conflicts=True,
+            )
+            users[role] = list(
+                self.objects(User).filter(role=role, email__endswith=f'@{BENCH_EMAIL_DOMAIN}').values_list('id', flat=True)
+            )
+
+        self.bulk(Product, counts['products'], lambda i: Product(
+            seller_id=random.choice(users['Seller']), commodity_type=random.choice(COMMODITIES),
+            quantity=random.randint(1, 500), price=Decimal(random.randint(1000, 50000)),
+            unit_of_measure='ton', availability_dates='', pickup_location=random.choice(LOCATIONS),
+        ))
+        product_ids = self.seeded_ids(Product, seller__email__endswith=f'@{BENCH_EMAIL_DOMAIN}')
+
+        statuses = [choice for choice, _ in Enquiry.STATUS_CHOICES]
+        self.bulk(Enquiry, counts['enquiries'], lambda i: Enquiry(
+            buyer_id=random.choice(users['Buyer']), product_id=random.choice(product_ids),
+            quantity=random.randint(1, 100), offered_price=Decimal(random.randint(1000, 50000)),
+            status=random.choice(statuses),
+        ))
+        enquiry_ids = self.seeded_ids(Enquiry, buyer__email__endswith=f'@{BENCH_EMAIL_DOMAIN}')
+
+        self.bulk(Message, counts['messages'], lambda i: Message(
+            enquiry_id=random.choice(enquiry_ids), sender_id=random.choice(users['Buyer']), content=f'Bench message {i}',
+        ))
+
+        order_statuses = [choice for choice, _ in Order.STATUS_CHOICES]
+        self.bulk(Order, counts['orders'], lambda i: Order(
+            enquiry_id=random.choice(enquiry_ids), status=random.choice(order_statuses),
+            transporter_id=random.choice(users['Transporter']) if random.random() > 0.1 else None,
+        ))
+
+        self.bulk(AuditLog, counts['audit_logs'], lambda i: AuditLog(
+            user_id=random.choice(users['Buyer'] + users['Seller']), action=random.choice(['create', 'update', 'delete']),
+            details={'bench': i},
+        ))
+
+        self.bulk(Route, counts['routes'], lambda i: Route(
+            transporter_id=random.choice(users['Transporter']),
+            origin=random.choice(LOCATIONS), destination=random.choice(LOCATIONS),
+        ))
+
+    def objects(self, model):
+        return model._default_manager.using(self.database)
+
+    def bulk(self, model, count, build):
+        for start in range(0, count, self.batch_size):
+            self.objects(model).bulk_create([build(i) for i in range(start, min(start + self.batch_size, count))])
+        self.stdout.write(f'  {model.__name__}: {count} rows')
+
+    def seeded_ids(self, model, **lookup):
+        return list(self.objects(model).filter(**lookup).values_list('id', flat=True))
+
+    def sample_arguments(self):
+        order = self.objects(Order).exclude(transporter__isnull=True).order_by('-id').first()
+        enquiry = self.objects(Enquiry).order_by('-id').first()
+        audit_log = self.objects(AuditLog).order_by('-id').first()
+        route = self.objects(Route).order_by('-id').first()
+        return {
+            'transporter_id': order.transporter_id if order else None,
+            'product_id': enquiry.product_id if enquiry else None,
+            'buyer_id': enquiry.buyer_id if enquiry else None,
+            'enquiry_id': enquiry.id if enquiry else None,
+            'audit_user_id': audit_log.user_id if audit_log else None,
+            'origin': route.origin if route else '',
+            'destination': route.destination if route else '',
+        }
+
+    def hot_queries(self, sample):
+        return {
+            'get_available_jobs': self.objects(Order).filter(status='Requested', transporter__isnull=True).order_by('-created_at', '-id')[:50],
+            'orders by status and transporter': self.objects(Order).filter(status='In Transit', transporter_id=sample['transporter_id']),
+            'enquiries by product and status': self.objects(Enquiry).filter(product_id=sample['product_id'], status='Pending'),
+            'enquiries by buyer, newest first': self.objects(Enquiry).filter(buyer_id=sample['buyer_id']).order_by('-created_at')[:50],
+            'conversation messages': self.objects(Message).filter(enquiry_id=sample['enquiry_id']).order_by('timestamp'),
+            'products by commodity and price': self.objects(Product).filter(commodity_type='Biomass', price__range=(10000, 12000)),
+            'audit logs by user, newest first': self.objects(AuditLog).filter(user_id=sample['audit_user_id']).order_by('-timestamp')[:50],
+            'routes by origin and destination': self.objects(Route).filter(origin=sample['origin'], destination=sample['destination']),
+        }
+
+    def explain_all(self, queries):
+        self.analyze()
+        analyze = self.connection.vendor == 'postgresql'
+        return {label: queryset.explain(analyze=analyze) if analyze else queryset.explain() for label, queryset in queries.items()}
+
+    def analyze(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def drop_indexes(self):
+        with self.connection.schema_editor() as schema_editor:
+            for model, index in self.hot_path_indexes():
+                schema_editor.remove_index(model, index)
+
+    def create_indexes(self):
+        with self.connection.schema_editor() as schema_editor:
+            for model, index in self.hot_path_indexes():
+                schema_editor.add_index(model, index)
+
+    def hot_path_indexes(self):
+        for model, names in HOT_PATH_INDEXES.items():
+            for index in model._meta.indexes:
+                if index.name in names:
+                    yield model, index
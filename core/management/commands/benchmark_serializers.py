@@ -0,0 +1,104 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from core.models import User, Product, Enquiry, Order
+from core.serializers import ProductSerializer, OrderSerializer, get_eager_loading, get_row_encoder
+
+BENCH_EMAIL_DOMAIN = 'serializer-bench.tivra.local'
+COMMODITIES = ['Biomass', 'Briquettes', 'Biodiesel']
+
+
+class Command(BaseCommand):
+    help = 'Compare list rendering throughput of the serializers against the compiled .values() row encoders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000, help='Products and orders to seed and render')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per path; the best run is reported')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--cleanup', action='store_true', help='Delete the seeded dataset when done')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        self.seed(rows, options['batch_size'])
+        renderer = JSONRenderer()
+        scope = {
+            Product: {'seller__email__endswith': f'@{BENCH_EMAIL_DOMAIN}'},
+            Order: {'transporter__email__endswith': f'@{BENCH_EMAIL_DOMAIN}'},
+        }
+
+        for serializer_class in (ProductSerializer, OrderSerializer):
+            model = serializer_class.Meta.model
+            queryset = model.objects.filter(**scope[model]).order_by('-created_at', '-id')[:rows]
+            serializer = serializer_class()
+            encoder = get_row_encoder(serializer)
+            if encoder is None:
+                raise CommandError(f'{serializer_class.__name__} cannot be compiled')
+            lookups, encode = encoder
+            select_related, prefetch_related = get_eager_loading(serializer)
+
+            def serializer_path():
+                eager = queryset.select_related(*select_related).prefetch_related(*prefetch_related)
+                return renderer.render(serializer_class(eager, many=True).data)
+
+            def encoder_path():
+                return renderer.render([encode(row) for row in queryset.values(*lookups)])
+
+            slow_output, slow_seconds = self.best_of(serializer_path, options['repeat'])
+            fast_output, fast_seconds = self.best_of(encoder_path, options['repeat'])
+            if slow_output != fast_output:
+                raise CommandError(f'{serializer_class.__name__}: encoder output differs from the serializer')
+
+            count = queryset.count()
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n=== {serializer_class.__name__} ({count} rows, {len(fast_output)} bytes) ==='))
+            self.stdout.write(f'  serializer: {slow_seconds:.3f}s  {count / slow_seconds:,.0f} rows/s')
+            self.stdout.write(f'  encoder:    {fast_seconds:.3f}s  {count / fast_seconds:,.0f} rows/s')
+            self.stdout.write(self.style.SUCCESS(f'  speedup:    {slow_seconds / fast_seconds:.1f}x (identical output)'))
+
+        if options['cleanup']:
+            User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').delete()
+            self.stdout.write('Removed seeded dataset')
+
+    def best_of(self, render, repeat):
+        best, output = None, None
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            output = render()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return output, best
+
+    def seed(self, rows, batch_size):
+        users = {}
+        for role in ['Buyer', 'Seller', 'Transporter']:
+            users[role], _ = User.objects.get_or_create(
+                email=f'{role.lower()}@{BENCH_EMAIL_DOMAIN}',
+                defaults={'username': f'serializer-bench-{role.lower()}', 'role': role},
+            )
+        existing = Order.objects.filter(transporter=users['Transporter']).count()
+        if existing >= rows:
+            return
+
+        # bulk_create skips the save signals (search index, rollups), which this benchmark does not need
+        missing = rows - existing
+        for start in range(0, missing, batch_size):
+            size = min(batch_size, missing - start)
+            products = Product.objects.bulk_create([
+                Product(
+                    seller=users['Seller'], commodity_type=random.choice(COMMODITIES),
+                    quantity=random.randint(1, 500), price=Decimal(random.randint(1000, 50000)),
+                    unit_of_measure='ton', availability_dates='', pickup_location=f'Warehouse {i % 200}',
+                )
+                for i in range(size)
+            ])
+            enquiries = Enquiry.objects.bulk_create([
+                Enquiry(buyer=users['Buyer'], product=product, quantity=5, offered_price=product.price)
+                for product in products
+            ])
+            Order.objects.bulk_create([
+                Order(enquiry=enquiry, transporter=users['Transporter']) for enquiry in enquiries
+            ])
+        self.stdout.write(f'Seeded {missing} products, enquiries and orders')
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import User
+from core.utils.import_utils import IMPORT_CHUNK_SIZE, ImportFormatError, import_products, iter_product_rows
+
+
+class Command(BaseCommand):
+    help = 'Import products for a seller from a CSV (or .xlsx) sheet, streaming it in validated chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or .xlsx file with one product per row')
+        parser.add_argument('--seller', required=True, help='Seller id or email the products are listed under')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing')
+        parser.add_argument('--atomic', action='store_true', help='Import nothing if any row fails')
+
+    def handle(self, *args, **options):
+        lookup = {'pk': options['seller']} if options['seller'].isdigit() else {'email': options['seller']}
+        seller = User.objects.filter(role='Seller', **lookup).first()
+        if seller is None:
+            raise CommandError(f"No seller matches {options['seller']}")
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                report = import_products(
+                    iter_product_rows(fileobj, options['path']), seller, chunk_size=options['chunk_size'],
+                    dry_run=options['dry_run'], atomic=options['atomic'],
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+        except ImportFormatError as e:
+            raise CommandError(str(e))
+
+        for error in report['errors'][:20]:
+            messages = '; '.join(f"{field}: {' '.join(map(str, problems))}" for field, problems in error['errors'].items())
+            self.stderr.write(f"  row {error['row']}: {messages}")
+        if report['errors_truncated'] or len(report['errors']) > 20:
+            self.stderr.write('  ...')
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        count = report['rows'] - report['failed'] if options['dry_run'] else report['created']
+        style = self.style.SUCCESS if not report['failed'] else self.style.WARNING
+        self.stdout.write(style(f"{verb} {count} of {report['rows']} rows ({report['failed']} failed)"))
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils.audit_utils import prune_audit_logs, rebuild_audit_rollups
+
+
+class Command(BaseCommand):
+    help = 'Apply the audit log retention policy: create upcoming monthly partitions and drop expired ones'
+
+    def add_arguments(self, parser):
+        config = getattr(settings, 'AUDIT_LOG', {})
+        parser.add_argument('--retention-months', type=int, default=config.get('RETENTION_MONTHS', 12),
+                            help='Full months of audit log to keep besides the current one')
+        parser.add_argument('--months-ahead', type=int, default=3, help='Monthly partitions to create in advance')
+        parser.add_argument('--rebuild-rollups', action='store_true', help='Recompute the activity rollups from the retained log first')
+
+    def handle(self, *args, **options):
+        if options['retention_months'] < 0 or options['months_ahead'] < 0:
+            raise CommandError('--retention-months and --months-ahead must not be negative')
+        if options['rebuild_rollups']:
+            self.stdout.write(f'Rebuilt audit rollups: {rebuild_audit_rollups()} rows')
+        result = prune_audit_logs(options['retention_months'], options['months_ahead'])
+        for name in result['created']:
+            self.stdout.write(f'  created {name}')
+        for name in result['dropped']:
+            self.stdout.write(f'  dropped {name}')
+        summary = f"Audit log retained from {result['cutoff']}"
+        if result['deleted'] is not None:
+            summary += f" ({result['deleted']} rows deleted)"
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.utils.dashboard_utils import rebuild_dashboard_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the dashboard rollup table from enquiries, orders and transactions'
+
+    def handle(self, *args, **options):
+        written = rebuild_dashboard_rollups()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt dashboard rollups: {written} rows'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils.search_utils import SEARCH_SOURCES, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search documents for products, enquiries, messages, orders and transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('entities', nargs='*', help=f"Entities to reindex: {', '.join(SEARCH_SOURCES)} (default: all)")
+
+    def handle(self, *args, **options):
+        unknown = [entity for entity in options['entities'] if entity not in SEARCH_SOURCES]
+        if unknown:
+            raise CommandError(f"Unknown entities: {', '.join(unknown)}")
+        written = rebuild_search_index(options['entities'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search index: {written} documents'))
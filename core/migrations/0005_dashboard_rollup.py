@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('Buyer', 'Buyer'), ('Seller', 'Seller'), ('Transporter', 'Transporter'), ('Admin', 'Admin')], max_length=20)),
+                ('metric', models.CharField(max_length=50)),
+                ('day', models.DateField(blank=True, null=True)),
+                ('count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('day__isnull', False)), fields=('user', 'role', 'metric', 'day'), name='rollup_daily_unique'), models.UniqueConstraint(condition=models.Q(('day__isnull', True)), fields=('user', 'role', 'metric'), name='rollup_total_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations
+from django.db.models import Case, Value, When
+
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def normalize(name):
+    return ' '.join((name or '').split()).lower()
+
+
+def backfill_locations(apps, schema_editor):
+    Location = apps.get_model('core', 'Location')
+    Product = apps.get_model('core', 'Product')
+    Profile = apps.get_model('core', 'Profile')
+    Route = apps.get_model('core', 'Route')
+    sources = [
+        (Product, 'pickup_location', 'pickup_place'),
+        (Profile, 'location', 'place'),
+        (Route, 'origin', 'origin_place'),
+        (Route, 'destination', 'destination_place'),
+    ]
+
+    source_names = [set(model.objects.values_list(text_field, flat=True).distinct()) for model, text_field, _ in sources]
+    canonical = {}
+    for names in source_names:
+        for name in names:
+            if normalize(name):
+                canonical.setdefault(normalize(name), ' '.join(name.split()))
+    Location.objects.bulk_create(
+        [Location(name=name, normalized_name=normalized) for normalized, name in canonical.items()],
+        ignore_conflicts=True,
+    )
+    location_ids = dict(Location.objects.values_list('normalized_name', 'id'))
+
+    # One UPDATE ... CASE per batch of a source's own distinct names
+    for (model, text_field, fk_field), names in zip(sources, source_names):
+        mapping = [(name, location_ids[normalize(name)]) for name in names if normalize(name) in location_ids]
+        for start in range(0, len(mapping), BACKFILL_BATCH_SIZE):
+            batch = mapping[start:start + BACKFILL_BATCH_SIZE]
+            model.objects.filter(**{f'{text_field}__in': [name for name, _ in batch]}).update(**{
+                f'{fk_field}_id': Case(*[When(**{text_field: name}, then=Value(location_id)) for name, location_id in batch]),
+            })
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS location_name_trgm_idx ON core_location USING gin (normalized_name gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS location_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_location'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_locations, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
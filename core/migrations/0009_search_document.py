@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:04
+
+import re
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# Frozen copy of the document layout in core.utils.search_utils as of this
+# migration, used to index the rows that already exist when it runs.
+
+SEARCH_CONFIG = 'simple'
+SEARCH_CHUNK_SIZE = 1000
+
+SEARCH_SOURCES = {
+    'product': ('Product', ['commodity_type', 'pickup_location'], ['unit_of_measure', 'seller__email', 'seller__username']),
+    'enquiry': ('Enquiry', ['product__commodity_type', 'status'], ['buyer__email', 'product__seller__email', 'product__pickup_location']),
+    'message': ('Message', ['content'], ['sender__email']),
+    'order': ('Order', ['status', 'enquiry__product__commodity_type'], ['enquiry__product__pickup_location', 'enquiry__buyer__email', 'enquiry__product__seller__email', 'transporter__email']),
+    'transaction': ('Transaction', ['invoice_number'], ['order__enquiry__buyer__email', 'order__enquiry__product__seller__email', 'order__transporter__email']),
+}
+
+
+def document_text(values):
+    return ' '.join(token for value in values for token in re.findall(r'\w+', str(value or '').lower()))
+
+
+def backfill_search_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    for entity, (model_name, title_fields, body_fields) in SEARCH_SOURCES.items():
+        rows = apps.get_model('core', model_name).objects.order_by('pk').values_list('pk', *title_fields, *body_fields)
+        chunk = []
+        for row in rows.iterator(chunk_size=SEARCH_CHUNK_SIZE):
+            chunk.append(SearchDocument(
+                entity=entity, object_id=row[0],
+                title=document_text(row[1:1 + len(title_fields)]),
+                body=document_text(row[1 + len(title_fields):]),
+            ))
+            if len(chunk) == SEARCH_CHUNK_SIZE:
+                SearchDocument.objects.bulk_create(chunk)
+                chunk = []
+        SearchDocument.objects.bulk_create(chunk)
+    if schema_editor.connection.vendor == 'postgresql':
+        SearchDocument.objects.update(
+            search_vector=django.contrib.postgres.search.SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+            django.contrib.postgres.search.SearchVector('body', weight='B', config=SEARCH_CONFIG)
+        )
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS searchdoc_vector_gin_idx ON core_searchdocument USING gin (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS searchdoc_vector_gin_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_location_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('product', 'Product'), ('enquiry', 'Enquiry'), ('message', 'Message'), ('order', 'Order'), ('transaction', 'Transaction')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.TextField(blank=True, default='')),
+                ('body', models.TextField(blank=True, default='')),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('entity', 'object_id'), name='searchdoc_entity_object_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, Value, When
+from django.db.models.functions import Left, StrIndex, Substr, Trim, TruncDate
+from django.db.models.lookups import Exact, GreaterThan
+
+
+def audit_action_type_expression(field='action'):
+    # Frozen copy of core.utils.audit_utils.audit_action_type_expression as of
+    # this migration: the first word of the action, 'unknown' when empty
+    trimmed = Trim(field)
+    space = StrIndex(trimmed, Value(' '))
+    return Left(Case(
+        When(Exact(trimmed, Value('')), then=Value('unknown')),
+        When(GreaterThan(space, 0), then=Substr(trimmed, 1, space - 1)),
+        default=trimmed,
+    ), 50)
+
+
+def backfill_audit_rollups(apps, schema_editor):
+    AuditLog = apps.get_model('core', 'AuditLog')
+    AuditActionRollup = apps.get_model('core', 'AuditActionRollup')
+    grouped = AuditLog.objects.annotate(
+        day=TruncDate('timestamp'), action_type=audit_action_type_expression()
+    ).values('user_id', 'day', 'action_type').annotate(total=Count('pk')).order_by()
+    AuditActionRollup.objects.bulk_create(
+        [AuditActionRollup(user_id=row['user_id'], day=row['day'], action_type=row['action_type'], count=row['total']) for row in grouped],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_cache_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditActionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('action_type', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audit_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day', 'action_type'), name='audit_rollup_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_audit_rollups, migrations.RunPython.noop),
+    ]
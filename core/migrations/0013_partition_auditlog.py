@@ -0,0 +1,111 @@
+import datetime
+
+from django.db import migrations
+
+# Frozen copy of the month layout in core.utils.partition_utils as of this
+# migration, so later changes to the helpers cannot change what this
+# migration does on databases that have not applied it yet.
+
+AUDIT_TABLE = 'core_auditlog'
+AUDIT_DEFAULT_PARTITION = f'{AUDIT_TABLE}_default'
+AUDIT_SEQUENCE = f'{AUDIT_TABLE}_id_seq'
+MONTHS_AHEAD = 3
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def create_month_partitions(cursor, first_month, last_month):
+    """Month partitions of the (still empty) partitioned table, so the copy routes rows straight into them"""
+    month = first_month.replace(day=1)
+    while month <= last_month:
+        name = f'{AUDIT_TABLE}_y{month.year:04d}m{month.month:02d}'
+        cursor.execute(
+            f"CREATE TABLE {name} PARTITION OF {AUDIT_TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{add_months(month, 1).isoformat()} 00:00:00+00')"
+        )
+        month = add_months(month, 1)
+
+
+def partition_audit_log(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    legacy = f'{AUDIT_TABLE}_unpartitioned'
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {AUDIT_TABLE} RENAME TO {legacy}')
+        # Frees the identity sequence name; ids are carried over explicitly below
+        cursor.execute(f'ALTER TABLE {legacy} ALTER COLUMN id DROP IDENTITY IF EXISTS')
+        cursor.execute(f'ALTER TABLE {legacy} ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'DROP SEQUENCE IF EXISTS {AUDIT_SEQUENCE}')
+        cursor.execute(
+            f'CREATE TABLE {AUDIT_TABLE} ('
+            f'id bigint NOT NULL, action varchar(255) NOT NULL, "timestamp" timestamp with time zone NOT NULL, '
+            f'details jsonb NOT NULL, user_id bigint NOT NULL, PRIMARY KEY (id, "timestamp")'
+            f') PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(f'CREATE SEQUENCE {AUDIT_SEQUENCE} OWNED BY {AUDIT_TABLE}.id')
+        cursor.execute(f"ALTER TABLE {AUDIT_TABLE} ALTER COLUMN id SET DEFAULT nextval('{AUDIT_SEQUENCE}')")
+        cursor.execute(
+            f'ALTER TABLE {AUDIT_TABLE} ADD CONSTRAINT {AUDIT_TABLE}_user_id_fk_core_user_id '
+            f'FOREIGN KEY (user_id) REFERENCES core_user (id) DEFERRABLE INITIALLY DEFERRED'
+        )
+        cursor.execute(f'CREATE TABLE {AUDIT_DEFAULT_PARTITION} PARTITION OF {AUDIT_TABLE} DEFAULT')
+        cursor.execute(f'SELECT min("timestamp") FROM {legacy}')
+        oldest = cursor.fetchone()[0]
+        today = datetime.date.today()
+        create_month_partitions(cursor, oldest.date() if oldest else today, add_months(today, MONTHS_AHEAD))
+        cursor.execute(
+            f'INSERT INTO {AUDIT_TABLE} (id, action, "timestamp", details, user_id) '
+            f'SELECT id, action, "timestamp", details, user_id FROM {legacy}'
+        )
+        cursor.execute(f'DROP TABLE {legacy}')
+        cursor.execute(f"SELECT setval('{AUDIT_SEQUENCE}', COALESCE((SELECT max(id) FROM {AUDIT_TABLE}), 0) + 1, false)")
+        cursor.execute(f'CREATE INDEX auditlog_timestamp_idx ON {AUDIT_TABLE} ("timestamp" DESC, id DESC)')
+        cursor.execute(f'CREATE INDEX auditlog_user_timestamp_idx ON {AUDIT_TABLE} (user_id, "timestamp" DESC)')
+        cursor.execute(f'CREATE INDEX {AUDIT_TABLE}_user_id_idx ON {AUDIT_TABLE} (user_id)')
+
+
+def unpartition_audit_log(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    partitioned = f'{AUDIT_TABLE}_partitioned'
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {AUDIT_TABLE} RENAME TO {partitioned}')
+        cursor.execute(f'ALTER TABLE {partitioned} ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'DROP SEQUENCE IF EXISTS {AUDIT_SEQUENCE}')
+        for index in ('auditlog_timestamp_idx', 'auditlog_user_timestamp_idx', f'{AUDIT_TABLE}_user_id_idx'):
+            cursor.execute(f'DROP INDEX IF EXISTS {index}')
+        cursor.execute(
+            f'CREATE TABLE {AUDIT_TABLE} ('
+            f'id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY, action varchar(255) NOT NULL, '
+            f'"timestamp" timestamp with time zone NOT NULL, details jsonb NOT NULL, '
+            f'user_id bigint NOT NULL REFERENCES core_user (id) DEFERRABLE INITIALLY DEFERRED)'
+        )
+        cursor.execute(
+            f'INSERT INTO {AUDIT_TABLE} (id, action, "timestamp", details, user_id) '
+            f'SELECT id, action, "timestamp", details, user_id FROM {partitioned}'
+        )
+        cursor.execute(f'DROP TABLE {partitioned}')
+        cursor.execute(f"SELECT setval(pg_get_serial_sequence('{AUDIT_TABLE}', 'id'), COALESCE((SELECT max(id) FROM {AUDIT_TABLE}), 0) + 1, false)")
+        cursor.execute(f'CREATE INDEX auditlog_timestamp_idx ON {AUDIT_TABLE} ("timestamp" DESC, id DESC)')
+        cursor.execute(f'CREATE INDEX auditlog_user_timestamp_idx ON {AUDIT_TABLE} (user_id, "timestamp" DESC)')
+        cursor.execute(f'CREATE INDEX {AUDIT_TABLE}_user_id_idx ON {AUDIT_TABLE} (user_id)')
+
+
+class Migration(migrations.Migration):
+    """Monthly range partitions of core_auditlog on timestamp (PostgreSQL only).
+
+    The model state is unchanged: the primary key becomes (id, timestamp) in
+    the database, which partitioning requires, while ids stay unique through
+    the shared sequence.
+    """
+
+    dependencies = [
+        ('core', '0012_audit_action_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_audit_log, unpartition_audit_log),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def mark_existing_messages_read(apps, schema_editor):
+    # History before read tracking counts as read, so badges start at zero
+    Enquiry = apps.get_model('core', 'Enquiry')
+    EnquiryReadState = apps.get_model('core', 'EnquiryReadState')
+    threads = Enquiry.objects.annotate(last_message_id=Max('messages__id')).filter(last_message_id__isnull=False)
+    states = []
+    for enquiry_id, buyer_id, seller_id, last_message_id in threads.values_list('id', 'buyer_id', 'product__seller_id', 'last_message_id').iterator():
+        for user_id in {buyer_id, seller_id}:
+            states.append(EnquiryReadState(user_id=user_id, enquiry_id=enquiry_id, last_read_id=last_message_id))
+    EnquiryReadState.objects.bulk_create(states, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_user_token_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='unread_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EnquiryReadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_id', models.BigIntegerField(default=0)),
+                ('unread_count', models.IntegerField(default=0)),
+                ('enquiry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to='core.enquiry')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'enquiry'), name='read_state_unique')],
+            },
+        ),
+        migrations.RunPython(mark_existing_messages_read, migrations.RunPython.noop),
+    ]
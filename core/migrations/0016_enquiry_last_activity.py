@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_threads(apps, schema_editor):
+    Enquiry = apps.get_model('core', 'Enquiry')
+    Message = apps.get_model('core', 'Message')
+    EnquiryReadState = apps.get_model('core', 'EnquiryReadState')
+    latest = Message.objects.filter(enquiry_id=OuterRef('pk')).order_by('-id')
+    Enquiry.objects.update(
+        last_message=Subquery(latest.values('id')[:1]),
+        last_activity_at=Coalesce(Subquery(latest.values('timestamp')[:1]), F('created_at')),
+    )
+    # Every participant gets an inbox row; enquiries without messages had none
+    states = []
+    threads = Enquiry.objects.values_list('id', 'buyer_id', 'product__seller_id', 'last_message_id')
+    for enquiry_id, buyer_id, seller_id, last_message_id in threads.iterator():
+        for user_id in {buyer_id, seller_id}:
+            states.append(EnquiryReadState(user_id=user_id, enquiry_id=enquiry_id, last_read_id=last_message_id or 0))
+    EnquiryReadState.objects.bulk_create(states, batch_size=1000, ignore_conflicts=True)
+    EnquiryReadState.objects.update(
+        last_activity_at=Subquery(Enquiry.objects.filter(pk=OuterRef('enquiry_id')).values('last_activity_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_read_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enquiry',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='enquiry',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.message'),
+        ),
+        migrations.AddField(
+            model_name='enquiryreadstate',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='enquiryreadstate',
+            index=models.Index(fields=['user', '-last_activity_at', '-id'], name='read_state_inbox_idx'),
+        ),
+        migrations.RunPython(backfill_threads, migrations.RunPython.noop),
+    ]
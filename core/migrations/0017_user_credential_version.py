@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_enquiry_last_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='credential_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_product_rollups(apps, schema_editor):
+    DashboardRollup = apps.get_model('core', 'DashboardRollup')
+    Product = apps.get_model('core', 'Product')
+    grouped = Product.objects.annotate(day=TruncDate('created_at')).values('seller_id', 'day').annotate(total=Count('pk')).order_by()
+    rows, totals = [], {}
+    for row in grouped:
+        rows.append(DashboardRollup(user_id=row['seller_id'], role='Seller', metric='products', day=row['day'], count=row['total']))
+        totals[row['seller_id']] = totals.get(row['seller_id'], 0) + row['total']
+    rows.extend(
+        DashboardRollup(user_id=seller_id, role='Seller', metric='products', day=None, count=count)
+        for seller_id, count in totals.items()
+    )
+    DashboardRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+def remove_product_rollups(apps, schema_editor):
+    apps.get_model('core', 'DashboardRollup').objects.filter(metric='products').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_user_credential_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_product_rollups, remove_product_rollups),
+    ]
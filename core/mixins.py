@@ -0,0 +1,303 @@
+import datetime
+import hashlib
+
+from django.db import IntegrityError
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .audit import record_audit
+from .cache import CATALOG_NAMESPACE, get_catalog_cache
+from .serializers import BulkCreateListSerializer, apply_eager_loading, get_row_encoder
+from .utils.bulk_utils import bulk_create_records
+from .utils.export_utils import (
+    EXPORT_CHUNK_SIZE, EXPORT_CONTENT_TYPES, batched, csv_lines, export_columns, export_rows, jsonl_lines, parse_export_bound,
+)
+
+
+class AuditMixin:
+    """Record every successful write through the view as an AuditLog entry.
+
+    Entries are queued after the transaction commits and written in batches
+    by the audit writer thread (core.audit), so the request does not pay for
+    the INSERT. Actions read like "create product 12" or "bulk enquiry".
+    """
+    audit_verbs = {'create': 'create', 'update': 'update', 'partial_update': 'update', 'destroy': 'delete'}
+    # Writes that are bookkeeping rather than business actions (read receipts)
+    unaudited_actions = ()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (request.method not in permissions.SAFE_METHODS and 200 <= response.status_code < 300
+                and self.action not in self.unaudited_actions):
+            record_audit(request.user, *self.get_audit_entry(request, response))
+        return response
+
+    def get_audit_entry(self, request, response):
+        data = getattr(response, 'data', None)
+        data = data if isinstance(data, dict) else {}
+        object_id = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, data.get('id'))
+        action = f"{self.audit_verbs.get(self.action, self.action)} {self.basename}"
+        if object_id is not None:
+            action = f'{action} {object_id}'
+        details = {'method': request.method, 'path': request.path, 'status': response.status_code}
+        for key in ('ids', 'created'):
+            if key in data:
+                details[key] = data[key]
+        return action, details
+
+
+class EagerLoadingMixin:
+    """Derive select_related/prefetch_related from the serializer the view renders.
+
+    Nested serializers otherwise fetch each related row lazily, so a list page
+    issues one query per row per relation. Walking the serializer tree keeps
+    every list/retrieve at a constant number of queries.
+    """
+
+    def get_queryset(self):
+        return apply_eager_loading(super().get_queryset(), self.get_serializer())
+
+
+class FastListMixin:
+    """Opt-in list path that renders .values() rows through a compiled row encoder.
+
+    Output matches the serializer byte for byte (see compile_row_encoder); if
+    the serializer cannot be compiled the regular serializer path is used.
+    Set fast_list = False on a view to disable it.
+    """
+    fast_list = True
+
+    def list(self, request, *args, **kwargs):
+        return self.get_list_response(self.filter_queryset(self.get_queryset()))
+
+    def get_list_response(self, queryset):
+        encoder = get_row_encoder(self.get_serializer()) if self.fast_list else None
+        if encoder is None:
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+            return Response(self.get_serializer(queryset, many=True).data)
+
+        lookups, encode = encoder
+        # The paginator reads its cursor position from the ordering columns
+        get_ordering = getattr(self.paginator, 'get_ordering', None)
+        ordering = get_ordering(self.request, queryset, self) if get_ordering else ()
+        ordering_lookups = [field.lstrip('-') for field in ordering if field.lstrip('-') not in lookups]
+        rows = queryset.select_related(None).prefetch_related(None).values(*lookups, *ordering_lookups)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response([encode(row) for row in page])
+        return Response([encode(row) for row in rows])
+
+
+def get_namespace_version(view, namespace):
+    """The namespace's cache version, read once per request"""
+    versions = view.__dict__.setdefault('_namespace_versions', {})
+    if namespace not in versions:
+        versions[namespace] = get_catalog_cache().get_version(namespace)
+    return versions[namespace]
+
+
+class ConditionalGetMixin:
+    """ETag / Last-Modified validators for list and retrieve, computed without serializing.
+
+    The ETag hashes the request path, the user and the version of
+    conditional_namespace, which writes to every table the serializer renders
+    bump (core.signals), so validating costs one indexed lookup (none with a
+    shared cache backend) however large the collection. Retrieve also sends
+    Last-Modified, the newest of conditional_timestamp_fields for that row.
+    A matching If-None-Match or If-Modified-Since is answered with 304 Not
+    Modified. Writes must go through save() to move the validators.
+    """
+    conditional_namespace = None
+    conditional_timestamp_fields = ('updated_at',)
+
+    def get_validators(self, queryset):
+        version = get_namespace_version(self, self.conditional_namespace)
+        key = '|'.join([self.request.get_full_path(), str(self.request.user.pk), str(version)])
+        last_modified = None
+        if self.action == 'retrieve':
+            row = queryset.order_by().values_list(*self.conditional_timestamp_fields).first() or ()
+            last_modified = max((value for value in row if value is not None), default=None)
+        return f'"{hashlib.md5(key.encode()).hexdigest()}"', last_modified
+
+    def conditional_response(self, queryset, render):
+        etag, last_modified = self.get_validators(queryset)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(self.request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render()
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(queryset, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+        return self.conditional_response(queryset, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
+
+
+class CatalogCacheMixin:
+    """Serve list/retrieve from the catalog response cache.
+
+    Keys combine the namespace version, the action and its URL kwargs, the
+    negotiated format and the query parameters normalized for order. Only
+    rendered 200 responses are stored, together with their ETag and
+    Last-Modified, so a hit can also answer If-None-Match with 304. Writes
+    bump the version (core.signals), so stale entries are never read again.
+    Place it before ConditionalGetMixin so hits skip rendering and validators.
+    """
+    cache_namespace = CATALOG_NAMESPACE
+
+    def get_cache_key(self, version):
+        params = sorted((name, sorted(values)) for name, values in self.request.query_params.lists())
+        raw = repr((self.action, sorted(self.kwargs.items()), self.request.accepted_renderer.format, params))
+        return f'{self.cache_namespace}:v{version}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+    def cached_response(self, render):
+        cache = get_catalog_cache()
+        key = self.get_cache_key(get_namespace_version(self, self.cache_namespace))
+        entry = cache.get(key)
+        if entry is None:
+            response = render()
+            if response.status_code != 200:
+                return response
+            response.accepted_renderer = self.request.accepted_renderer
+            response.accepted_media_type = self.request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            headers = {name: response[name] for name in ('ETag', 'Last-Modified') if response.has_header(name)}
+            cache.set(key, (response.content, response['Content-Type'], headers))
+            return response
+
+        content, content_type, headers = entry
+        last_modified = headers.get('Last-Modified')
+        response = get_conditional_response(
+            self.request, etag=headers.get('ETag'),
+            last_modified=parse_http_date_safe(last_modified) if last_modified else None,
+        )
+        if response is None:
+            response = HttpResponse(content, content_type=content_type)
+        for name, value in headers.items():
+            response[name] = value
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Accept', 'Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(lambda: super(CatalogCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(lambda: super(CatalogCacheMixin, self).retrieve(request, *args, **kwargs))
+
+
+class OwnedCreateMixin:
+    """Stamp the requesting user onto new rows as owner_field (seller, buyer, sender)"""
+    owner_field = None
+
+    def get_owner_kwargs(self):
+        return {self.owner_field: self.request.user} if self.owner_field else {}
+
+    def perform_create(self, serializer):
+        serializer.save(**self.get_owner_kwargs())
+
+
+class BulkCreateMixin(OwnedCreateMixin):
+    """POST <collection>/bulk/ with a JSON list: validate every item, insert all or nothing.
+
+    Related primary keys are resolved for the whole batch in one query and
+    rows are written with bulk_create (see core.utils.bulk_utils for the
+    signal side effects it replays). Invalid batches return 400 with the
+    errors of each failing item by index; nothing is written.
+    """
+    bulk_permission_classes = None
+    bulk_max_items = 500
+
+    def get_permissions(self):
+        if self.action == 'bulk' and self.bulk_permission_classes is not None:
+            return [permission() for permission in self.bulk_permission_classes]
+        return super().get_permissions()
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'Expected a non-empty JSON list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.bulk_max_items:
+            return Response({'error': f'At most {self.bulk_max_items} items per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = BulkCreateListSerializer(child=self.get_serializer(), data=items, context=self.get_serializer_context())
+        if not serializer.is_valid():
+            errors = serializer.errors
+            # DRF reports per-item errors as a list or, with LIST_SERIALIZER_ERRORS_AS_DICT, as {index: errors}
+            if isinstance(errors, list):
+                errors = dict(enumerate(errors))
+            if not all(isinstance(index, int) for index in errors):
+                return Response({'created': 0, 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({
+                'created': 0,
+                'errors': [{'index': index, 'errors': errors[index]} for index in sorted(errors) if errors[index]],
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        model = serializer.child.Meta.model
+        owner = self.get_owner_kwargs()
+        try:
+            created = bulk_create_records(model, [model(**attrs, **owner) for attrs in serializer.validated_data])
+        except IntegrityError as exc:
+            return Response({'created': 0, 'errors': [{'index': None, 'errors': str(exc)}]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'created': len(created), 'ids': [obj.pk for obj in created]}, status=status.HTTP_201_CREATED)
+
+
+class StreamingExportMixin:
+    """GET <collection>/export/?output=csv|jsonl&start_date=&end_date= streams the whole filtered queryset.
+
+    Rows are read through a server-side cursor (queryset.iterator) and
+    written to a StreamingHttpResponse as they arrive, so memory stays flat
+    for millions of rows. export_date_range is the date-range helper from the
+    entity's utils module; it is combined with the view's own filters.
+    """
+    export_permission_classes = None
+    export_date_range = None
+    export_chunk_size = EXPORT_CHUNK_SIZE
+
+    def get_permissions(self):
+        if self.action == 'export' and self.export_permission_classes is not None:
+            return [permission() for permission in self.export_permission_classes]
+        return super().get_permissions()
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_CONTENT_TYPES:
+            return Response({'error': f"output must be one of: {', '.join(EXPORT_CONTENT_TYPES)}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start = parse_export_bound(request.query_params.get('start_date'))
+            end = parse_export_bound(request.query_params.get('end_date'), end=True)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if start or end:
+            queryset &= self.export_date_range(start or datetime.datetime.min.replace(tzinfo=datetime.timezone.utc), end or timezone.now())
+        serializer = self.get_serializer()
+        rows = export_rows(queryset.order_by('pk'), serializer, self.export_chunk_size)
+        lines = csv_lines(rows, export_columns(serializer)) if output == 'csv' else jsonl_lines(rows)
+
+        response = StreamingHttpResponse(batched(lines), content_type=EXPORT_CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="{self.basename}-export.{output}"'
+        patch_cache_control(response, private=True, no_store=True)
+        return response
@@ -1,8 +1,26 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
+from django.contrib.postgres.search import SearchVectorField
 
 # Create your models here.
 
+class Location(models.Model):
+    """Canonical place referenced by product pickup points, profiles and routes"""
+    name = models.CharField(max_length=255)
+    normalized_name = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def normalize(name):
+        return ' '.join((name or '').split()).lower()
+
+    def __str__(self):
+        return self.name
+
 class User(AbstractUser):
     ROLE_CHOICES = [
         ('Buyer', 'Buyer'),
@@ -13,6 +31,10 @@ class User(AbstractUser):
     email = models.EmailField(unique=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
     is_verified = models.BooleanField(default=False)
+    # Bumped when a JWT claim changes (role, verification, activation, password) to retire older tokens
+    token_version = models.PositiveIntegerField(default=0)
+    # Bumped when the password or activation changes to retire older refresh tokens
+    credential_version = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
@@ -25,8 +47,10 @@ class Profile(models.Model):
     gst_number = models.CharField(max_length=50)
     kyc_document = models.CharField(max_length=255)
     location = models.CharField(max_length=255)
+    place = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='profiles')
     contact_info = models.CharField(max_length=255)
     rating = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Profile of {self.user.email}"
@@ -45,12 +69,19 @@ class Product(models.Model):
     unit_of_measure = models.CharField(max_length=20)
     availability_dates = models.CharField(max_length=100)  # Use CharField for daterange for now
     pickup_location = models.CharField(max_length=255)
+    pickup_place = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='products')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.commodity_type} by {self.seller.email}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='product_created_idx'),
+            models.Index(fields=['commodity_type', 'price'], name='product_commodity_price_idx'),
+        ]
+
 class Enquiry(models.Model):
     STATUS_CHOICES = [
         ('Pending', 'Pending'),
@@ -64,10 +95,20 @@ class Enquiry(models.Model):
     offered_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Denormalized on every Message insert (core.utils.message_utils) for inbox rows
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_activity_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return f"Enquiry by {self.buyer.email} for {self.product}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='enquiry_created_idx'),
+            models.Index(fields=['product', 'status'], name='enquiry_product_status_idx'),
+            models.Index(fields=['buyer', '-created_at'], name='enquiry_buyer_created_idx'),
+        ]
+
 class Message(models.Model):
     enquiry = models.ForeignKey(Enquiry, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='messages')
@@ -77,6 +118,12 @@ class Message(models.Model):
     def __str__(self):
         return f"Message by {self.sender.email} on {self.timestamp}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='message_timestamp_idx'),
+            models.Index(fields=['enquiry', 'timestamp'], name='message_enquiry_timestamp_idx'),
+        ]
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('Requested', 'Requested'),
@@ -93,6 +140,17 @@ class Order(models.Model):
     def __str__(self):
         return f"Order for {self.enquiry}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='order_created_idx'),
+            models.Index(fields=['status', 'transporter'], name='order_status_transporter_idx'),
+            # Partial index for get_available_jobs: only unassigned requests are indexed
+            models.Index(
+                fields=['-created_at', '-id'], name='order_available_jobs_idx',
+                condition=models.Q(status='Requested', transporter__isnull=True),
+            ),
+        ]
+
 class Transaction(models.Model):
     order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name='transaction')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
@@ -102,6 +160,11 @@ class Transaction(models.Model):
     def __str__(self):
         return f"Transaction for {self.order}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='transaction_created_idx'),
+        ]
+
 from django.contrib.postgres.fields import JSONField
 
 class AuditLog(models.Model):
@@ -113,11 +176,127 @@ class AuditLog(models.Model):
     def __str__(self):
         return f"AuditLog by {self.user.email} at {self.timestamp}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='auditlog_timestamp_idx'),
+            models.Index(fields=['user', '-timestamp'], name='auditlog_user_timestamp_idx'),
+        ]
+
 class Route(models.Model):
     transporter = models.ForeignKey(User, on_delete=models.CASCADE, related_name='routes')
     origin = models.CharField(max_length=255)
     destination = models.CharField(max_length=255)
+    origin_place = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='routes_from')
+    destination_place = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True, related_name='routes_to')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Route {self.origin} to {self.destination} for {self.transporter.email}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='route_created_idx'),
+            models.Index(fields=['origin', 'destination'], name='route_origin_dest_idx'),
+        ]
+
+
+class DashboardRollup(models.Model):
+    """Per-user dashboard counter for one metric and day; day is NULL for the all-time total"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='dashboard_rollups')
+    role = models.CharField(max_length=20, choices=User.ROLE_CHOICES)
+    metric = models.CharField(max_length=50)
+    day = models.DateField(null=True, blank=True)
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'role', 'metric', 'day'], name='rollup_daily_unique',
+                condition=models.Q(day__isnull=False),
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'role', 'metric'], name='rollup_total_unique',
+                condition=models.Q(day__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.metric} for {self.user_id} ({self.role}) on {self.day or 'all time'}"
+
+class SearchDocument(models.Model):
+    """Denormalized search text for one searchable row; search_vector is maintained on PostgreSQL only"""
+    ENTITY_CHOICES = (
+        ('product', 'Product'),
+        ('enquiry', 'Enquiry'),
+        ('message', 'Message'),
+        ('order', 'Order'),
+        ('transaction', 'Transaction'),
+    )
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.BigIntegerField()
+    title = models.TextField(blank=True, default='')
+    body = models.TextField(blank=True, default='')
+    search_vector = SearchVectorField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['entity', 'object_id'], name='searchdoc_entity_object_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity} {self.object_id}"
+
+class AuditActionRollup(models.Model):
+    """Per-user count of audit log entries of one action type (first word of the action) on one day"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='audit_rollups')
+    day = models.DateField()
+    action_type = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.action_type} x{self.count} on {self.day}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day', 'action_type'], name='audit_rollup_unique'),
+        ]
+
+class EnquiryReadState(models.Model):
+    """A participant's row for an enquiry thread: read watermark, unread messages and inbox position"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='read_states')
+    enquiry = models.ForeignKey(Enquiry, on_delete=models.CASCADE, related_name='read_states')
+    # Highest Message id the user has read (ids only grow, so later messages are unread)
+    last_read_id = models.BigIntegerField(default=0)
+    unread_count = models.IntegerField(default=0)
+    # Copy of enquiry.last_activity_at, so the inbox is one index scan over the user's rows
+    last_activity_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.user_id} on enquiry {self.enquiry_id}: {self.unread_count} unread"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'enquiry'], name='read_state_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-last_activity_at', '-id'], name='read_state_inbox_idx'),
+        ]
+
+class UnreadCounter(models.Model):
+    """Unread messages across all of a user's enquiries: the sum of their read states' unread_count"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='unread_counter')
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.count} unread"
+
+class CacheVersion(models.Model):
+    """Monotonic version for a cached namespace; bumping it orphans every cached entry"""
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
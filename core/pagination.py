@@ -0,0 +1,137 @@
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class KeysetCursorPaginationMixin:
+    """Cursor pagination over the full ordering tuple instead of its first field.
+
+    DRF's CursorPagination seeks on the first ordering field and skips ties
+    by OFFSET (capped at 1000), so sorting by a repeated value such as
+    commodity_type repeats or loses rows. Here the ordering always ends in
+    the primary key and the cursor position holds every ordering value, so
+    each page seeks past a unique (field, ..., id) tuple and needs no offset.
+    Ordering fields must not be nullable.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+
+    def _get_position_from_instance(self, instance, ordering):
+        fields = [field.lstrip('-') for field in ordering]
+        if isinstance(instance, dict):
+            return json.dumps([str(instance[field]) for field in fields])
+        return json.dumps([str(getattr(instance, field)) for field in fields])
+
+    def _seek(self, queryset, reverse, position):
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is None:
+            return queryset
+        try:
+            values = json.loads(position)
+        except ValueError:
+            values = None
+        if not isinstance(values, list) or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # (a, b) after (x, y) is a > x OR (a = x AND b > y), per column direction
+        after, equal = Q(), {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            after |= Q(**equal, **{f"{name}__{'lt' if field.startswith('-') else 'gt'}": value})
+            equal[name] = value
+        return queryset.filter(after)
+
+    def _start_page(self, queryset, request, view):
+        """Ordered, seeked queryset for the requested cursor, or None when unpaginated"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor if self.cursor is not None else (0, False, None)
+        queryset = self._seek(queryset, reverse, current_position)
+        return queryset[offset:offset + self.page_size + 1]
+
+    def _finish_page(self, results):
+        offset, reverse, current_position = self.cursor if self.cursor is not None else (0, False, None)
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = self._get_position_from_instance(results[-1], self.ordering) if has_following_position else None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+        return self.page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._start_page(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._finish_page(list(queryset))
+
+
+class AsyncCursorPaginationMixin(KeysetCursorPaginationMixin):
+    """Cursor pagination for native async views.
+
+    apaginate_queryset mirrors paginate_queryset (same cursors, page size and
+    next/previous links) but fetches the page with async ORM iteration.
+    Works with model instances and .values() rows.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self._start_page(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._finish_page([row async for row in queryset])
+
+
+class CreatedAtCursorPagination(AsyncCursorPaginationMixin, CursorPagination):
+    """Keyset pagination over (created_at, id), newest first.
+
+    Each page is a range scan on the ordering index seeked from the cursor
+    position, so deep pages cost the same as the first one (no OFFSET).
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class TimestampCursorPagination(CreatedAtCursorPagination):
+    """Keyset pagination over (timestamp, id) for messages and audit logs"""
+    ordering = ('-timestamp', '-id')
+
+
+class DateJoinedCursorPagination(CreatedAtCursorPagination):
+    """Keyset pagination over (date_joined, id) for users"""
+    ordering = ('-date_joined', '-id')
+
+
+class IdCursorPagination(CreatedAtCursorPagination):
+    """Keyset pagination over the primary key for models without a timestamp"""
+    ordering = ('-id',)
+
+
+class InboxCursorPagination(CreatedAtCursorPagination):
+    """Keyset pagination over (last_activity_at, id) for inbox rows"""
+    ordering = ('-last_activity_at', '-id')
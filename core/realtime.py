@@ -0,0 +1,203 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import Enquiry, Message
+from .serializers import MessageSerializer
+from .utils.export_utils import export_rows
+
+logger = logging.getLogger(__name__)
+
+# Realtime push of new messages and enquiry status changes. Writers publish
+# an event to the channel (user:<id>) of the enquiry's buyer and seller once
+# their transaction commits; /api/events/ streams a user's channel as Server-Sent Events. The
+# broker is pluggable like the catalog cache: InProcessBroker fans out inside
+# one process, RedisBroker goes through Redis streams so every worker sees
+# every event.
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+class InProcessBroker:
+    """Pub/sub hub for a single process (one ASGI worker, or runserver).
+
+    Subscribers are asyncio queues on the event loop that serves them;
+    publish is thread-safe, so sync views and signal handlers can call it.
+    The last `history` events are kept so a reconnecting client
+    (Last-Event-ID) gets what it missed. A subscriber that falls more than
+    `max_pending` events behind is disconnected and catches up from the
+    history when it reconnects.
+    """
+
+    def __init__(self, history=1000, max_pending=100):
+        self.max_pending = max_pending
+        self._history = deque(maxlen=history)
+        self._subscribers = {}
+        # Start from the clock so ids keep increasing across restarts
+        self._ids = itertools.count(time.time_ns() // 1000)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event, data):
+        with self._lock:
+            message = (str(next(self._ids)), event, data)
+            self._history.append((channel, message))
+            subscribers = list(self._subscribers.get(channel, ()))
+        for loop, pending in subscribers:
+            loop.call_soon_threadsafe(self._deliver, pending, message)
+
+    def _deliver(self, pending, message):
+        if pending.full():
+            # Too slow: end the stream (None); the client resumes from the history
+            while not pending.empty():
+                pending.get_nowait()
+            pending.put_nowait(None)
+        else:
+            pending.put_nowait(message)
+
+    async def listen(self, channel, last_event_id=None, timeout=15):
+        """Yield (id, event, data) for the channel, or None after `timeout` seconds without one"""
+        try:
+            after = int(last_event_id) if last_event_id else None
+        except ValueError:
+            after = None
+        pending = asyncio.Queue(maxsize=self.max_pending)
+        subscriber = (asyncio.get_running_loop(), pending)
+        # Registering and reading the history under one lock: every event is
+        # either replayed or delivered, never both
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscriber)
+            missed = [message for name, message in self._history
+                      if after is not None and name == channel and int(message[0]) > after]
+        try:
+            for message in missed:
+                yield message
+            while True:
+                try:
+                    message = await asyncio.wait_for(pending.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            with self._lock:
+                self._subscribers[channel].discard(subscriber)
+                if not self._subscribers[channel]:
+                    del self._subscribers[channel]
+
+
+class RedisBroker:
+    """Shared broker on Redis streams (requires the redis package).
+
+    Each channel is a capped stream, so every worker process sees every
+    event and Last-Event-ID resumes from the stream itself.
+    """
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='tivra:events:', max_length=1000):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError('RedisBroker requires the redis package (pip install redis)')
+        self.url = url
+        self.prefix = prefix
+        self.max_length = max_length
+        self._client = redis.Redis.from_url(url)
+
+    def publish(self, channel, event, data):
+        self._client.xadd(
+            self.prefix + channel, {'event': event, 'data': json.dumps(data, cls=DjangoJSONEncoder)},
+            maxlen=self.max_length, approximate=True,
+        )
+
+    async def listen(self, channel, last_event_id=None, timeout=15):
+        import redis.asyncio
+        client = redis.asyncio.Redis.from_url(self.url)
+        key, position = self.prefix + channel, last_event_id or '$'
+        try:
+            while True:
+                response = await client.xread({key: position}, block=int(timeout * 1000), count=100)
+                if not response:
+                    yield None
+                    continue
+                for event_id, fields in response[0][1]:
+                    position = event_id
+                    yield event_id.decode(), fields[b'event'].decode(), json.loads(fields[b'data'])
+        finally:
+            await client.aclose()
+
+
+_broker = None
+
+def get_broker():
+    """The realtime broker configured by settings.REALTIME"""
+    global _broker
+    if _broker is None:
+        config = getattr(settings, 'REALTIME', {})
+        backend = import_string(config.get('BACKEND', 'core.realtime.InProcessBroker'))
+        _broker = backend(**config.get('OPTIONS', {}))
+    return _broker
+
+def publish_events(events):
+    """Publish (user ids, event, data) triples; a broker outage is logged, not raised"""
+    try:
+        broker = get_broker()
+        for user_ids, event, data in events:
+            for user_id in set(user_ids):
+                broker.publish(user_channel(user_id), event, data)
+    except Exception:
+        logger.exception('Failed to publish realtime events')
+
+def _message_events(message_ids):
+    participants = {
+        enquiry_id: (buyer_id, seller_id) for enquiry_id, buyer_id, seller_id in
+        Enquiry.objects.filter(messages__id__in=message_ids).values_list('id', 'buyer_id', 'product__seller_id')
+    }
+    rows = export_rows(Message.objects.filter(pk__in=message_ids).order_by('timestamp', 'id'), MessageSerializer())
+    return [(participants.get(row['enquiry'], ()), 'message.created', row) for row in rows]
+
+def _enquiry_events(previous_statuses):
+    events = []
+    rows = Enquiry.objects.filter(pk__in=previous_statuses).values('id', 'status', 'buyer_id', 'product_id', 'product__seller_id')
+    for row in rows:
+        previous = previous_statuses[row['id']]
+        data = {'id': row['id'], 'status': row['status'], 'previous_status': previous,
+                'product': row['product_id'], 'buyer': row['buyer_id']}
+        events.append(((row['buyer_id'], row['product__seller_id']), 'enquiry.created' if previous is None else 'enquiry.updated', data))
+    return events
+
+def publish_new_messages(message_ids):
+    """Push message.created (the API representation) to the buyer and seller once the transaction commits"""
+    message_ids = list(message_ids)
+    transaction.on_commit(lambda: publish_events(_message_events(message_ids)))
+
+def publish_enquiry_changes(previous_statuses):
+    """Push enquiry.created / enquiry.updated for {enquiry id: status before (None if new)} after commit"""
+    previous_statuses = dict(previous_statuses)
+    transaction.on_commit(lambda: publish_events(_enquiry_events(previous_statuses)))
+
+def format_event(message):
+    """One Server-Sent Events frame; None becomes a keep-alive comment"""
+    if message is None:
+        return ': keep-alive\n\n'
+    event_id, event, data = message
+    return f'id: {event_id}\nevent: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    global _broker
+    if setting == 'REALTIME':
+        _broker = None
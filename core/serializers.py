@@ -1,56 +1,327 @@
-from rest_framework import serializers
-from .models import User, Profile, Product, Enquiry, Message, Order, Transaction, AuditLog, Route
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
 
-class ProfileSerializer(serializers.ModelSerializer):
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from rest_framework import permissions, serializers
+from .models import User, Profile, Product, Enquiry, Message, Order, Transaction, AuditLog, Route, EnquiryReadState
+
+def get_eager_loading(serializer, prefix='', in_prefetch=False):
+    """Collect select_related/prefetch_related paths from a serializer's nested fields.
+
+    Single-valued relations rendered by a nested serializer are joined with
+    select_related; to-many relations (and anything below them) are prefetched.
+    Primary-key fields only need a join for reverse one-to-one relations.
+    """
+    select_related, prefetch_related = [], []
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    if model is None:
+        return select_related, prefetch_related
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        many = isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField))
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        related_key = isinstance(nested, serializers.RelatedField)
+        if not many and not related_key and not isinstance(nested, serializers.BaseSerializer):
+            continue
+        source = field.source_attrs[0] if field.source_attrs else field.field_name
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+        if related_key and not many and model_field.concrete:
+            # A forward key's value is already on the row
+            continue
+
+        path = prefix + source
+        if many or in_prefetch:
+            prefetch_related.append(path)
+        else:
+            select_related.append(path)
+        if isinstance(nested, serializers.BaseSerializer):
+            child_select, child_prefetch = get_eager_loading(nested, path + '__', many or in_prefetch)
+            select_related.extend(child_select)
+            prefetch_related.extend(child_prefetch)
+
+    return select_related, prefetch_related
+
+def apply_eager_loading(queryset, serializer):
+    """queryset with the joins and prefetches get_eager_loading derives from serializer"""
+    select_related, prefetch_related = get_eager_loading(serializer)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
+
+def parse_field_paths(value):
+    """Turn 'id,enquiry.status,enquiry.product' into {'id': {}, 'enquiry': {'status': {}, 'product': {}}}"""
+    if isinstance(value, str):
+        value = value.split(',')
+    tree = {}
+    for path in value:
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer that honours ?fields= and ?expand= on read requests.
+
+    ``fields`` keeps only the listed fields; dotted paths (``enquiry.status``)
+    prune nested serializers. Without ``expand`` relations stay fully nested;
+    once ``expand`` is given, only the listed relations (dotted for deeper
+    levels) are nested and every other relation renders as its primary key.
+    Both can also be passed as constructor kwargs. Because the pruned field
+    tree is what get_eager_loading walks, the view's joins follow it too.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None and request.method in permissions.SAFE_METHODS:
+            fields = request.query_params.get('fields', fields)
+            expand = request.query_params.get('expand', expand)
+        self._field_spec = parse_field_paths(fields) if fields is not None else None
+        self._expand_spec = parse_field_paths(expand) if expand is not None else None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        field_spec, expand_spec = self._field_spec, self._expand_spec
+        if field_spec is not None:
+            fields = {name: field for name, field in fields.items() if name in field_spec}
+        for name, field in list(fields.items()):
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, serializers.BaseSerializer):
+                continue
+            if expand_spec is not None and name not in expand_spec:
+                source = {'source': field.source} if field.source != name else {}
+                fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, many=many, **source)
+            elif isinstance(nested, DynamicFieldsModelSerializer):
+                nested._field_spec = (field_spec.get(name) or None) if field_spec is not None else None
+                nested._expand_spec = expand_spec.get(name, {}) if expand_spec is not None else None
+        return fields
+
+# Leaf fields whose to_representation returns database values unchanged
+IDENTITY_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.EmailField, serializers.BooleanField)
+
+# Compiled encoders, least recently used first; the key is the pruned field
+# tree, so reordered or unknown ?fields= names share an entry
+_ROW_ENCODERS = OrderedDict()
+_ROW_ENCODERS_LOCK = threading.Lock()
+ROW_ENCODER_CACHE_SIZE = 256
+
+def compile_row_encoder(serializer):
+    """Compile a serializer's readable field tree into (lookups, encode) for .values() rows.
+
+    encode(row) builds the same dict serializer.data would for that row, so
+    the JSON output is byte-identical, without instantiating models or walking
+    fields per row. Returns None when a field has no plain column behind it
+    (method fields, to-many relations, dotted or '*' sources); callers then
+    fall back to the serializer.
+    """
+    lookups, namespace = [], {}
+
+    def compile_node(node, model, prefix):
+        items = []
+        for field in node._readable_fields:
+            if field.source == '*' or len(field.source_attrs) != 1 or isinstance(
+                field, (serializers.ListSerializer, serializers.ManyRelatedField, serializers.SerializerMethodField)
+            ):
+                raise LookupError(field.field_name)
+            try:
+                model_field = model._meta.get_field(field.source_attrs[0])
+            except FieldDoesNotExist:
+                raise LookupError(field.field_name)
+            path = prefix + field.source_attrs[0]
+            if isinstance(field, serializers.BaseSerializer):
+                related_model = getattr(getattr(field, 'Meta', None), 'model', None)
+                if related_model is None or not model_field.is_relation:
+                    raise LookupError(field.field_name)
+                pk_path = f'{path}__{related_model._meta.pk.name}'
+                lookups.append(pk_path)
+                expr = f'None if r[{pk_path!r}] is None else {compile_node(field, related_model, path + "__")}'
+            elif isinstance(field, serializers.RelatedField):
+                if not isinstance(field, serializers.PrimaryKeyRelatedField) or field.pk_field is not None:
+                    raise LookupError(field.field_name)
+                lookups.append(path)
+                expr = f'r[{path!r}]'
+            elif type(field) in IDENTITY_FIELDS:
+                lookups.append(path)
+                expr = f'r[{path!r}]'
+            else:
+                converter = f'c{len(namespace)}'
+                namespace[converter] = field.to_representation
+                lookups.append(path)
+                expr = f'None if (v := r[{path!r}]) is None else {converter}(v)'
+            items.append(f'{field.field_name!r}: ({expr})')
+        return '{' + ', '.join(items) + '}'
+
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    if model is None:
+        return None
+    try:
+        source = compile_node(serializer, model, '')
+    except LookupError:
+        return None
+    return list(dict.fromkeys(lookups)), eval(f'lambda r: {source}', namespace)
+
+def _field_tree_key(node):
+    return tuple(
+        (field.field_name, type(field), _field_tree_key(field) if isinstance(field, serializers.Serializer) else None)
+        for field in node._readable_fields
+    )
+
+def get_row_encoder(serializer):
+    """Cached compile_row_encoder, keyed on the serializer class and the field tree it renders"""
+    key = (type(serializer), _field_tree_key(serializer))
+    with _ROW_ENCODERS_LOCK:
+        if key in _ROW_ENCODERS:
+            _ROW_ENCODERS.move_to_end(key)
+            return _ROW_ENCODERS[key]
+    encoder = compile_row_encoder(serializer)
+    with _ROW_ENCODERS_LOCK:
+        _ROW_ENCODERS[key] = encoder
+        while len(_ROW_ENCODERS) > ROW_ENCODER_CACHE_SIZE:
+            _ROW_ENCODERS.popitem(last=False)
+    return encoder
+
+class _PrefetchedRows:
+    """Stands in for a related field's queryset: get(pk=...) answered from one in_bulk() fetch"""
+
+    def __init__(self, model, rows):
+        self.model = model
+        self.rows = rows
+
+    def get(self, pk):
+        try:
+            key = self.model._meta.pk.to_python(pk)
+        except ValidationError:
+            raise ValueError(pk)
+        if key not in self.rows:
+            raise self.model.DoesNotExist
+        return self.rows[key]
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """ListSerializer for bulk writes: each writable primary-key relation is
+    resolved for the whole batch with one query instead of one per item."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            for field in self.child.fields.values():
+                if not isinstance(field, serializers.PrimaryKeyRelatedField) or field.read_only or field.pk_field is not None:
+                    continue
+                queryset = field.get_queryset()
+                pk_field = queryset.model._meta.pk
+                keys = set()
+                for item in data:
+                    value = item.get(field.field_name) if isinstance(item, Mapping) else None
+                    if value is None or isinstance(value, bool):
+                        continue
+                    try:
+                        keys.add(pk_field.to_python(value))
+                    except ValidationError:
+                        continue
+                field.queryset = _PrefetchedRows(queryset.model, queryset.in_bulk(keys))
+        return super().to_internal_value(data)
+
+class ProfileSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Profile
         fields = '__all__'
+        read_only_fields = ['place']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsModelSerializer):
     profile = ProfileSerializer(read_only=True)
     class Meta:
         model = User
         fields = ['id', 'email', 'username', 'role', 'is_verified', 'profile']
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(DynamicFieldsModelSerializer):
     seller = UserSerializer(read_only=True)
     class Meta:
         model = Product
         fields = '__all__'
+        read_only_fields = ['pickup_place']
 
-class EnquirySerializer(serializers.ModelSerializer):
+class EnquirySerializer(DynamicFieldsModelSerializer):
     buyer = UserSerializer(read_only=True)
     product = ProductSerializer(read_only=True)
+    product_id = serializers.PrimaryKeyRelatedField(source='product', queryset=Product.objects.all(), write_only=True)
     class Meta:
         model = Enquiry
         fields = '__all__'
+        read_only_fields = ['last_message', 'last_activity_at']
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(DynamicFieldsModelSerializer):
     sender = UserSerializer(read_only=True)
     class Meta:
         model = Message
         fields = '__all__'
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(DynamicFieldsModelSerializer):
     enquiry = EnquirySerializer(read_only=True)
     transporter = UserSerializer(read_only=True)
     class Meta:
         model = Order
         fields = '__all__'
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(DynamicFieldsModelSerializer):
     order = OrderSerializer(read_only=True)
     class Meta:
         model = Transaction
         fields = '__all__'
 
-class AuditLogSerializer(serializers.ModelSerializer):
+class AuditLogSerializer(DynamicFieldsModelSerializer):
     user = UserSerializer(read_only=True)
     class Meta:
         model = AuditLog
         fields = '__all__'
 
-class RouteSerializer(serializers.ModelSerializer):
+class RouteSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Route
-        fields = '__all__' 
\ No newline at end of file
+        fields = '__all__'
+        read_only_fields = ['origin_place', 'destination_place'] 
+class InboxUserSerializer(DynamicFieldsModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'role']
+
+class InboxProductSerializer(DynamicFieldsModelSerializer):
+    seller = InboxUserSerializer(read_only=True)
+    class Meta:
+        model = Product
+        fields = ['id', 'commodity_type', 'seller']
+
+class InboxMessageSerializer(DynamicFieldsModelSerializer):
+    class Meta:
+        model = Message
+        fields = ['id', 'sender', 'content', 'timestamp']
+
+class InboxEnquirySerializer(DynamicFieldsModelSerializer):
+    buyer = InboxUserSerializer(read_only=True)
+    product = InboxProductSerializer(read_only=True)
+    last_message = InboxMessageSerializer(read_only=True)
+    class Meta:
+        model = Enquiry
+        fields = ['id', 'status', 'buyer', 'product', 'last_message']
+
+class InboxSerializer(DynamicFieldsModelSerializer):
+    """One inbox row: an enquiry thread with its last message and the user's unread count.
+
+    Every field is a plain column, so the row encoder renders the whole page
+    from one joined .values() query.
+    """
+    enquiry = InboxEnquirySerializer(read_only=True)
+    class Meta:
+        model = EnquiryReadState
+        fields = ['enquiry', 'last_activity_at', 'unread_count', 'last_read_id']
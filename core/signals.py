@@ -1,6 +1,20 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
+from django.db.models import F
 from django.dispatch import receiver
-from .models import User, Profile
+from .models import User, Profile, Location, Product, Enquiry, Message, Order, Transaction, Route, AuditLog
+from .utils.audit_utils import apply_audit_rollups
+from .utils.dashboard_utils import get_rollup_contributions, apply_rollup_delta
+from .utils.location_utils import get_location
+from .utils.message_utils import (
+    count_new_messages, discard_deleted_message, discard_enquiry_unread, open_enquiry_threads, restore_last_message,
+    touch_enquiry_threads,
+)
+from .utils.geo_utils import encode_geohash
+from .utils.search_utils import SEARCH_ENTITIES, embedded_fields, index_documents, remove_document, reindex_dependents
+from .authentication import CREDENTIAL_FIELDS, TOKEN_CLAIM_FIELDS, publish_token_version
+from .cache import PROFILES_NAMESPACE, ROUTES_NAMESPACE, bump_catalog_version, bump_version
+from .realtime import publish_enquiry_changes, publish_new_messages
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -8,5 +22,202 @@ def create_user_profile(sender, instance, created, **kwargs):
         Profile.objects.create(user=instance)
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save() 
\ No newline at end of file
+def save_user_profile(sender, instance, update_fields=None, **kwargs):
+    # Login only touches last_login, which no profile consumer renders
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    instance.profile.save()
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=Enquiry)
+@receiver(pre_save, sender=Order)
+@receiver(pre_save, sender=Transaction)
+def capture_rollup_contributions(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._rollup_before = get_rollup_contributions(sender, instance.pk) if instance.pk else {}
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Enquiry)
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=Transaction)
+def update_dashboard_rollups(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    apply_rollup_delta(getattr(instance, '_rollup_before', {}), get_rollup_contributions(sender, instance.pk))
+
+@receiver(pre_delete, sender=Product)
+@receiver(pre_delete, sender=Enquiry)
+@receiver(pre_delete, sender=Order)
+@receiver(pre_delete, sender=Transaction)
+def capture_deleted_rollup_contributions(sender, instance, **kwargs):
+    instance._rollup_before = get_rollup_contributions(sender, instance.pk)
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Enquiry)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=Transaction)
+def remove_dashboard_rollups(sender, instance, **kwargs):
+    # Only decrement existing rows: the owning user may be deleted in the same cascade
+    apply_rollup_delta(getattr(instance, '_rollup_before', {}), {}, create=False)
+
+@receiver(post_save, sender=AuditLog)
+def count_audit_rollup(sender, instance, created, raw=False, **kwargs):
+    # Deletes (including retention) keep their counts: rollups are the activity history
+    if created and not raw:
+        apply_audit_rollups([instance])
+
+@receiver(pre_save, sender=Product)
+def link_product_location(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.pickup_place = get_location(instance.pickup_location)
+
+@receiver(pre_save, sender=Profile)
+def link_profile_location(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.place = get_location(instance.location)
+
+@receiver(pre_save, sender=Route)
+def link_route_locations(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.origin_place = get_location(instance.origin)
+        instance.destination_place = get_location(instance.destination)
+
+@receiver(pre_save, sender=Location)
+def update_location_geohash(sender, instance, raw=False, **kwargs):
+    if instance.latitude is not None and instance.longitude is not None:
+        instance.geohash = encode_geohash(instance.latitude, instance.longitude)
+    else:
+        instance.geohash = ''
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=Enquiry)
+@receiver(pre_save, sender=Order)
+def capture_embedded_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Status changes and the like touch nothing other documents copy
+    instance._embedded_fields = None
+    fields = embedded_fields(sender)
+    if update_fields is not None:
+        updated = {sender._meta.get_field(name).attname for name in update_fields}
+        fields = [field for field in fields if field in updated]
+    if raw or not instance.pk or not fields:
+        return
+    instance._embedded_fields = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Enquiry)
+@receiver(post_save, sender=Message)
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=Transaction)
+def update_search_document(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    index_documents(SEARCH_ENTITIES[sender], [instance.pk])
+    before = getattr(instance, '_embedded_fields', None)
+    if before and any(before[field] != getattr(instance, field) for field in before):
+        reindex_dependents(sender, instance.pk)
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Enquiry)
+@receiver(post_delete, sender=Message)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=Transaction)
+def remove_search_document(sender, instance, **kwargs):
+    remove_document(SEARCH_ENTITIES[sender], instance.pk)
+
+# Search documents embed email/username; access tokens carry the claim fields
+USER_WATCHED_FIELDS = ('email', 'username') + TOKEN_CLAIM_FIELDS
+
+@receiver(pre_save, sender=User)
+def capture_watched_user_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Logins save with update_fields=['last_login'], which touches none of them
+    instance._saved_fields = None
+    if raw or not instance.pk or (update_fields is not None and not set(USER_WATCHED_FIELDS) & set(update_fields)):
+        return
+    instance._saved_fields = User.objects.filter(pk=instance.pk).values(*USER_WATCHED_FIELDS).first()
+
+@receiver(post_save, sender=User)
+def reindex_user_search_documents(sender, instance, raw=False, **kwargs):
+    before = getattr(instance, '_saved_fields', None)
+    if before and (before['email'], before['username']) != (instance.email, instance.username):
+        reindex_dependents(User, instance.pk)
+
+@receiver(post_save, sender=User)
+def retire_stale_tokens(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_saved_fields', None)
+    changed = {field for field in TOKEN_CLAIM_FIELDS if before[field] != getattr(instance, field)} if before else set()
+    if changed:
+        bumps = {'token_version': F('token_version') + 1}
+        if changed & set(CREDENTIAL_FIELDS):
+            bumps['credential_version'] = F('credential_version') + 1
+        User.objects.filter(pk=instance.pk).update(**bumps)
+        instance.refresh_from_db(fields=list(bumps))
+    elif not created:
+        return
+    # Published after commit: a rolled-back change must not retire live tokens
+    user_id, version = instance.pk, instance.token_version
+    transaction.on_commit(lambda: publish_token_version(user_id, version))
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_on_product_change(sender, instance, **kwargs):
+    # Bumped after commit, or a request in between would cache the old rows under the new version
+    transaction.on_commit(bump_catalog_version)
+
+@receiver(post_save, sender=Profile)
+def invalidate_catalog_on_seller_change(sender, instance, created, raw=False, **kwargs):
+    # Product payloads embed the seller and its profile; user saves re-save the profile
+    if not raw and not created and Product.objects.filter(seller_id=instance.user_id).exists():
+        transaction.on_commit(bump_catalog_version)
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_etags(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: bump_version(PROFILES_NAMESPACE))
+
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+def invalidate_route_etags(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: bump_version(ROUTES_NAMESPACE))
+
+@receiver(pre_save, sender=Enquiry)
+def capture_enquiry_status(sender, instance, raw=False, **kwargs):
+    instance._saved_status = None
+    if not raw and instance.pk:
+        instance._saved_status = Enquiry.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+@receiver(post_save, sender=Enquiry)
+def push_enquiry_status(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_saved_status', None)
+    if not raw and (created or previous != instance.status):
+        publish_enquiry_changes({instance.pk: None if created else previous})
+
+@receiver(post_save, sender=Message)
+def push_new_message(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        publish_new_messages([instance.pk])
+
+@receiver(post_save, sender=Enquiry)
+def open_enquiry_thread(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        open_enquiry_threads([instance])
+
+@receiver(post_save, sender=Message)
+def count_unread_message(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        count_new_messages([instance])
+        touch_enquiry_threads([instance])
+
+@receiver(post_delete, sender=Message)
+def uncount_unread_message(sender, instance, **kwargs):
+    discard_deleted_message(instance)
+    restore_last_message(instance)
+
+@receiver(pre_delete, sender=Enquiry)
+def uncount_deleted_enquiry(sender, instance, **kwargs):
+    # Runs before the cascade deletes the messages, which then find nothing left to uncount
+    discard_enquiry_unread(instance.pk)
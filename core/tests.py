@@ -1,3 +1,1289 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import tempfile
+import threading
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth.models import update_last_login
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import serializers, signals, views
+from .audit import AuditQueue, write_audit_entries
+from .authentication import ClaimsRefreshToken
+from .realtime import get_broker, user_channel
+from .cache import PROFILES_NAMESPACE, get_catalog_cache
+from .serializers import ProductSerializer, OrderSerializer, get_row_encoder
+
+from .models import User, Location, Product, Enquiry, EnquiryReadState, Message, Order, Transaction, AuditLog, AuditActionRollup, Route, DashboardRollup, SearchDocument
+from .utils import (
+    audit_utils, dashboard_utils, enquiry_utils, geo_utils, import_utils, location_utils, message_utils, order_utils,
+    partition_utils, product_utils, route_utils, search_utils, transaction_utils, user_utils,
+)
 
 # Create your tests here.
+
+def create_user(email, role):
+    return User.objects.create_user(email=email, username=email.split('@')[0], password='pass1234', role=role)
+
+
+class MarketplaceFixtureMixin:
+    """Builds a buyer/seller/transporter trade chain: product -> enquiry -> order -> transaction"""
+
+    def setUp(self):
+        # The writer thread would race the test transaction for the database
+        audit_settings = override_settings(AUDIT_LOG={'ASYNC': False})
+        audit_settings.enable()
+        self.addCleanup(audit_settings.disable)
+        self.admin = create_user('admin@tivra.test', 'Admin')
+        self.buyer = create_user('buyer@tivra.test', 'Buyer')
+        self.seller = create_user('seller@tivra.test', 'Seller')
+        self.transporter = create_user('transporter@tivra.test', 'Transporter')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        # Versions live in the rolled-back test database; entries would outlive them
+        get_catalog_cache().clear()
+
+    def create_trade(self, index=0, assign_transporter=True):
+        product = Product.objects.create(
+            seller=self.seller, commodity_type='Biomass', quantity=10 + index, price=Decimal('1500.00'),
+            unit_of_measure='ton', availability_dates='2025-01-01,2025-02-01', pickup_location=f'Warehouse {index}',
+        )
+        enquiry = Enquiry.objects.create(buyer=self.buyer, product=product, quantity=5, offered_price=Decimal('1400.00'))
+        Message.objects.create(enquiry=enquiry, sender=self.buyer, content=f'Is lot {index} still available?')
+        order = Order.objects.create(enquiry=enquiry, transporter=self.transporter if assign_transporter else None)
+        Transaction.objects.create(order=order, amount=Decimal('7000.00'), invoice_number=f'INV-{index}')
+        AuditLog.objects.create(user=self.buyer, action=f'create order {order.id}', details={'order': order.id})
+        Route.objects.create(transporter=self.transporter, origin=f'Warehouse {index}', destination='Pune')
+        return product
+
+
+class ListQueryCountTests(MarketplaceFixtureMixin, TestCase):
+    """Every list endpoint runs a fixed number of queries regardless of row count"""
+
+    # Profiles, products and routes add one aggregate for their ETag validators;
+    # products also read the catalog cache version
+    ENDPOINT_QUERIES = {
+        '/api/users/': 1,
+        '/api/profiles/': 2,
+        '/api/products/': 2,
+        '/api/enquiries/': 1,
+        '/api/messages/': 1,
+        '/api/orders/': 1,
+        '/api/transactions/': 1,
+        '/api/audit-logs/': 1,
+        '/api/routes/': 2,
+    }
+
+    def count_queries(self, url):
+        # Writes bump the catalog version only on commit, which TestCase never reaches
+        get_catalog_cache().clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries)
+
+    def test_list_endpoints_run_constant_queries(self):
+        self.create_trade(0)
+        for url, expected in self.ENDPOINT_QUERIES.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), expected)
+
+        for index in range(1, 6):
+            self.create_trade(index)
+        for url, expected in self.ENDPOINT_QUERIES.items():
+            with self.subTest(url=url, rows='many'):
+                self.assertEqual(self.count_queries(url), expected)
+
+    def test_available_jobs_runs_constant_queries(self):
+        self.client.force_authenticate(self.transporter)
+        for index in range(3):
+            self.create_trade(index, assign_transporter=False)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/orders/available_jobs/')
+        self.assertEqual(len(response.data['results']), 3)
+
+
+class SparseFieldsetTests(MarketplaceFixtureMixin, TestCase):
+    """?fields= prunes payloads, ?expand= picks nested relations, and the joins follow both"""
+
+    def get_first(self, params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/orders/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data['results'][0], ctx.captured_queries
+
+    def test_fields_and_expand(self):
+        order = Order.objects.get(enquiry__product=self.create_trade(0))
+
+        item, _ = self.get_first({'fields': 'id,status'})
+        self.assertEqual(dict(item), {'id': order.id, 'status': 'Requested'})
+
+        item, queries = self.get_first({'expand': 'transporter'})
+        self.assertEqual(item['enquiry'], order.enquiry_id)
+        self.assertEqual(item['transporter']['email'], self.transporter.email)
+        self.assertEqual(item['transporter']['profile'], self.transporter.profile.id)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('core_enquiry', queries[0]['sql'])
+
+        item, _ = self.get_first({'fields': 'id,enquiry.status,enquiry.product', 'expand': 'enquiry'})
+        self.assertEqual(dict(item['enquiry']), {'status': 'Pending', 'product': order.enquiry.product_id})
+
+        item, _ = self.get_first({})
+        self.assertEqual(item['enquiry']['product']['seller']['email'], self.seller.email)
+
+
+class FastListTests(MarketplaceFixtureMixin, TestCase):
+    """The compiled .values() list path renders exactly what the serializers render"""
+
+    REQUESTS = [
+        ('/api/products/', {}),
+        ('/api/products/', {'ordering': 'price', 'page_size': 2}),
+        ('/api/products/', {'fields': 'id,price,seller.email', 'expand': 'seller'}),
+        ('/api/orders/', {}),
+        ('/api/orders/', {'expand': 'enquiry.product'}),
+    ]
+
+    def test_fast_path_is_byte_identical(self):
+        for serializer_class in (ProductSerializer, OrderSerializer):
+            self.assertIsNotNone(get_row_encoder(serializer_class()))
+        for index in range(3):
+            self.create_trade(index, assign_transporter=index != 1)
+        Product.objects.filter(pickup_location='Warehouse 2').update(pickup_place=None)
+        for url, params in self.REQUESTS:
+            with self.subTest(url=url, params=params):
+                fast = self.client.get(url, params)
+                get_catalog_cache().clear()
+                with mock.patch.object(views.ProductViewSet, 'fast_list', False), \
+                        mock.patch.object(views.OrderViewSet, 'fast_list', False):
+                    slow = self.client.get(url, params)
+                self.assertEqual(fast.status_code, 200)
+                self.assertEqual(fast.content, slow.content)
+
+        self.client.force_authenticate(self.transporter)
+        fast = self.client.get('/api/orders/available_jobs/')
+        with mock.patch.object(views.OrderViewSet, 'fast_list', False):
+            self.assertEqual(fast.content, self.client.get('/api/orders/available_jobs/').content)
+        self.assertEqual(len(fast.data['results']), 1)
+
+    def test_encoder_cache_keyed_on_rendered_fields(self):
+        serializers._ROW_ENCODERS.clear()
+        for fields in ('id,price', 'price,id', 'id,price,nope', 'id,,price,price.x'):
+            get_row_encoder(ProductSerializer(fields=fields))
+        self.assertEqual(len(serializers._ROW_ENCODERS), 1)
+        with mock.patch.object(serializers, 'ROW_ENCODER_CACHE_SIZE', 2):
+            for fields in ('id', 'price', 'id,quantity'):
+                get_row_encoder(ProductSerializer(fields=fields))
+        self.assertEqual(len(serializers._ROW_ENCODERS), 2)
+
+
+class ConditionalGetTests(MarketplaceFixtureMixin, TestCase):
+    """Catalog endpoints emit version-based ETags (and Last-Modified on details) and answer revalidation with 304"""
+
+    def revalidate(self, url, etag, params=None):
+        return self.client.get(url, params or {}, HTTP_IF_NONE_MATCH=etag)
+
+    def test_collection_validators(self):
+        product = self.create_trade(0)
+        self.create_trade(1)
+        first = self.client.get('/api/products/')
+        etag = first['ETag']
+        with self.assertNumQueries(1):
+            cached = self.revalidate('/api/products/', etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+        self.assertEqual(self.revalidate('/api/products/', etag, {'commodity_type': 'Biomass'}).status_code, 200)
+
+        product.price = Decimal('1600.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        changed = self.revalidate('/api/products/', etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+        etag = changed['ETag']
+        self.seller.first_name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seller.save()
+        self.assertEqual(self.revalidate('/api/products/', etag).status_code, 200)
+
+        etag = self.client.get('/api/products/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(self.revalidate('/api/products/', etag).status_code, 200)
+
+    def test_register_fills_profile_through_save(self):
+        payload = {
+            'email': 'mill@tivra.test', 'username': 'mill', 'password': 'pass1234', 'role': 'Seller',
+            'gst_number': '27ABCDE1234F1Z5', 'kyc_document': 'kyc.pdf', 'location': ' Nashik ', 'contact_info': '9800000000',
+        }
+        with mock.patch.object(signals, 'bump_version') as bump, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/auth/register/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        profile = User.objects.get(email='mill@tivra.test').profile
+        self.assertEqual((profile.gst_number, profile.place.normalized_name), ('27ABCDE1234F1Z5', 'nashik'))
+        # Twice while the user (and its empty profile) is created, once when it is filled
+        self.assertEqual(bump.call_args_list.count(mock.call(PROFILES_NAMESPACE)), 3)
+
+    def test_detail_and_other_endpoints(self):
+        product = self.create_trade(0)
+        url = f'/api/products/{product.id}/'
+        first = self.client.get(url)
+        etag = first['ETag']
+        self.assertEqual(self.revalidate(url, etag).status_code, 304)
+        get_catalog_cache().clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+        self.assertEqual(self.client.get('/api/products/999999/').status_code, 404)
+
+        for url in ('/api/profiles/', '/api/routes/'):
+            etag = self.client.get(url)['ETag']
+            # One version lookup, however many rows the collection holds
+            with self.assertNumQueries(1):
+                self.assertEqual(self.revalidate(url, etag).status_code, 304)
+        route = Route.objects.get(transporter=self.transporter)
+        route.destination = 'Nagpur'
+        with self.captureOnCommitCallbacks(execute=True):
+            route.save()
+        self.assertEqual(self.revalidate('/api/routes/', etag).status_code, 200)
+
+
+class CatalogCacheTests(MarketplaceFixtureMixin, TestCase):
+    """Catalog responses are cached per normalized query and invalidated by version bumps"""
+
+    def test_hits_and_invalidation(self):
+        product = self.create_trade(0)
+        first = self.client.get('/api/products/', {'commodity_type': 'Biomass', 'min_price': 100})
+        with self.assertNumQueries(1):
+            hit = self.client.get('/api/products/?min_price=100&commodity_type=Biomass')
+        self.assertEqual(hit.content, first.content)
+        self.assertEqual(hit['ETag'], first['ETag'])
+        with self.assertNumQueries(1):
+            revalidated = self.client.get('/api/products/?commodity_type=Biomass&min_price=100', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+        version = get_catalog_cache().get_version('catalog')
+        with self.captureOnCommitCallbacks(execute=True):
+            product_utils.update_product(product.id, {'quantity': 99})
+            # Not before commit: a racing request would cache the old row under the new version
+            self.assertEqual(get_catalog_cache().get_version('catalog'), version)
+        self.assertEqual(self.client.get(f'/api/products/{product.id}/').data['quantity'], 99)
+
+        profile = self.seller.profile
+        profile.rating = 4.5
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual(self.client.get(f'/api/products/{product.id}/').data['seller']['profile']['rating'], 4.5)
+
+        etag = self.client.get('/api/products/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            update_last_login(None, self.seller)
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product_utils.delete_product(product.id)
+        self.assertEqual(self.client.get('/api/products/').data['results'], [])
+
+    def test_local_lru_eviction_and_ttl(self):
+        from .cache import LocalLRUCache
+        cache = LocalLRUCache(max_entries=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+        expired = LocalLRUCache(ttl=-1)
+        expired.set('a', 1)
+        self.assertIsNone(expired.get('a'))
+        cache.bump_version('test')
+        cache.bump_version('test')
+        self.assertEqual(cache.get_version('test'), 2)
+
+
+class BulkWriteTests(MarketplaceFixtureMixin, TestCase):
+    """Bulk endpoints validate every item, insert in one transaction and replay the save side effects"""
+
+    def product_payload(self, index, **overrides):
+        payload = {
+            'commodity_type': 'Briquettes', 'quantity': 20 + index, 'price': '900.00', 'unit_of_measure': 'ton',
+            'availability_dates': '2025-03-01,2025-04-01', 'pickup_location': 'Nashik' if index % 2 else ' nashik ',
+        }
+        payload.update(overrides)
+        return payload
+
+    def test_bulk_products(self):
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.client.get('/api/products/').data['results'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/products/bulk/', [self.product_payload(index) for index in range(3)], format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.data['created'], 3)
+        products = Product.objects.filter(id__in=response.data['ids'])
+        self.assertEqual({product.seller_id for product in products}, {self.seller.id})
+        self.assertEqual(Location.objects.filter(normalized_name='nashik').count(), 1)
+        self.assertFalse(products.filter(pickup_place__isnull=True).exists())
+        self.assertEqual(product_utils.search_products('briquettes').count(), 3)
+        self.assertEqual(len(self.client.get('/api/products/').data['results']), 3)
+
+        invalid = [self.product_payload(0), self.product_payload(1, price='cheap'), self.product_payload(2, quantity=None)]
+        response = self.client.post('/api/products/bulk/', invalid, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertEqual(Product.objects.count(), 3)
+
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.post('/api/products/bulk/', [self.product_payload(0)], format='json').status_code, 403)
+
+    def test_bulk_enquiries_and_messages_scale_with_batch(self):
+        product = self.create_trade(0)
+        self.client.force_authenticate(self.buyer)
+        items = lambda count: [{'product_id': product.id, 'quantity': 1 + index, 'offered_price': '1300.00'} for index in range(count)]
+        query_counts = []
+        for count in (2, 10):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post('/api/enquiries/bulk/', items(count), format='json')
+            self.assertEqual(response.status_code, 201, response.content)
+            query_counts.append(len(ctx.captured_queries))
+        self.assertEqual(query_counts[0], query_counts[1])
+        self.assertEqual(Enquiry.objects.filter(buyer=self.buyer).count(), 13)
+        self.assertEqual(dashboard_utils.get_dashboard_stats(self.buyer.id, 'Buyer')['enquiries_pending']['count'], 13)
+
+        response = self.client.post('/api/enquiries/bulk/', items(1) + [{'product_id': 999999, 'quantity': 1}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+
+        enquiry = Enquiry.objects.filter(buyer=self.buyer).latest('id')
+        response = self.client.post('/api/messages/bulk/', [{'enquiry': enquiry.id, 'content': f'Lot {index} ready?'} for index in range(4)], format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Message.objects.filter(sender=self.buyer, enquiry=enquiry).count(), 4)
+        self.assertEqual(message_utils.search_messages('ready').count(), 4)
+
+    def test_single_create_stamps_owner(self):
+        product = self.create_trade(0)
+        self.client.force_authenticate(self.buyer)
+        response = self.client.post('/api/enquiries/', {'product_id': product.id, 'quantity': 3, 'offered_price': '1200.00'}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Enquiry.objects.get(id=response.data['id']).buyer, self.buyer)
+
+
+class ProductImportTests(MarketplaceFixtureMixin, TestCase):
+    """Sheet imports validate row by row, insert in chunks and report failures by line number"""
+
+    SHEET = (
+        'Category,Quantity,Price,Unit,Availability,Location\n'
+        'Biomass,10,1200.00,ton,"2025-01-01,2025-02-01",Nashik\n'
+        'Briquettes,cheap,900.00,ton,2025-03-01,Pune\n'
+        '\n'
+        'Biodiesel,5,3000.00,litre,2025-03-01,Nashik\n'
+        'Biomass,7,1100.00,ton,2025-03-01,\n'
+    )
+
+    def rows(self, sheet=None):
+        return import_utils.iter_product_rows(io.BytesIO((sheet or self.SHEET).encode()), 'products.csv')
+
+    def test_chunked_import_reports_bad_rows(self):
+        report = import_utils.import_products(self.rows(), self.seller, chunk_size=2)
+        self.assertEqual((report['rows'], report['created'], report['failed']), (4, 2, 2))
+        self.assertEqual([error['row'] for error in report['errors']], [3, 6])
+        self.assertIn('quantity', report['errors'][0]['errors'])
+        self.assertIn('pickup_location', report['errors'][1]['errors'])
+        products = Product.objects.filter(seller=self.seller)
+        self.assertEqual(sorted(products.values_list('commodity_type', flat=True)), ['Biodiesel', 'Biomass'])
+        self.assertFalse(products.filter(pickup_place__isnull=True).exists())
+        self.assertEqual(product_utils.search_products('biodiesel').count(), 1)
+
+        report = import_utils.import_products(self.rows(), self.seller, max_errors=1)
+        self.assertEqual((len(report['errors']), report['errors_truncated']), (1, True))
+
+    def test_atomic_and_dry_run_write_nothing(self):
+        report = import_utils.import_products(self.rows(), self.seller, chunk_size=1, atomic=True)
+        self.assertEqual((report['created'], report['failed']), (0, 2))
+        report = import_utils.import_products(self.rows(), self.seller, dry_run=True)
+        self.assertEqual((report['created'], report['failed']), (0, 2))
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Location.objects.exists())
+
+    def test_import_endpoint(self):
+        upload = lambda: SimpleUploadedFile('products.csv', self.SHEET.encode(), content_type='text/csv')
+        self.client.force_authenticate(self.seller)
+        response = self.client.post('/api/products/import/', {'file': upload(), 'dry_run': 'true'}, format='multipart')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['failed'], 2)
+        response = self.client.post('/api/products/import/', {'file': upload()}, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Product.objects.filter(seller=self.seller).count(), 2)
+        self.assertEqual(self.client.post('/api/products/import/', {}, format='multipart').status_code, 400)
+
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.post('/api/products/import/', {'file': upload()}, format='multipart').status_code, 403)
+
+
+class StreamingExportTests(MarketplaceFixtureMixin, TestCase):
+    """Exports stream every matching row as CSV or JSON lines, in the API's representation"""
+
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, getattr(response, 'content', b''))
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export_with_date_range(self):
+        for index in range(3):
+            self.create_trade(index)
+        Transaction.objects.filter(invoice_number='INV-0').update(created_at=datetime.datetime(2024, 6, 1, 12, tzinfo=datetime.timezone.utc))
+
+        rows = list(csv.DictReader(io.StringIO(self.export('/api/transactions/export/'))))
+        self.assertEqual([row['invoice_number'] for row in rows], ['INV-0', 'INV-1', 'INV-2'])
+        self.assertEqual(rows[0]['order.enquiry.buyer.email'], 'buyer@tivra.test')
+        self.assertEqual(rows[0]['amount'], '7000.00')
+
+        rows = list(csv.DictReader(io.StringIO(self.export('/api/transactions/export/', start_date='2025-01-01'))))
+        self.assertEqual([row['invoice_number'] for row in rows], ['INV-1', 'INV-2'])
+        rows = list(csv.DictReader(io.StringIO(self.export('/api/transactions/export/', end_date='2024-06-01'))))
+        self.assertEqual([row['invoice_number'] for row in rows], ['INV-0'])
+
+        content = self.export('/api/transactions/export/', fields='id,amount')
+        self.assertEqual(content.splitlines()[0], 'id,amount')
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(self.export('/api/orders/export/'))))), 3)
+
+    def test_jsonl_export_matches_api(self):
+        self.create_trade(0)
+        self.create_trade(1)
+        lines = [json.loads(line) for line in self.export('/api/audit-logs/export/', output='jsonl').splitlines()]
+        listed = self.client.get('/api/audit-logs/').json()['results']
+        self.assertEqual(sorted(lines, key=lambda row: row['id']), sorted(listed, key=lambda row: row['id']))
+
+    def test_export_rejects_bad_requests(self):
+        self.assertEqual(self.client.get('/api/transactions/export/', {'output': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/transactions/export/', {'start_date': 'yesterday'}).status_code, 400)
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.client.get('/api/transactions/export/').status_code, 403)
+
+
+class AuditWriterTests(MarketplaceFixtureMixin, TestCase):
+    """Writes through the API are audited after commit; the queue batches them off the request thread"""
+
+    @override_settings(AUDIT_LOG={'ASYNC': False})
+    def test_mutations_are_audited(self):
+        self.client.force_authenticate(self.seller)
+        payload = {
+            'commodity_type': 'Biomass', 'quantity': 5, 'price': '1000.00', 'unit_of_measure': 'ton',
+            'availability_dates': '2025-03-01', 'pickup_location': 'Pune',
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            product_id = self.client.post('/api/products/', payload, format='json').data['id']
+            self.client.patch(f'/api/products/{product_id}/', {'quantity': 6}, format='json')
+            self.client.get('/api/products/')
+            self.client.post('/api/products/', {}, format='json')
+        logs = AuditLog.objects.filter(user=self.seller).order_by('id')
+        self.assertEqual([log.action for log in logs], [f'create product {product_id}', f'update product {product_id}'])
+        self.assertEqual(logs[1].details, {'method': 'PATCH', 'path': f'/api/products/{product_id}/', 'status': 200})
+
+    def test_queue_batches_and_applies_backpressure(self):
+        written, started, release = [], threading.Event(), threading.Event()
+
+        def writer(entries):
+            if threading.current_thread().name == 'audit-writer':
+                started.set()
+                release.wait(5)
+            written.append([entry['action'] for entry in entries])
+
+        audit_queue = AuditQueue(batch_size=10, max_size=1, flush_interval=0.01, put_timeout=0.01, writer=writer)
+        entry = lambda index: {'user_id': None, 'action': f'a{index}', 'details': {}}
+        audit_queue.put(entry(0))
+        started.wait(5)
+        audit_queue.put(entry(1))
+        audit_queue.put(entry(2))
+        # The writer thread is stuck, so the producer wrote the queued entry and its own
+        self.assertEqual(written, [['a1', 'a2']])
+        release.set()
+        for index in range(3, 30):
+            audit_queue.put(entry(index))
+        audit_queue.stop()
+        self.assertEqual(sorted(action for batch in written for action in batch), sorted(f'a{index}' for index in range(30)))
+        self.assertTrue(all(len(batch) <= 10 for batch in written))
+
+
+    def test_writer_survives_failed_batches(self):
+        written = []
+
+        def writer(entries):
+            actions = [entry['action'] for entry in entries]
+            if 'bad' in actions:
+                raise ValueError('unserializable details')
+            if 'fatal' in actions:
+                raise SystemExit
+            written.extend(actions)
+
+        audit_queue = AuditQueue(batch_size=1, flush_interval=0.01, writer=writer)
+        entry = lambda action: {'user_id': None, 'action': action, 'details': {}}
+        with self.assertLogs('core.audit', 'ERROR'):
+            for action in ('a0', 'bad', 'a1'):
+                audit_queue.put(entry(action))
+            audit_queue.flush()
+        self.assertTrue(audit_queue._thread.is_alive())
+        # A writer thread that died anyway is restarted by the next put
+        audit_queue.put(entry('fatal'))
+        audit_queue._thread.join(5)
+        audit_queue.put(entry('a2'))
+        audit_queue.stop()
+        self.assertEqual(written, ['a0', 'a1', 'a2'])
+
+class AuditRollupTests(MarketplaceFixtureMixin, TestCase):
+    """Activity summaries read per-day action-type rollups that survive retention"""
+
+    def rollup_rows(self):
+        return set(AuditActionRollup.objects.values_list('user_id', 'day', 'action_type', 'count'))
+
+    def test_rollups_follow_writes_and_rebuild(self):
+        for action in ('create order 1', 'create order 2', ' update product 3', 'login', ''):
+            AuditLog.objects.create(user=self.buyer, action=action, details={})
+        write_audit_entries([{'user_id': self.seller.id, 'action': 'delete product 4', 'details': {}}])
+
+        self.assertEqual(audit_utils.get_user_activity_summary(self.buyer.id), {
+            'user_id': self.buyer.id, 'total_activities': 5,
+            'action_breakdown': {'create': 2, 'update': 1, 'login': 1, 'unknown': 1},
+        })
+        self.assertEqual(audit_utils.get_system_activity_summary()['action_breakdown']['delete'], 1)
+
+        incremental = self.rollup_rows()
+        AuditActionRollup.objects.all().delete()
+        self.assertEqual(audit_utils.rebuild_audit_rollups(), len(incremental))
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_retention_keeps_rollups(self):
+        old = AuditLog.objects.create(user=self.buyer, action='create order 1', details={})
+        AuditLog.objects.create(user=self.buyer, action='create order 2', details={})
+        AuditLog.objects.filter(pk=old.pk).update(timestamp=timezone.now() - datetime.timedelta(days=800))
+
+        result = audit_utils.prune_audit_logs(retention_months=12)
+        self.assertEqual(result['deleted'], 1)
+        self.assertEqual(list(AuditLog.objects.values_list('action', flat=True)), ['create order 2'])
+        self.assertEqual(audit_utils.get_system_activity_summary()['total_activities'], 2)
+        self.assertEqual(partition_utils.add_months(datetime.date(2025, 1, 31), -13), datetime.date(2023, 12, 1))
+
+
+SHARED_TOKEN_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'tokens': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.mkdtemp()},
+}
+
+
+@override_settings(CACHES=SHARED_TOKEN_CACHE, TOKEN_VERSION_CACHE='tokens')
+class TokenClaimsTests(MarketplaceFixtureMixin, TestCase):
+    """Access tokens carry role claims, so authenticated requests skip the User lookup"""
+
+    def setUp(self):
+        super().setUp()
+        caches['tokens'].clear()
+
+    def login(self, user):
+        response = self.client.post('/api/auth/login/', {'email': user.email, 'password': 'pass1234'}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data['token']
+
+    def bearer(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        return client
+
+    def test_claims_authenticate_without_queries(self):
+        self.create_trade(0)
+        token = self.login(self.admin)
+        self.assertEqual(AccessToken(token['access'])['role'], 'Admin')
+        with self.assertNumQueries(ListQueryCountTests.ENDPOINT_QUERIES['/api/orders/']):
+            self.assertEqual(self.bearer(token['access']).get('/api/orders/').status_code, 200)
+        # Tokens minted before the claims existed still authenticate through the database
+        legacy = RefreshToken.for_user(self.admin).access_token
+        self.assertEqual(self.bearer(legacy).get('/api/orders/').status_code, 200)
+
+    def test_role_change_retires_tokens(self):
+        token = self.login(self.seller)
+        self.assertEqual(self.bearer(token['access']).get('/api/products/').status_code, 200)
+        self.seller.role = 'Buyer'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seller.save()
+        self.assertEqual(self.bearer(token['access']).get('/api/products/').status_code, 401)
+
+        response = self.client.post('/api/auth/refresh/', {'refresh': token['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'Buyer')
+        client = self.bearer(response.data['access'])
+        self.assertEqual(client.get('/api/products/').status_code, 200)
+        self.assertEqual(client.post('/api/products/bulk/', [], format='json').status_code, 403)
+
+    def test_cache_miss_reads_version_from_database(self):
+        token = self.login(self.seller)
+        self.seller.role = 'Buyer'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seller.save()
+        caches['tokens'].clear()
+        self.assertEqual(self.bearer(token['access']).get('/api/products/').status_code, 401)
+        self.assertEqual(caches['tokens'].get(f'token_version:{self.seller.pk}'), self.seller.token_version)
+
+    def test_version_published_after_commit(self):
+        token = self.login(self.seller)
+        self.seller.role = 'Buyer'
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.seller.save()
+            # Until the change commits the old version stays published
+            self.assertEqual(self.bearer(token['access']).get('/api/products/').status_code, 200)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.bearer(token['access']).get('/api/products/').status_code, 401)
+
+    def test_password_change_revokes_refresh_tokens(self):
+        token = self.login(self.seller)
+        self.seller.role = 'Buyer'
+        self.seller.save()
+        # A claim change alone keeps the session
+        response = self.client.post('/api/auth/refresh/', {'refresh': token['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        self.seller.set_password('new-pass1234')
+        self.seller.save()
+        response = self.client.post('/api/auth/refresh/', {'refresh': token['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+        legacy = RefreshToken.for_user(self.seller)
+        self.assertEqual(self.client.post('/api/auth/refresh/', {'refresh': str(legacy)}, format='json').status_code, 401)
+        fresh = ClaimsRefreshToken.for_user(self.seller)
+        self.assertEqual(self.client.post('/api/auth/refresh/', {'refresh': str(fresh)}, format='json').status_code, 200)
+
+    @override_settings(TOKEN_VERSION_CACHE='default')
+    def test_per_process_cache_reads_user(self):
+        token = self.login(self.seller)
+        # No signal, no published version: only the database knows
+        User.objects.filter(pk=self.seller.pk).update(role='Buyer')
+        self.assertEqual(self.bearer(token['access']).post('/api/products/bulk/', [], format='json').status_code, 403)
+
+
+class AsyncViewTests(MarketplaceFixtureMixin, TestCase):
+    """The native async endpoints return what the DRF endpoints return"""
+
+    def bearer(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(user).access_token}')
+        return client
+
+    def test_matches_sync_endpoints(self):
+        for index in range(3):
+            self.create_trade(index, assign_transporter=index != 1)
+        cases = [
+            (self.buyer, '/api/products/', '/api/async/products/'),
+            (self.transporter, '/api/orders/available_jobs/', '/api/async/orders/available_jobs/'),
+            (self.seller, '/api/messages/', '/api/async/messages/'),
+        ]
+        for user, sync_url, async_url in cases:
+            with self.subTest(url=async_url):
+                client = self.bearer(user)
+                expected = client.get(sync_url).json()['results']
+                response = client.get(async_url)
+                self.assertEqual(response.status_code, 200, response.content)
+                self.assertEqual(response.json()['results'], expected)
+        self.assertEqual(len(self.bearer(self.transporter).get('/api/async/orders/available_jobs/').json()['results']), 1)
+
+    def test_ordering_matches_sync_endpoints(self):
+        products = [self.create_trade(index) for index in range(3)]
+        for product, price in zip(products, ('1800.00', '1200.00', '1800.00')):
+            Product.objects.filter(pk=product.pk).update(price=Decimal(price))
+        cases = [
+            (self.buyer, '/api/products/', '/api/async/products/', 'price'),
+            (self.buyer, '/api/products/', '/api/async/products/', '-price'),
+            (self.seller, '/api/messages/', '/api/async/messages/', 'timestamp'),
+        ]
+        for user, sync_url, async_url, ordering in cases:
+            with self.subTest(url=async_url, ordering=ordering):
+                client = self.bearer(user)
+                params = {'ordering': ordering, 'page_size': 2}
+                expected = client.get(sync_url, params).json()
+                response = client.get(async_url, params).json()
+                self.assertEqual(response['results'], expected['results'])
+                self.assertEqual(client.get(response['next']).json()['results'], client.get(expected['next']).json()['results'])
+        cheapest = self.bearer(self.buyer).get('/api/async/products/', {'ordering': 'price'}).json()['results'][0]
+        self.assertEqual(cheapest['id'], products[1].id)
+
+    def test_cursor_pages_and_detail(self):
+        products = [self.create_trade(index) for index in range(3)]
+        client = APIClient()
+        seen, url = [], '/api/async/products/?page_size=1'
+        while url:
+            data = client.get(url).json()
+            seen.extend(item['id'] for item in data['results'])
+            url = data['next']
+        self.assertEqual(seen, [product.id for product in reversed(products)])
+
+        response = client.get(f'/api/async/products/{products[0].id}/')
+        self.assertEqual(response.json(), client.get(f'/api/products/{products[0].id}/').json())
+        self.assertEqual(client.get('/api/async/products/999999/').status_code, 404)
+        self.assertEqual(client.get('/api/async/products/', {'seller': 999999}).status_code, 400)
+
+    def test_permissions(self):
+        self.assertEqual(APIClient().get('/api/async/messages/').status_code, 401)
+        self.assertEqual(self.bearer(self.buyer).get('/api/async/orders/available_jobs/').status_code, 403)
+        self.assertEqual(self.bearer(self.buyer).post('/api/async/products/').status_code, 405)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(client.get('/api/async/products/').status_code, 401)
+
+
+class RealtimeEventTests(MarketplaceFixtureMixin, TestCase):
+    """New messages and enquiry status changes are pushed to both participants"""
+
+    def events(self, user):
+        return [(event, data) for channel, (_, event, data) in get_broker()._history if channel == user_channel(user.pk)]
+
+    @override_settings(REALTIME={})
+    def test_participants_receive_events_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = self.create_trade(0)
+            enquiry = product.enquiries.get()
+            # Nothing is published before the transaction commits
+            self.assertEqual(self.events(self.buyer), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            enquiry_utils.respond_to_enquiry(enquiry.id, 'Accepted', 'Deal', sender=self.seller)
+        with self.captureOnCommitCallbacks(execute=True):
+            enquiry_utils.respond_to_enquiry(enquiry.id, 'Accepted')
+
+        expected = ['enquiry.created', 'message.created', 'enquiry.updated', 'message.created']
+        for user in (self.buyer, self.seller):
+            self.assertEqual([event for event, _ in self.events(user)], expected)
+        self.assertEqual(self.events(self.transporter), [])
+        _, update = self.events(self.seller)[2]
+        self.assertEqual((update['status'], update['previous_status']), ('Accepted', 'Pending'))
+        _, reply = self.events(self.buyer)[3]
+        self.assertEqual(reply, self.client.get(f'/api/messages/{reply["id"]}/').json())
+
+    @override_settings(REALTIME={}, AUDIT_LOG={'ASYNC': False})
+    def test_bulk_messages_are_published(self):
+        enquiry = self.create_trade(0).enquiries.get()
+        self.client.force_authenticate(self.buyer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/messages/bulk/', [{'enquiry': enquiry.id, 'content': f'm{i}'} for i in range(2)], format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual([data['content'] for event, data in self.events(self.seller) if event == 'message.created'], ['m0', 'm1'])
+
+    @override_settings(REALTIME={'HEARTBEAT': 0.05})
+    async def test_event_stream(self):
+        self.assertEqual((await AsyncClient().get('/api/events/')).status_code, 401)
+        broker = get_broker()
+        broker.publish(user_channel(self.buyer.pk), 'enquiry.updated', {'id': 1})
+        missed_id = broker._history[-1][1][0]
+        token = ClaimsRefreshToken.for_user(self.buyer).access_token
+        response = await AsyncClient().get(
+            '/api/events/', {'access_token': str(token)}, headers={'Last-Event-ID': str(int(missed_id) - 1)},
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        frames = aiter(response.streaming_content)
+        self.assertEqual(await anext(frames), b'retry: 3000\n\n')
+        self.assertEqual(await anext(frames), f'id: {missed_id}\nevent: enquiry.updated\ndata: {{"id": 1}}\n\n'.encode())
+        self.assertEqual(await anext(frames), b': keep-alive\n\n')
+        broker.publish(user_channel(self.seller.pk), 'enquiry.updated', {'id': 2})
+        broker.publish(user_channel(self.buyer.pk), 'message.created', {'id': 3})
+        self.assertIn(b'event: message.created\ndata: {"id": 3}', await anext(frames))
+        await frames.aclose()
+
+
+class UnreadCounterTests(MarketplaceFixtureMixin, TestCase):
+    """Read watermarks per enquiry and incrementally maintained unread counters"""
+
+    def unread(self, user):
+        self.client.force_authenticate(user)
+        with self.assertNumQueries(1):
+            return self.client.get('/api/messages/unread/').data['unread']
+
+    def test_counters_follow_inserts_reads_and_deletes(self):
+        enquiry = self.create_trade(0).enquiries.get()
+        first = enquiry.messages.get()
+        self.assertEqual((self.unread(self.seller), self.unread(self.buyer)), (1, 0))
+        enquiry_utils.respond_to_enquiry(enquiry.id, 'Negotiating', 'Counter offer?', sender=self.seller)
+        self.client.force_authenticate(self.buyer)
+        self.client.post('/api/messages/bulk/', [{'enquiry': enquiry.id, 'content': f'm{i}'} for i in range(2)], format='json')
+        self.assertEqual((self.unread(self.seller), self.unread(self.buyer)), (3, 1))
+
+        response = self.client.post(f'/api/enquiries/{enquiry.id}/read/', {'message': first.id}, format='json')
+        self.assertEqual(response.data, {'enquiry': enquiry.id, 'last_read_id': first.id, 'unread': 1, 'total_unread': 1})
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.client.post(f'/api/enquiries/{enquiry.id}/read/', {'message': first.id}, format='json').data['unread'], 2)
+        # The watermark never moves back
+        self.client.post(f'/api/enquiries/{enquiry.id}/read/')
+        self.assertEqual(self.client.post(f'/api/enquiries/{enquiry.id}/read/', {'message': first.id}, format='json').data['unread'], 0)
+        self.assertFalse(AuditLog.objects.filter(action__startswith='read').exists())
+
+        self.client.force_authenticate(self.buyer)
+        self.client.post('/api/messages/bulk/', [{'enquiry': enquiry.id, 'content': 'm2'}], format='json')
+        Message.objects.filter(content='m0').delete()
+        self.assertEqual(self.unread(self.seller), 1)
+        self.assertEqual(self.client.get('/api/messages/unread/', {'by_enquiry': 'true'}).data['enquiries'], {enquiry.id: 1})
+        message_utils.rebuild_unread_counters()
+        self.assertEqual(self.unread(self.seller), 1)
+        enquiry.delete()
+        self.assertEqual(self.unread(self.seller), 0)
+
+    def test_only_participants_mark_read(self):
+        enquiry = self.create_trade(0).enquiries.get()
+        self.client.force_authenticate(create_user('other@tivra.test', 'Buyer'))
+        self.assertEqual(self.client.post(f'/api/enquiries/{enquiry.id}/read/').status_code, 403)
+        self.client.force_authenticate(self.transporter)
+        self.assertEqual(self.client.post(f'/api/enquiries/{enquiry.id}/read/').status_code, 403)
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.client.post(f'/api/enquiries/{enquiry.id}/read/', {'message': 'x'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/api/enquiries/999999/read/').status_code, 404)
+        self.assertEqual(self.client.post('/api/enquiries/abc/read/').status_code, 404)
+        # Ids from another thread (or not yet written) would pre-mark later messages read
+        other = self.create_trade(1).enquiries.get().messages.get()
+        self.assertEqual(self.client.post(f'/api/enquiries/{enquiry.id}/read/', {'message': other.id}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(f'/api/enquiries/{enquiry.id}/read/', {'message': 10 ** 9}, format='json').status_code, 400)
+        state = message_utils.mark_enquiry_read(self.seller.pk, enquiry.id, 10 ** 9)
+        self.assertEqual(state.last_read_id, enquiry.messages.get().id)
+        Message.objects.create(enquiry=enquiry, sender=self.buyer, content='Any update?')
+        self.assertEqual(message_utils.get_unread_counts_by_enquiry(self.seller.pk)[enquiry.id], 1)
+
+
+class InboxTests(MarketplaceFixtureMixin, TestCase):
+    """One inbox row per enquiry thread, from denormalized last-message columns"""
+
+    def inbox(self, user, **params):
+        self.client.force_authenticate(user)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/inbox/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_threads_ordered_by_last_activity(self):
+        enquiries = [self.create_trade(index).enquiries.get() for index in range(3)]
+        quiet = Enquiry.objects.create(buyer=self.buyer, product=enquiries[0].product, quantity=1)
+        self.assertEqual([row['enquiry']['id'] for row in self.inbox(self.seller)['results']],
+                         [quiet.id] + [enquiry.id for enquiry in reversed(enquiries)])
+
+        reply = Message.objects.create(enquiry=enquiries[0], sender=self.seller, content='Yes, still available')
+        rows = self.inbox(self.buyer)['results']
+        self.assertEqual(rows[0]['enquiry']['id'], enquiries[0].id)
+        self.assertEqual(rows[0]['enquiry']['last_message']['content'], 'Yes, still available')
+        self.assertEqual((rows[0]['unread_count'], rows[-1]['unread_count']), (1, 0))
+        self.assertIsNone(next(row for row in rows if row['enquiry']['id'] == quiet.id)['enquiry']['last_message'])
+
+        seen, cursor = [], None
+        while True:
+            data = self.inbox(self.buyer, page_size=2, **({'cursor': cursor} if cursor else {}))
+            seen.extend(row['enquiry']['id'] for row in data['results'])
+            if not data['next']:
+                break
+            cursor = parse_qs(urlparse(data['next']).query)['cursor'][0]
+        self.assertEqual(seen, [row['enquiry']['id'] for row in rows])
+
+        reply.delete()
+        enquiries[0].refresh_from_db()
+        first = enquiries[0].messages.get()
+        self.assertEqual((enquiries[0].last_message_id, enquiries[0].last_activity_at), (first.id, first.timestamp))
+        # The thread drops back to where its remaining activity puts it
+        self.assertEqual([row['enquiry']['id'] for row in self.inbox(self.buyer)['results']],
+                         [quiet.id] + [enquiry.id for enquiry in reversed(enquiries)])
+        first.delete()
+        state = EnquiryReadState.objects.get(user=self.buyer, enquiry=enquiries[0])
+        self.assertEqual(state.last_activity_at, enquiries[0].created_at)
+        self.client.force_authenticate(self.transporter)
+        self.assertEqual(self.client.get('/api/inbox/').status_code, 403)
+
+
+class CursorPaginationTests(MarketplaceFixtureMixin, TestCase):
+    """List endpoints page by keyset cursor, newest first, without OFFSET scans"""
+
+    def test_pages_cover_every_row_once(self):
+        products = [self.create_trade(index) for index in range(5)]
+        seen, url = [], '/api/products/?page_size=2'
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertNotIn('OFFSET', ctx.captured_queries[-1]['sql'].upper())
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [product.id for product in reversed(products)])
+
+    def test_repeated_sort_values_page_by_id(self):
+        products = [self.create_trade(index) for index in range(5)]
+        seen, url = [], '/api/products/?ordering=commodity_type&page_size=2'
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertNotIn('OFFSET', ctx.captured_queries[-1]['sql'].upper())
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, sorted(product.id for product in products))
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual([item['id'] for item in previous.data['results']], seen[-3:-1])
+
+    def test_orderings_are_whitelisted(self):
+        from rest_framework.filters import OrderingFilter
+        from tivra_backend.urls import router
+        for prefix, viewset, basename in router.registry:
+            if OrderingFilter in viewset.filter_backends:
+                with self.subTest(viewset=viewset.__name__):
+                    self.assertIsNotNone(getattr(viewset, 'ordering_fields', None))
+        self.create_trade(0)
+        self.create_trade(1)
+        newest_first = list(Transaction.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        response = self.client.get('/api/transactions/', {'ordering': 'amount'})
+        self.assertEqual([item['id'] for item in response.data['results']], newest_first)
+
+    def test_timestamp_ordered_endpoints(self):
+        for index in range(3):
+            self.create_trade(index)
+        for url in ('/api/messages/', '/api/audit-logs/'):
+            with self.subTest(url=url):
+                response = self.client.get(url, {'page_size': 2})
+                self.assertEqual(len(response.data['results']), 2)
+                self.assertIsNotNone(response.data['next'])
+
+
+class BenchmarkCommandTests(TestCase):
+    """benchmark_indexes never touches a database it was not pointed at"""
+
+    def test_refuses_default_database_without_debug(self):
+        with self.assertRaisesMessage(CommandError, '--database'):
+            call_command('benchmark_indexes', rows=10)
+        with self.assertRaisesMessage(CommandError, 'Unknown database alias'):
+            call_command('benchmark_indexes', rows=10, database='scratch')
+        self.assertFalse(User.objects.filter(email__endswith='@bench.tivra.local').exists())
+
+
+class ListFilterTests(MarketplaceFixtureMixin, TestCase):
+    """Listing filters and ordering run in SQL"""
+
+    def ids(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item['id'] for item in response.data['results']]
+
+    def test_product_filters_and_ordering(self):
+        cheap = self.create_trade(0)
+        pricey = self.create_trade(1)
+        Product.objects.filter(pk=pricey.pk).update(price=Decimal('9000.00'), commodity_type='Briquettes')
+        self.assertEqual(self.ids('/api/products/', {'min_price': 5000}), [pricey.id])
+        self.assertEqual(self.ids('/api/products/', {'commodity_type': 'Biomass'}), [cheap.id])
+        self.assertEqual(self.ids('/api/products/', {'location': 'warehouse 1'}), [pricey.id])
+        self.assertEqual(self.ids('/api/products/', {'ordering': 'price'}), [cheap.id, pricey.id])
+
+    def test_order_filters(self):
+        self.create_trade(0)
+        self.create_trade(1, assign_transporter=False)
+        assigned = Order.objects.get(transporter=self.transporter)
+        open_job = Order.objects.get(transporter__isnull=True)
+        self.assertEqual(self.ids('/api/orders/', {'transporter': self.transporter.id}), [assigned.id])
+        self.assertEqual(self.ids('/api/orders/', {'available': 'true'}), [open_job.id])
+        self.assertEqual(len(self.ids('/api/orders/', {'seller': self.seller.id})), 2)
+        self.assertEqual(self.ids('/api/orders/', {'buyer': self.seller.id}), [])
+
+    def test_enquiry_and_message_filters(self):
+        product = self.create_trade(0)
+        enquiry = product.enquiries.get()
+        self.assertEqual(self.ids('/api/enquiries/', {'seller': self.seller.id, 'status': 'Pending'}), [enquiry.id])
+        self.assertEqual(self.ids('/api/enquiries/', {'status': 'Accepted'}), [])
+        self.assertEqual(len(self.ids('/api/messages/', {'user': self.seller.id})), 1)
+        self.assertEqual(self.ids('/api/messages/', {'user': self.transporter.id}), [])
+
+    def test_full_text_query_param(self):
+        first = self.create_trade(0)
+        second = self.create_trade(1)
+        self.assertEqual(self.ids('/api/products/', {'q': 'warehouse 1'}), [second.id])
+        self.assertEqual(self.ids('/api/products/', {'q': 'biomass', 'location': 'warehouse 0'}), [first.id])
+        self.assertEqual(self.ids('/api/messages/', {'q': 'lot 0'}), [Message.objects.get(enquiry__product=first).id])
+        self.assertEqual(self.ids('/api/orders/', {'q': 'biomass'}), list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+        self.assertEqual(self.ids('/api/enquiries/', {'q': 'pending nothing'}), [])
+        self.client.force_authenticate(self.transporter)
+        open_job = Order.objects.get(enquiry__product=self.create_trade(2, assign_transporter=False))
+        self.assertEqual(self.ids('/api/orders/available_jobs/', {'q': 'warehouse 2'}), [open_job.id])
+        self.assertEqual(self.ids('/api/orders/available_jobs/', {'q': 'warehouse 0'}), [])
+
+
+class StatsQueryTests(MarketplaceFixtureMixin, TestCase):
+    """Each *_stats helper computes all of its buckets in one query"""
+
+    def test_stats_run_single_query(self):
+        self.create_trade(0)
+        self.create_trade(1, assign_transporter=False)
+        Order.objects.filter(transporter=self.transporter).update(status='In Transit')
+        calls = [
+            (order_utils.get_order_stats, ()),
+            (order_utils.get_buyer_order_stats, (self.buyer.id,)),
+            (order_utils.get_seller_order_stats, (self.seller.id,)),
+            (order_utils.get_transporter_order_stats, (self.transporter.id,)),
+            (enquiry_utils.get_enquiry_stats, ()),
+            (enquiry_utils.get_seller_enquiry_stats, (self.seller.id,)),
+            (user_utils.get_user_stats, ()),
+            (product_utils.get_product_stats, ()),
+            (transaction_utils.get_transaction_stats, ()),
+        ]
+        for function, args in calls:
+            with self.subTest(function=function.__name__), self.assertNumQueries(1):
+                function(*args)
+
+    def test_stats_values(self):
+        self.create_trade(0)
+        self.create_trade(1, assign_transporter=False)
+        Order.objects.filter(transporter=self.transporter).update(status='In Transit')
+        self.assertEqual(order_utils.get_order_stats(), {
+            'total_orders': 2,
+            'requested_orders': 1,
+            'picked_orders': 0,
+            'in_transit_orders': 1,
+            'delivered_orders': 0,
+            'available_jobs': 1,
+        })
+        user_stats = user_utils.get_user_stats()
+        self.assertEqual(user_stats['total_users'], 4)
+        self.assertEqual(user_stats['role_stats'], {'Buyer': 1, 'Seller': 1, 'Transporter': 1, 'Admin': 1})
+        product_stats = product_utils.get_product_stats()
+        self.assertEqual(product_stats['commodity_stats'], {'Biomass': 2, 'Briquettes': 0, 'Biodiesel': 0})
+        self.assertEqual(product_stats['total_sellers'], 1)
+        enquiry_stats = enquiry_utils.get_buyer_enquiry_stats(self.buyer.id)
+        self.assertEqual(enquiry_stats['pending_enquiries'], 2)
+        self.assertEqual(enquiry_stats['average_offered_price'], Decimal('1400.00'))
+
+
+class DashboardRollupTests(MarketplaceFixtureMixin, TestCase):
+    """Rollups follow saves and deletes and match a full rebuild"""
+
+    def snapshot(self):
+        rows = DashboardRollup.objects.values_list('user_id', 'role', 'metric', 'day', 'count', 'amount')
+        return sorted(rows, key=lambda row: (row[0], row[1], row[2], str(row[3])))
+
+    def test_incremental_rollups_match_rebuild(self):
+        self.create_trade(0)
+        self.create_trade(1, assign_transporter=False)
+        order = Order.objects.get(transporter__isnull=True)
+        order.transporter = self.transporter
+        order.status = 'Picked'
+        order.save()
+        enquiry = Enquiry.objects.first()
+        enquiry.status = 'Accepted'
+        enquiry.save()
+        Transaction.objects.first().delete()
+        self.create_trade(2).delete()
+
+        incremental = [row for row in self.snapshot() if row[4] or row[5]]
+        dashboard_utils.rebuild_dashboard_rollups()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_dashboard_endpoint_reads_totals(self):
+        self.create_trade(0)
+        self.create_trade(1)
+        self.client.force_authenticate(self.seller)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/dashboard/')
+        metrics = response.data['metrics']
+        self.assertEqual(response.data['role'], 'Seller')
+        self.assertEqual(response.data['counts'], {})
+        self.assertEqual(metrics['products']['count'], 2)
+        self.assertEqual(metrics['enquiries']['count'], 2)
+        self.assertEqual(metrics['enquiries_pending']['count'], 2)
+        self.assertEqual(metrics['transactions']['amount'], Decimal('14000.00'))
+
+
+class RouteNetworkTests(MarketplaceFixtureMixin, TestCase):
+
+    def test_network_adjacency_and_degrees(self):
+        other = create_user('fleet@tivra.test', 'Transporter')
+        for transporter, origin, destination in [
+            (self.transporter, 'Nashik', 'Pune'),
+            (self.transporter, 'Nashik', 'Mumbai'),
+            (other, 'Nashik', 'Pune'),
+            (other, 'Pune', 'Satara'),
+        ]:
+            Route.objects.create(transporter=transporter, origin=origin, destination=destination)
+
+        with self.assertNumQueries(1):
+            network = route_utils.get_route_network()
+        self.assertEqual(network['total_routes'], 4)
+        self.assertEqual(network['unique_origins'], 2)
+        self.assertEqual(network['unique_destinations'], 3)
+        self.assertEqual(sorted(network['locations']), ['Mumbai', 'Nashik', 'Pune', 'Satara'])
+        self.assertEqual(network['adjacency']['Nashik'], {'Pune': 2, 'Mumbai': 1})
+        self.assertEqual(network['degrees']['Pune'], {'out': 1, 'in': 2})
+
+        fleet = route_utils.get_transporter_route_network(other.id)
+        self.assertEqual(fleet['total_routes'], 2)
+        self.assertEqual(sorted(fleet['locations']), ['Nashik', 'Pune', 'Satara'])
+
+    def test_common_routes_and_overlap_matrix(self):
+        fleet = [create_user(f'fleet{i}@tivra.test', 'Transporter') for i in range(3)]
+        for transporter, origin, destination in [
+            (fleet[0], 'Nashik', 'Pune'),
+            (fleet[0], 'Nashik', 'Mumbai'),
+            (fleet[0], 'Nashik', 'Mumbai'),
+            (fleet[1], 'Nashik', 'Pune'),
+            (fleet[1], 'Nashik', 'Mumbai'),
+            (fleet[2], 'Pune', 'Nashik'),
+        ]:
+            Route.objects.create(transporter=transporter, origin=origin, destination=destination)
+
+        common = route_utils.find_common_routes(fleet[0].id, fleet[1].id)
+        self.assertEqual(sorted((r.origin, r.destination) for r in common), [
+            ('Nashik', 'Mumbai'), ('Nashik', 'Mumbai'), ('Nashik', 'Pune'),
+        ])
+        self.assertFalse(route_utils.find_common_routes(fleet[0].id, fleet[2].id).exists())
+
+        ids = [transporter.id for transporter in fleet]
+        with self.assertNumQueries(1):
+            matrix = route_utils.get_route_overlap_matrix(ids)
+        self.assertEqual(matrix[ids[0]], {ids[0]: 2, ids[1]: 2, ids[2]: 0})
+        self.assertEqual(matrix[ids[2]], {ids[0]: 0, ids[1]: 0, ids[2]: 1})
+
+
+class LocationTests(MarketplaceFixtureMixin, TestCase):
+    """Free-text places resolve to canonical Location rows used by location queries"""
+
+    def test_saves_link_canonical_locations(self):
+        product = self.create_trade(0)
+        Route.objects.create(transporter=self.transporter, origin='  warehouse   0 ', destination='Nashik')
+        self.assertEqual(product.pickup_place.normalized_name, 'warehouse 0')
+        self.assertEqual(Route.objects.filter(origin_place=product.pickup_place).count(), 2)
+
+        profile = self.seller.profile
+        profile.location = 'Nashik'
+        profile.save()
+        self.assertEqual(Location.objects.filter(normalized_name='nashik').count(), 1)
+        self.assertEqual(list(user_utils.get_users_by_location('nash')), [self.seller])
+
+    def test_migration_backfills_links(self):
+        from django.apps import apps
+        backfill = import_module('core.migrations.0007_backfill_locations').backfill_locations
+        products = [self.create_trade(index) for index in range(2)]
+        Product.objects.filter(pk=products[0].pk).update(pickup_location='  WAREHOUSE  0')
+        Product.objects.update(pickup_place=None)
+        Route.objects.update(origin_place=None, destination_place=None)
+        Location.objects.all().delete()
+        with self.assertNumQueries(9):
+            backfill(apps, mock.Mock(connection=connection))
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual(product.pickup_place.normalized_name, ' '.join(product.pickup_location.split()).lower())
+        self.assertFalse(Route.objects.filter(origin_place__isnull=True).exists())
+
+    def test_location_queries(self):
+        products = [self.create_trade(index) for index in range(3)]
+        self.assertEqual(list(product_utils.get_products_by_location('WAREHOUSE 2')), [products[2]])
+        self.assertEqual(route_utils.get_routes_by_location('pune').count(), 3)
+        self.assertEqual(route_utils.get_route_suggestions('warehouse 1', 'nowhere').count(), 1)
+
+    def test_fuzzy_lookup_without_trigram_index(self):
+        for name in ['Nashik', 'Nagpur', 'Pune']:
+            location_utils.get_location(name)
+        matches = location_utils.find_similar_locations('Nasik')
+        self.assertEqual(matches[0].name, 'Nashik')
+        self.assertNotIn('Pune', [location.name for location in matches])
+        self.assertEqual(location_utils.trigram_similarity('nashik', 'Nashik'), 1.0)
+
+
+class GeoSearchTests(MarketplaceFixtureMixin, TestCase):
+    """Radius search over geohash-indexed Location coordinates"""
+
+    CITIES = {'Nashik': (19.9975, 73.7898), 'Pune': (18.5204, 73.8567), 'Mumbai': (19.0760, 72.8777)}
+
+    def setUp(self):
+        super().setUp()
+        self.products = {}
+        for index, (city, (latitude, longitude)) in enumerate(self.CITIES.items()):
+            product = self.create_trade(index)
+            geo_utils.set_location_coordinates(product.pickup_place, latitude, longitude)
+            self.products[city] = product
+
+    def test_geohash_and_distance(self):
+        self.assertEqual(geo_utils.encode_geohash(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertTrue(self.products['Pune'].pickup_place.geohash.startswith('te'))
+        self.assertAlmostEqual(geo_utils.haversine_km(*self.CITIES['Pune'], *self.CITIES['Mumbai']), 120, delta=2)
+
+    def test_products_within_radius(self):
+        nearby = geo_utils.get_products_within_radius(*self.CITIES['Pune'], 130)
+        self.assertEqual([product_id for product_id, _ in nearby], [self.products['Pune'].id, self.products['Mumbai'].id])
+        self.assertEqual(geo_utils.get_routes_within_radius(*self.CITIES['Nashik'], 10).count(), 1)
+
+        response = self.client.get('/api/products/nearby/', {'lat': 18.5204, 'lng': 73.8567, 'radius_km': 130})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([item['id'] for item in results], [self.products['Pune'].id, self.products['Mumbai'].id])
+        self.assertEqual(results[0]['distance_km'], 0)
+        self.assertEqual(self.client.get('/api/products/nearby/', {'lat': 'x'}).status_code, 400)
+
+
+class SearchIndexTests(MarketplaceFixtureMixin, TestCase):
+    """Search documents track their sources and answer the search_* helpers (simple tokenizer on SQLite)"""
+
+    def test_documents_follow_writes(self):
+        product = self.create_trade(0)
+        self.create_trade(1)
+        self.assertEqual(list(product_utils.search_products('warehouse 1')), [Product.objects.get(pickup_location='Warehouse 1')])
+        self.assertEqual(list(message_utils.search_messages('lot 0')), [Message.objects.get(enquiry__product=product)])
+        self.assertEqual(transaction_utils.search_transactions('inv 1').count(), 1)
+
+        self.seller.email = 'mill@tivra.test'
+        self.seller.save()
+        self.assertEqual(order_utils.search_orders('mill').count(), 2)
+        self.assertEqual(order_utils.search_orders('seller@tivra').count(), 0)
+
+        Enquiry.objects.filter(product=product).update(status='Accepted')
+        Enquiry.objects.get(product=product).save()
+        self.assertEqual(enquiry_utils.search_enquiries('accepted').count(), 1)
+
+        product.delete()
+        self.assertFalse(SearchDocument.objects.filter(entity='product', object_id=product.id).exists())
+        self.assertFalse(SearchDocument.objects.filter(entity='order').exclude(object_id__in=Order.objects.values('pk')).exists())
+
+    def test_dependents_reindexed_only_for_embedded_fields(self):
+        product = self.create_trade(0)
+        enquiry = Enquiry.objects.get(product=product)
+        with mock.patch.object(signals, 'reindex_dependents') as reindex:
+            enquiry.status = 'Accepted'
+            enquiry.save()
+            product.price = Decimal('1600.00')
+            product.save(update_fields=['price'])
+            reindex.assert_not_called()
+            product.commodity_type = 'Husk'
+            product.save()
+            reindex.assert_called_once_with(Product, product.pk)
+        self.assertEqual(enquiry_utils.search_enquiries('accepted').count(), 1)
+
+    def test_migration_backfills_existing_rows(self):
+        from django.apps import apps
+        backfill = import_module('core.migrations.0009_search_document').backfill_search_documents
+        self.create_trade(0)
+        expected = set(SearchDocument.objects.values_list('entity', 'object_id', 'title', 'body'))
+        SearchDocument.objects.all().delete()
+        backfill(apps, mock.Mock(connection=connection))
+        self.assertEqual(set(SearchDocument.objects.values_list('entity', 'object_id', 'title', 'body')), expected)
+        self.assertEqual(product_utils.search_products('warehouse 0').count(), 1)
+
+    def test_rebuild_and_endpoint_ranking(self):
+        for index in range(2):
+            self.create_trade(index)
+        Message.objects.create(enquiry=Enquiry.objects.first(), sender=self.seller, content='Biomass moisture report')
+        SearchDocument.objects.all().delete()
+        self.assertEqual(search_utils.rebuild_search_index(), SearchDocument.objects.count())
+
+        response = self.client.get('/api/search/', {'q': 'biomass', 'type': 'product,message'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(set(results), {'product', 'message'})
+        self.assertEqual(len(results['product']), 2)
+        self.assertEqual(results['message'][0]['content'], 'Biomass moisture report')
+        self.assertEqual(self.client.get('/api/search/', {'q': 'x', 'type': 'nope'}).status_code, 400)
+
+    def test_search_follows_viewset_permissions(self):
+        self.create_trade(0)
+        self.client.force_authenticate(self.transporter)
+        response = self.client.get('/api/search/', {'q': 'biomass'})
+        self.assertEqual(set(response.json()['results']), {'product', 'order'})
+        for entity in ('transaction', 'message', 'enquiry'):
+            with self.subTest(entity=entity):
+                self.assertEqual(self.client.get('/api/search/', {'q': 'biomass', 'type': entity}).status_code, 403)
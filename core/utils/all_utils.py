@@ -116,7 +116,11 @@ from .message_utils import (
     get_user_message_stats,
     get_enquiry_message_stats,
     get_conversation_messages,
-    get_unread_messages_count
+    get_unread_messages_count,
+    get_unread_counts_by_enquiry,
+    get_inbox,
+    mark_enquiry_read,
+    rebuild_unread_counters
 )
 
 # Transaction utilities
@@ -182,8 +186,10 @@ from .route_utils import (
     get_routes_by_date_range,
     get_popular_routes,
     get_route_network,
+    build_route_network,
     get_transporter_route_network,
     find_common_routes,
+    get_route_overlap_matrix,
     get_route_suggestions
 )
 
@@ -238,6 +244,7 @@ __all__ = [
     'get_messages_by_user_with_details', 'search_messages', 'get_recent_messages',
     'get_messages_by_date_range', 'get_message_stats', 'get_user_message_stats',
     'get_enquiry_message_stats', 'get_conversation_messages', 'get_unread_messages_count',
+    'get_unread_counts_by_enquiry', 'get_inbox', 'mark_enquiry_read', 'rebuild_unread_counters',
     
     # Transaction functions
     'get_transaction_by_id', 'get_all_transactions', 'get_transaction_by_order',
@@ -267,6 +274,6 @@ __all__ = [
     'get_routes_with_transporter_details', 'get_routes_by_transporter_with_details',
     'search_routes', 'get_route_stats', 'get_transporter_route_stats',
     'get_recent_routes', 'get_routes_by_date_range', 'get_popular_routes',
-    'get_route_network', 'get_transporter_route_network', 'find_common_routes',
-    'get_route_suggestions'
+    'get_route_network', 'build_route_network', 'get_transporter_route_network', 'find_common_routes',
+    'get_route_overlap_matrix', 'get_route_suggestions'
 ] 
\ No newline at end of file
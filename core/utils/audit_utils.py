@@ -1,6 +1,14 @@
-from django.db.models import Q, Count
-from typing import Optional, List, Dict, Any
-from ..models import AuditLog, User
+import datetime
+from collections import Counter
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q, Count, F, Sum, Value, Case, When
+from django.db.models.functions import Left, StrIndex, Substr, Trim, TruncDate
+from django.db.models.lookups import Exact, GreaterThan
+from django.utils import timezone
+from typing import Optional, List, Dict, Any, Iterable
+from ..models import AuditLog, AuditActionRollup, User
+from .partition_utils import add_months, drop_partitions_before, ensure_partitions, is_partitioned
+from .stats_utils import aggregate_stats, count_if
 
 def get_audit_log_by_id(audit_log_id: int) -> Optional[AuditLog]:
     """Get audit log by ID"""
@@ -46,74 +54,45 @@ def get_audit_logs_by_date_range(start_date, end_date) -> List[AuditLog]:
 
 def get_audit_log_stats() -> Dict[str, Any]:
     """Get audit log statistics"""
-    total_logs = AuditLog.objects.count()
-    total_users = AuditLog.objects.values('user').distinct().count()
-    total_actions = AuditLog.objects.values('action').distinct().count()
-    
-    return {
-        'total_logs': total_logs,
-        'total_users': total_users,
-        'total_actions': total_actions
-    }
+    return aggregate_stats(
+        AuditLog.objects.all(),
+        total_logs=count_if(),
+        total_users=Count('user', distinct=True),
+        total_actions=Count('action', distinct=True)
+    )
 
 def get_user_audit_stats(user_id: int) -> Dict[str, Any]:
     """Get audit log statistics for a specific user"""
-    logs = AuditLog.objects.filter(user_id=user_id)
-    total_logs = logs.count()
-    unique_actions = logs.values('action').distinct().count()
-    
-    return {
-        'total_logs': total_logs,
-        'unique_actions': unique_actions
-    }
+    return aggregate_stats(
+        AuditLog.objects.filter(user_id=user_id),
+        total_logs=count_if(),
+        unique_actions=Count('action', distinct=True)
+    )
 
 def get_action_audit_stats(action: str) -> Dict[str, Any]:
     """Get audit log statistics for a specific action"""
-    logs = AuditLog.objects.filter(action=action)
-    total_logs = logs.count()
-    unique_users = logs.values('user').distinct().count()
-    
-    return {
-        'action': action,
-        'total_logs': total_logs,
-        'unique_users': unique_users
-    }
+    stats = aggregate_stats(
+        AuditLog.objects.filter(action=action),
+        total_logs=count_if(),
+        unique_users=Count('user', distinct=True)
+    )
+    return {'action': action, **stats}
 
 def get_audit_logs_by_action_type(action_type: str) -> List[AuditLog]:
     """Get audit logs by action type (e.g., 'login', 'create', 'update', 'delete')"""
     return AuditLog.objects.filter(action__icontains=action_type)
 
 def get_user_activity_summary(user_id: int) -> Dict[str, Any]:
-    """Get user activity summary from audit logs"""
-    logs = AuditLog.objects.filter(user_id=user_id)
-    total_activities = logs.count()
-    
-    # Group by action type
-    action_counts = {}
-    for log in logs:
-        action = log.action.split()[0] if log.action else 'unknown'  # Get first word of action
-        action_counts[action] = action_counts.get(action, 0) + 1
-    
-    return {
-        'user_id': user_id,
-        'total_activities': total_activities,
-        'action_breakdown': action_counts
-    }
+    """Get user activity summary from the audit rollups"""
+    return _activity_summary(AuditActionRollup.objects.filter(user_id=user_id), user_id=user_id)
 
 def get_system_activity_summary() -> Dict[str, Any]:
-    """Get system-wide activity summary from audit logs"""
-    total_logs = AuditLog.objects.count()
-    
-    # Group by action type
-    action_counts = {}
-    for log in AuditLog.objects.all():
-        action = log.action.split()[0] if log.action else 'unknown'
-        action_counts[action] = action_counts.get(action, 0) + 1
-    
-    return {
-        'total_activities': total_logs,
-        'action_breakdown': action_counts
-    }
+    """Get system-wide activity summary from the audit rollups"""
+    return _activity_summary(AuditActionRollup.objects.all())
+
+def _activity_summary(rollups, **extra) -> Dict[str, Any]:
+    action_counts = dict(rollups.values('action_type').annotate(total=Sum('count')).order_by().values_list('action_type', 'total'))
+    return {**extra, 'total_activities': sum(action_counts.values()), 'action_breakdown': action_counts}
 
 def get_audit_logs_by_details_key(key: str, value: str) -> List[AuditLog]:
     """Get audit logs where details JSON contains specific key-value pair"""
@@ -121,4 +100,74 @@ def get_audit_logs_by_details_key(key: str, value: str) -> List[AuditLog]:
 
 def get_audit_logs_by_details_contains(text: str) -> List[AuditLog]:
     """Get audit logs where details JSON contains specific text"""
-    return AuditLog.objects.filter(details__icontains=text) 
\ No newline at end of file
+    return AuditLog.objects.filter(details__icontains=text)
+
+# Activity summaries read AuditActionRollup: one row per (user, day, action
+# type) kept current as entries are written, so summaries never scan the log
+# and survive the retention that drops old log partitions.
+
+def audit_action_type(action: str) -> str:
+    """First word of an audit action ("create product 12" -> "create")"""
+    return (action or '').strip(' ').split(' ', 1)[0][:50] or 'unknown'
+
+def audit_action_type_expression(field: str = 'action'):
+    """audit_action_type() as a database expression, for grouping in SQL"""
+    trimmed = Trim(field)
+    space = StrIndex(trimmed, Value(' '))
+    return Left(Case(
+        When(Exact(trimmed, Value('')), then=Value('unknown')),
+        When(GreaterThan(space, 0), then=Substr(trimmed, 1, space - 1)),
+        default=trimmed,
+    ), 50)
+
+def apply_audit_rollups(logs: Iterable[AuditLog]) -> None:
+    """Count freshly written audit entries into the daily rollups"""
+    counts = Counter(
+        (log.user_id, timezone.localdate(log.timestamp), audit_action_type(log.action)) for log in logs
+    )
+    for (user_id, day, action_type), count in counts.items():
+        rows = AuditActionRollup.objects.filter(user_id=user_id, day=day, action_type=action_type)
+        if rows.update(count=F('count') + count):
+            continue
+        try:
+            with transaction.atomic():
+                AuditActionRollup.objects.create(user_id=user_id, day=day, action_type=action_type, count=count)
+        except IntegrityError:
+            # Another writer created the row first
+            rows.update(count=F('count') + count)
+
+def rebuild_audit_rollups() -> int:
+    """Recompute the rollups for the days still present in the audit log; returns rows written.
+
+    Days older than the oldest retained entry keep their rollups.
+    """
+    grouped = AuditLog.objects.annotate(
+        day=TruncDate('timestamp'), action_type=audit_action_type_expression()
+    ).values('user_id', 'day', 'action_type').annotate(total=Count('pk')).order_by()
+    rows = [
+        AuditActionRollup(user_id=row['user_id'], day=row['day'], action_type=row['action_type'], count=row['total'])
+        for row in grouped
+    ]
+    with transaction.atomic():
+        if rows:
+            AuditActionRollup.objects.filter(day__gte=min(row.day for row in rows)).delete()
+        AuditActionRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+def prune_audit_logs(retention_months: int, months_ahead: int = 3) -> Dict[str, Any]:
+    """Apply the retention policy: keep retention_months full months plus the current one.
+
+    On a partitioned PostgreSQL table expired months are dropped as whole
+    partitions and upcoming months are created ahead of time; elsewhere
+    expired rows are deleted. Rollups are kept either way.
+    """
+    this_month = timezone.localdate().replace(day=1)
+    cutoff = add_months(this_month, -retention_months)
+    if is_partitioned(connection):
+        with transaction.atomic():
+            created = ensure_partitions(connection, this_month, add_months(this_month, months_ahead))
+            dropped = drop_partitions_before(connection, cutoff)
+        return {'cutoff': cutoff, 'created': created, 'dropped': dropped, 'deleted': None}
+    cutoff_at = timezone.make_aware(datetime.datetime.combine(cutoff, datetime.time.min))
+    deleted, _ = AuditLog.objects.filter(timestamp__lt=cutoff_at).delete()
+    return {'cutoff': cutoff, 'created': [], 'dropped': [], 'deleted': deleted}
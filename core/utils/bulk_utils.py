@@ -0,0 +1,41 @@
+from django.db import transaction
+from typing import List
+from ..cache import bump_catalog_version
+from ..models import Enquiry, Location, Message, Product
+from ..realtime import publish_enquiry_changes, publish_new_messages
+from .dashboard_utils import ROLLUP_SOURCES, apply_bulk_rollups
+from .location_utils import resolve_locations
+from .message_utils import count_new_messages, open_enquiry_threads, touch_enquiry_threads
+from .search_utils import SEARCH_ENTITIES, index_documents
+
+# bulk_create bypasses the model signals in core/signals.py; these helpers do
+# the same work (canonical locations, dashboard rollups, search documents,
+# catalog cache version, inbox threads and unread counters, realtime events)
+# once per batch instead of once per row.
+
+def bulk_create_records(model, objects: List, batch_size: int = 500) -> List:
+    """Insert objects in one transaction and apply the side effects their save signals would have"""
+    if not objects:
+        return []
+    with transaction.atomic():
+        if model is Product:
+            places = resolve_locations(obj.pickup_location for obj in objects)
+            for obj in objects:
+                obj.pickup_place = places.get(Location.normalize(obj.pickup_location))
+        created = model.objects.bulk_create(objects, batch_size=batch_size)
+        ids = [obj.pk for obj in created]
+        if model in ROLLUP_SOURCES:
+            apply_bulk_rollups(model, ids)
+        if model in SEARCH_ENTITIES:
+            index_documents(SEARCH_ENTITIES[model], ids)
+        if model is Message:
+            count_new_messages(created)
+            touch_enquiry_threads(created)
+            publish_new_messages(ids)
+        elif model is Enquiry:
+            open_enquiry_threads(created)
+            publish_enquiry_changes(dict.fromkeys(ids))
+        elif model is Product:
+            # After the outermost commit: a reader in between would cache the old rows under the new version
+            transaction.on_commit(bump_catalog_version)
+    return created
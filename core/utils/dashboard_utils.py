@@ -0,0 +1,163 @@
+from collections import Counter
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import F, Count, Sum
+from django.db.models.functions import TruncDate
+from typing import List, Dict, Any, Tuple
+from ..models import DashboardRollup, Enquiry, Order, Product, Transaction
+
+# Rollup rows are keyed by (user_id, role, metric, day). A contribution is what
+# one Product/Enquiry/Order/Transaction adds to those counters; saves apply the
+# difference between the row's old and new contributions, deletes subtract.
+
+RollupKey = Tuple[int, str, str, Any]
+
+def _status_metric(prefix: str, status: str) -> str:
+    return f"{prefix}_{status.lower().replace(' ', '_')}"
+
+def _product_contributions(row: Dict[str, Any]) -> Dict[RollupKey, Tuple[int, Decimal]]:
+    return {(row['seller_id'], 'Seller', 'products', row['created_at'].date()): (1, Decimal('0'))}
+
+def _enquiry_contributions(row: Dict[str, Any]) -> Dict[RollupKey, Tuple[int, Decimal]]:
+    day = row['created_at'].date()
+    contributions = {}
+    for user_id, role in ((row['buyer_id'], 'Buyer'), (row['product__seller_id'], 'Seller')):
+        contributions[(user_id, role, 'enquiries', day)] = (1, Decimal('0'))
+        contributions[(user_id, role, _status_metric('enquiries', row['status']), day)] = (1, Decimal('0'))
+    return contributions
+
+def _order_contributions(row: Dict[str, Any]) -> Dict[RollupKey, Tuple[int, Decimal]]:
+    day = row['created_at'].date()
+    participants = [(row['enquiry__buyer_id'], 'Buyer'), (row['enquiry__product__seller_id'], 'Seller')]
+    if row['transporter_id']:
+        participants.append((row['transporter_id'], 'Transporter'))
+    contributions = {}
+    for user_id, role in participants:
+        contributions[(user_id, role, 'orders', day)] = (1, Decimal('0'))
+        contributions[(user_id, role, _status_metric('orders', row['status']), day)] = (1, Decimal('0'))
+    return contributions
+
+def _transaction_contributions(row: Dict[str, Any]) -> Dict[RollupKey, Tuple[int, Decimal]]:
+    day = row['created_at'].date()
+    return {
+        (row['order__enquiry__buyer_id'], 'Buyer', 'transactions', day): (1, row['amount']),
+        (row['order__enquiry__product__seller_id'], 'Seller', 'transactions', day): (1, row['amount']),
+    }
+
+ROLLUP_SOURCES = {
+    Product: (['created_at', 'seller_id'], _product_contributions),
+    Enquiry: (['status', 'created_at', 'buyer_id', 'product__seller_id'], _enquiry_contributions),
+    Order: (['status', 'created_at', 'transporter_id', 'enquiry__buyer_id', 'enquiry__product__seller_id'], _order_contributions),
+    Transaction: (['amount', 'created_at', 'order__enquiry__buyer_id', 'order__enquiry__product__seller_id'], _transaction_contributions),
+}
+
+def get_rollup_contributions(model, pk) -> Dict[RollupKey, Tuple[int, Decimal]]:
+    """Read what the stored row for model/pk contributes to the rollups (one query)"""
+    fields, contributions = ROLLUP_SOURCES[model]
+    row = model.objects.filter(pk=pk).values(*fields).first()
+    return contributions(row) if row else {}
+
+def apply_rollup_delta(before: Dict[RollupKey, Tuple[int, Decimal]], after: Dict[RollupKey, Tuple[int, Decimal]], create: bool = True) -> None:
+    """Add (after - before) to the daily and all-time rollup rows"""
+    for key in set(before) | set(after):
+        old_count, old_amount = before.get(key, (0, Decimal('0')))
+        new_count, new_amount = after.get(key, (0, Decimal('0')))
+        count, amount = new_count - old_count, new_amount - old_amount
+        if not count and not amount:
+            continue
+        user_id, role, metric, day = key
+        for bucket_day in (day, None):
+            _bump_rollup(user_id, role, metric, bucket_day, count, amount, create)
+
+def _bump_rollup(user_id: int, role: str, metric: str, day, count: int, amount: Decimal, create: bool) -> None:
+    rows = DashboardRollup.objects.filter(user_id=user_id, role=role, metric=metric, day=day)
+    if rows.update(count=F('count') + count, amount=F('amount') + amount) or not create:
+        return
+    try:
+        with transaction.atomic():
+            DashboardRollup.objects.create(user_id=user_id, role=role, metric=metric, day=day, count=count, amount=amount)
+    except IntegrityError:
+        # Another writer created the row first
+        rows.update(count=F('count') + count, amount=F('amount') + amount)
+
+def apply_bulk_rollups(model, ids) -> None:
+    """Add the contributions of freshly bulk-inserted rows (bulk_create skips the save signals)"""
+    fields, contributions = ROLLUP_SOURCES[model]
+    totals = {}
+    for row in model.objects.filter(pk__in=ids).values(*fields).iterator():
+        for key, (count, amount) in contributions(row).items():
+            old_count, old_amount = totals.get(key, (0, Decimal('0')))
+            totals[key] = (old_count + count, old_amount + amount)
+    apply_rollup_delta({}, totals)
+
+def get_dashboard_stats(user_id: int, role: str) -> Dict[str, Dict[str, Any]]:
+    """Get all-time dashboard counters for a user in one indexed lookup"""
+    rows = DashboardRollup.objects.filter(user_id=user_id, role=role, day__isnull=True).values_list('metric', 'count', 'amount')
+    return {metric: {'count': count, 'amount': amount} for metric, count, amount in rows}
+
+def get_dashboard_counts(user_id: int, role: str) -> Dict[str, int]:
+    """Get the live counts a role's dashboard shows next to its rollups.
+
+    Transporters get the open jobs, counted on the partial available-jobs
+    index (bounded by the jobs still open, not by history); other roles
+    need no query.
+    """
+    if role == 'Transporter':
+        return {'available_jobs': Order.objects.filter(status='Requested', transporter__isnull=True).count()}
+    return {}
+
+def get_dashboard_timeseries(user_id: int, role: str, metric: str, start_date, end_date) -> List[Dict[str, Any]]:
+    """Get daily counters for one dashboard metric within a date range"""
+    return list(
+        DashboardRollup.objects.filter(
+            user_id=user_id, role=role, metric=metric, day__range=[start_date, end_date]
+        ).order_by('day').values('day', 'count', 'amount')
+    )
+
+def rebuild_dashboard_rollups() -> int:
+    """Recompute every rollup row from the source tables; returns the number of rows written"""
+    daily = Counter()
+    amounts = Counter()
+
+    def collect(queryset, user_field, role, metric, status_prefix=None, amount_field=None):
+        values = [user_field, 'day'] + (['status'] if status_prefix else [])
+        annotations = {'total': Count('pk')}
+        if amount_field:
+            annotations['amount_total'] = Sum(amount_field)
+        grouped = queryset.exclude(**{f'{user_field}__isnull': True}).annotate(
+            day=TruncDate('created_at')
+        ).values(*values).annotate(**annotations).order_by()
+        for row in grouped:
+            keys = [(row[user_field], role, metric, row['day'])]
+            if status_prefix:
+                keys.append((row[user_field], role, _status_metric(status_prefix, row['status']), row['day']))
+            for key in keys:
+                daily[key] += row['total']
+                if amount_field:
+                    amounts[key] += row['amount_total'] or Decimal('0')
+
+    collect(Product.objects.all(), 'seller_id', 'Seller', 'products')
+    for user_field, role in (('buyer_id', 'Buyer'), ('product__seller_id', 'Seller')):
+        collect(Enquiry.objects.all(), user_field, role, 'enquiries', status_prefix='enquiries')
+    for user_field, role in (('enquiry__buyer_id', 'Buyer'), ('enquiry__product__seller_id', 'Seller'), ('transporter_id', 'Transporter')):
+        collect(Order.objects.all(), user_field, role, 'orders', status_prefix='orders')
+    for user_field, role in (('order__enquiry__buyer_id', 'Buyer'), ('order__enquiry__product__seller_id', 'Seller')):
+        collect(Transaction.objects.all(), user_field, role, 'transactions', amount_field='amount')
+
+    totals = Counter()
+    total_amounts = Counter()
+    for (user_id, role, metric, day), count in daily.items():
+        totals[(user_id, role, metric, None)] += count
+        total_amounts[(user_id, role, metric, None)] += amounts[(user_id, role, metric, day)]
+
+    rows = []
+    for counts, amount_source in ((daily, amounts), (totals, total_amounts)):
+        for (user_id, role, metric, day), count in counts.items():
+            rows.append(DashboardRollup(
+                user_id=user_id, role=role, metric=metric, day=day,
+                count=count, amount=amount_source[(user_id, role, metric, day)]
+            ))
+    with transaction.atomic():
+        DashboardRollup.objects.all().delete()
+        DashboardRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
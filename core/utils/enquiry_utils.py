@@ -1,6 +1,26 @@
 from django.db.models import Q, Count, Avg
 from typing import Optional, List, Dict, Any
 from ..models import Enquiry, Product, User
+from .search_utils import search_ids
+from .stats_utils import aggregate_stats, count_if
+
+ENQUIRY_STATUS_BUCKETS = {
+    'pending_enquiries': Q(status='Pending'),
+    'accepted_enquiries': Q(status='Accepted'),
+    'rejected_enquiries': Q(status='Rejected'),
+    'negotiating_enquiries': Q(status='Negotiating'),
+}
+
+def _enquiry_status_stats(enquiries) -> Dict[str, Any]:
+    """Total, per-status counts and averages for enquiries in a single query"""
+    buckets = {name: count_if(condition) for name, condition in ENQUIRY_STATUS_BUCKETS.items()}
+    return aggregate_stats(
+        enquiries,
+        total_enquiries=count_if(),
+        **buckets,
+        average_offered_price=Avg('offered_price'),
+        average_quantity=Avg('quantity')
+    )
 
 def get_enquiry_by_id(enquiry_id: int) -> Optional[Enquiry]:
     """Get enquiry by ID"""
@@ -66,76 +86,20 @@ def get_enquiries_by_quantity_range(min_quantity: float, max_quantity: float) ->
     return Enquiry.objects.filter(quantity__gte=min_quantity, quantity__lte=max_quantity)
 
 def search_enquiries(query: str) -> List[Enquiry]:
-    """Search enquiries by buyer email or product commodity type"""
-    return Enquiry.objects.filter(
-        Q(buyer__email__icontains=query) |
-        Q(product__commodity_type__icontains=query)
-    )
+    """Search enquiries by buyer, seller, commodity type or status (full-text index)"""
+    return Enquiry.objects.filter(id__in=search_ids('enquiry', query))
 
 def get_enquiry_stats() -> Dict[str, Any]:
     """Get enquiry statistics"""
-    total_enquiries = Enquiry.objects.count()
-    pending_enquiries = Enquiry.objects.filter(status='Pending').count()
-    accepted_enquiries = Enquiry.objects.filter(status='Accepted').count()
-    rejected_enquiries = Enquiry.objects.filter(status='Rejected').count()
-    negotiating_enquiries = Enquiry.objects.filter(status='Negotiating').count()
-    
-    avg_offered_price = Enquiry.objects.aggregate(avg_price=Avg('offered_price'))
-    avg_quantity = Enquiry.objects.aggregate(avg_quantity=Avg('quantity'))
-    
-    return {
-        'total_enquiries': total_enquiries,
-        'pending_enquiries': pending_enquiries,
-        'accepted_enquiries': accepted_enquiries,
-        'rejected_enquiries': rejected_enquiries,
-        'negotiating_enquiries': negotiating_enquiries,
-        'average_offered_price': avg_offered_price['avg_price'],
-        'average_quantity': avg_quantity['avg_quantity']
-    }
+    return _enquiry_status_stats(Enquiry.objects.all())
 
 def get_buyer_enquiry_stats(buyer_id: int) -> Dict[str, Any]:
     """Get enquiry statistics for a specific buyer"""
-    enquiries = Enquiry.objects.filter(buyer_id=buyer_id)
-    total_enquiries = enquiries.count()
-    pending_enquiries = enquiries.filter(status='Pending').count()
-    accepted_enquiries = enquiries.filter(status='Accepted').count()
-    rejected_enquiries = enquiries.filter(status='Rejected').count()
-    negotiating_enquiries = enquiries.filter(status='Negotiating').count()
-    
-    avg_offered_price = enquiries.aggregate(avg_price=Avg('offered_price'))
-    avg_quantity = enquiries.aggregate(avg_quantity=Avg('quantity'))
-    
-    return {
-        'total_enquiries': total_enquiries,
-        'pending_enquiries': pending_enquiries,
-        'accepted_enquiries': accepted_enquiries,
-        'rejected_enquiries': rejected_enquiries,
-        'negotiating_enquiries': negotiating_enquiries,
-        'average_offered_price': avg_offered_price['avg_price'],
-        'average_quantity': avg_quantity['avg_quantity']
-    }
+    return _enquiry_status_stats(Enquiry.objects.filter(buyer_id=buyer_id))
 
 def get_seller_enquiry_stats(seller_id: int) -> Dict[str, Any]:
     """Get enquiry statistics for a specific seller"""
-    enquiries = Enquiry.objects.filter(product__seller_id=seller_id)
-    total_enquiries = enquiries.count()
-    pending_enquiries = enquiries.filter(status='Pending').count()
-    accepted_enquiries = enquiries.filter(status='Accepted').count()
-    rejected_enquiries = enquiries.filter(status='Rejected').count()
-    negotiating_enquiries = enquiries.filter(status='Negotiating').count()
-    
-    avg_offered_price = enquiries.aggregate(avg_price=Avg('offered_price'))
-    avg_quantity = enquiries.aggregate(avg_quantity=Avg('quantity'))
-    
-    return {
-        'total_enquiries': total_enquiries,
-        'pending_enquiries': pending_enquiries,
-        'accepted_enquiries': accepted_enquiries,
-        'rejected_enquiries': rejected_enquiries,
-        'negotiating_enquiries': negotiating_enquiries,
-        'average_offered_price': avg_offered_price['avg_price'],
-        'average_quantity': avg_quantity['avg_quantity']
-    }
+    return _enquiry_status_stats(Enquiry.objects.filter(product__seller_id=seller_id))
 
 def get_recent_enquiries(limit: int = 10) -> List[Enquiry]:
     """Get most recent enquiries"""
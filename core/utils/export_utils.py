@@ -0,0 +1,109 @@
+import csv
+import datetime
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.serializers import BaseSerializer
+from typing import Iterator, Iterable, Dict, Any, List, Optional
+from ..serializers import get_row_encoder
+
+# Exports stream rows straight from a server-side cursor into the response:
+# only one cursor chunk of rows (plus one output batch) is in memory at a
+# time, however many rows the export covers.
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_BATCH_ROWS = 500
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+
+def parse_export_bound(value: Optional[str], end: bool = False) -> Optional[datetime.datetime]:
+    """Parse a date or ISO datetime query parameter; a bare end date covers the whole day"""
+    if not value:
+        return None
+    try:
+        # Dates first: parse_datetime also accepts a bare date (as midnight)
+        day = parse_date(value)
+        moment = datetime.datetime.combine(day, datetime.time.max if end else datetime.time.min) if day else parse_datetime(value)
+        if moment is None:
+            raise ValueError
+    except ValueError:
+        raise ValueError(f'Invalid date: {value} (use YYYY-MM-DD or an ISO datetime)')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+def export_columns(serializer, prefix: str = '') -> List[str]:
+    """Flat CSV columns for a serializer; nested objects become dotted columns (order.status)"""
+    columns = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, BaseSerializer) and not getattr(field, 'many', False):
+            columns.extend(export_columns(field, f'{prefix}{name}.'))
+        else:
+            columns.append(f'{prefix}{name}')
+    return columns
+
+def export_rows(queryset, serializer, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Serialized rows read through queryset.iterator(chunk_size), in the API's representation.
+
+    Compilable serializers render from .values() rows (no model instances);
+    others fall back to to_representation per instance.
+    """
+    encoder = get_row_encoder(serializer)
+    if encoder is not None:
+        lookups, encode = encoder
+        rows = queryset.select_related(None).prefetch_related(None).values(*lookups)
+        for row in rows.iterator(chunk_size=chunk_size):
+            yield encode(row)
+    else:
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            yield serializer.to_representation(obj)
+
+def _flatten(row: Dict[str, Any], prefix: str = '', into: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    into = {} if into is None else into
+    for name, value in row.items():
+        if isinstance(value, dict):
+            _flatten(value, f'{prefix}{name}.', into)
+        else:
+            into[f'{prefix}{name}'] = value
+    return into
+
+def _cell(value) -> Any:
+    if value is None:
+        return ''
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    return value
+
+class _Echo:
+    """File-like sink that hands csv.writer output straight back"""
+    def write(self, value):
+        return value
+
+def csv_lines(rows: Iterable[Dict[str, Any]], columns: List[str]) -> Iterator[str]:
+    """Header line, then one CSV line per row (nested values flattened to the dotted columns)"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        flat = _flatten(row)
+        yield writer.writerow([_cell(flat.get(column)) for column in columns])
+
+def jsonl_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """One JSON document per line"""
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+def batched(lines: Iterable[str], size: int = EXPORT_BATCH_ROWS) -> Iterator[str]:
+    """Join lines into larger writes so the server is not flushed once per row"""
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
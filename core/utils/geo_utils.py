@@ -0,0 +1,122 @@
+import math
+from django.db.models import Q
+from typing import List, Dict, Tuple
+from ..models import Location, Product, Route, User
+
+EARTH_RADIUS_KM = 6371.0
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+MAX_GEOHASH_PRECISION = 12
+
+def encode_geohash(latitude: float, longitude: float, precision: int = MAX_GEOHASH_PRECISION) -> str:
+    """Encode a coordinate as a geohash string"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, interval = (longitude, lng_range) if even else (latitude, lat_range)
+        middle = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """Height and width in degrees of a geohash cell at precision"""
+    total_bits = 5 * precision
+    lat_bits, lng_bits = total_bits // 2, total_bits - total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two coordinates in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi, d_lambda = math.radians(lat2 - lat1), math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """(min_lat, max_lat, min_lng, max_lng) enclosing a circle of radius_km"""
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    d_lng = 180.0 if cos_lat < 1e-9 else min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return (max(-90.0, latitude - d_lat), min(90.0, latitude + d_lat),
+            max(-180.0, longitude - d_lng), min(180.0, longitude + d_lng))
+
+def covering_geohashes(latitude: float, longitude: float, radius_km: float) -> List[str]:
+    """Geohash prefixes whose cells together cover the bounding box of the circle.
+
+    Picks the finest precision whose cells are at least as large as the box's
+    half-extent, then samples a 3x3 grid over the box: every cell touching the
+    box contains a sample point, so at most nine prefixes are returned.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    half_height, half_width = (max_lat - min_lat) / 2, (max_lng - min_lng) / 2
+    precision = 0
+    for candidate in range(1, MAX_GEOHASH_PRECISION + 1):
+        cell_height, cell_width = geohash_cell_size(candidate)
+        if cell_height < half_height or cell_width < half_width:
+            break
+        precision = candidate
+    if precision == 0:
+        return ['']
+    center_lat, center_lng = (min_lat + max_lat) / 2, (min_lng + max_lng) / 2
+    return sorted({
+        encode_geohash(lat, lng, precision)
+        for lat in (min_lat, center_lat, max_lat)
+        for lng in (min_lng, center_lng, max_lng)
+    })
+
+def set_location_coordinates(location: Location, latitude: float, longitude: float) -> Location:
+    """Store coordinates (and the derived geohash) on a Location"""
+    location.latitude = latitude
+    location.longitude = longitude
+    location.save()
+    return location
+
+def get_locations_within_radius(latitude: float, longitude: float, radius_km: float) -> Dict[int, float]:
+    """Get {location_id: distance_km} for locations within radius_km of a point.
+
+    Candidates come from a geohash prefix scan narrowed by the bounding box;
+    the exact haversine distance is checked in Python.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    cells = Q()
+    for prefix in covering_geohashes(latitude, longitude, radius_km):
+        cells |= Q(geohash__startswith=prefix)
+    candidates = Location.objects.filter(cells).filter(
+        latitude__range=(min_lat, max_lat), longitude__range=(min_lng, max_lng)
+    ).values_list('id', 'latitude', 'longitude')
+
+    distances = {}
+    for location_id, location_lat, location_lng in candidates:
+        distance = haversine_km(latitude, longitude, location_lat, location_lng)
+        if distance <= radius_km:
+            distances[location_id] = distance
+    return distances
+
+def get_products_within_radius(latitude: float, longitude: float, radius_km: float, queryset=None) -> List[Tuple[int, float]]:
+    """Get (product_id, distance_km) pairs for products picked up within radius_km, nearest first"""
+    distances = get_locations_within_radius(latitude, longitude, radius_km)
+    products = (queryset if queryset is not None else Product.objects.all()).filter(pickup_place_id__in=distances)
+    nearby = [(product_id, distances[place_id]) for product_id, place_id in products.values_list('id', 'pickup_place_id')]
+    nearby.sort(key=lambda item: (item[1], item[0]))
+    return nearby
+
+def get_users_within_radius(latitude: float, longitude: float, radius_km: float) -> List[User]:
+    """Get users whose profile location is within radius_km"""
+    distances = get_locations_within_radius(latitude, longitude, radius_km)
+    return User.objects.filter(profile__place_id__in=distances)
+
+def get_routes_within_radius(latitude: float, longitude: float, radius_km: float) -> List[Route]:
+    """Get routes starting or ending within radius_km"""
+    location_ids = list(get_locations_within_radius(latitude, longitude, radius_km))
+    return Route.objects.filter(
+        Q(origin_place_id__in=location_ids) |
+        Q(destination_place_id__in=location_ids)
+    )
@@ -0,0 +1,118 @@
+import csv
+import datetime
+import io
+from contextlib import nullcontext
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from typing import Iterator, Iterable, Tuple, Dict, Any, List
+from ..models import Product, User
+from ..serializers import ProductSerializer
+from .bulk_utils import bulk_create_records
+
+# Spreadsheet imports are streamed: rows are read lazily, validated and
+# inserted one chunk at a time, and the error report is capped, so memory
+# stays bounded however large the file is.
+
+IMPORT_CHUNK_SIZE = 500
+IMPORT_MAX_ERRORS = 1000
+
+# Friendly spreadsheet headers -> Product fields
+IMPORT_COLUMN_ALIASES = {
+    'category': 'commodity_type',
+    'commodity': 'commodity_type',
+    'unit': 'unit_of_measure',
+    'location': 'pickup_location',
+    'availability': 'availability_dates',
+}
+
+class ImportFormatError(ValueError):
+    """The uploaded file cannot be read as a product sheet"""
+
+def _column_name(header) -> str:
+    name = '_'.join(str(header or '').strip().lower().split())
+    return IMPORT_COLUMN_ALIASES.get(name, name)
+
+def iter_csv_rows(fileobj) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (line number, row dict) from a binary CSV file, one row at a time"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if not header:
+            raise ImportFormatError('The file is empty')
+        columns = [_column_name(name) for name in header]
+        for row in reader:
+            if any(cell.strip() for cell in row):
+                yield reader.line_num, dict(zip(columns, (cell.strip() for cell in row)))
+    except UnicodeDecodeError:
+        raise ImportFormatError('CSV files must be UTF-8 encoded')
+    finally:
+        text.detach()
+
+def iter_xlsx_rows(fileobj) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (row number, row dict) from the first sheet of an .xlsx file (requires openpyxl)"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError('Excel import requires openpyxl (pip install openpyxl); upload a CSV instead')
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise ImportFormatError('The sheet is empty')
+        columns = [_column_name(name) for name in header]
+        for number, row in enumerate(rows, start=2):
+            if any(cell not in (None, '') for cell in row):
+                yield number, {
+                    column: cell.isoformat() if isinstance(cell, (datetime.date, datetime.time)) else cell
+                    for column, cell in zip(columns, row) if cell is not None
+                }
+    finally:
+        workbook.close()
+
+def iter_product_rows(fileobj, filename: str = '') -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Pick the reader from the file extension (.xlsx or CSV)"""
+    if filename.lower().endswith('.xlsx'):
+        return iter_xlsx_rows(fileobj)
+    return iter_csv_rows(fileobj)
+
+def _chunks(rows: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def import_products(rows: Iterable[Tuple[int, Dict[str, Any]]], seller: User, chunk_size: int = IMPORT_CHUNK_SIZE,
+                    dry_run: bool = False, atomic: bool = False, max_errors: int = IMPORT_MAX_ERRORS) -> Dict[str, Any]:
+    """Validate and insert product rows chunk by chunk; returns counts and a row-level error report.
+
+    Valid rows are imported even when others fail, one transaction per chunk,
+    unless atomic is set (the whole import rolls back on any failure) or
+    dry_run is set (rows are only validated).
+    """
+    report = {'rows': 0, 'created': 0, 'failed': 0, 'errors': [], 'errors_truncated': False}
+    validator = ProductSerializer()
+    with transaction.atomic() if atomic and not dry_run else nullcontext():
+        for chunk in _chunks(rows, chunk_size):
+            valid = []
+            for line, row in chunk:
+                try:
+                    valid.append(validator.run_validation(row))
+                except ValidationError as exc:
+                    report['failed'] += 1
+                    if len(report['errors']) < max_errors:
+                        report['errors'].append({'row': line, 'errors': exc.detail})
+                    else:
+                        report['errors_truncated'] = True
+            report['rows'] += len(chunk)
+            if not dry_run:
+                report['created'] += len(bulk_create_records(Product, [Product(**attrs, seller=seller) for attrs in valid]))
+        if atomic and report['failed'] and not dry_run:
+            transaction.set_rollback(True)
+            report['created'] = 0
+    return report
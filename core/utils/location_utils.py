@@ -0,0 +1,75 @@
+from django.db import connection
+from typing import Optional, List, Dict, Iterable
+from ..models import Location
+
+def get_location(name: str) -> Optional[Location]:
+    """Get or create the canonical Location for a free-text place name"""
+    normalized = Location.normalize(name)
+    if not normalized:
+        return None
+    location, _ = Location.objects.get_or_create(normalized_name=normalized, defaults={'name': ' '.join(name.split())})
+    return location
+
+def resolve_locations(names: Iterable[str]) -> Dict[str, Location]:
+    """Resolve many place names at once; returns {normalized name: Location}"""
+    wanted = {}
+    for name in names:
+        normalized = Location.normalize(name)
+        if normalized:
+            wanted.setdefault(normalized, ' '.join(name.split()))
+    if not wanted:
+        return {}
+    Location.objects.bulk_create(
+        [Location(name=name, normalized_name=normalized) for normalized, name in wanted.items()],
+        ignore_conflicts=True
+    )
+    return {location.normalized_name: location for location in Location.objects.filter(normalized_name__in=wanted)}
+
+def get_matching_locations(query: str):
+    """Locations whose name contains query (served by the trigram index on PostgreSQL)"""
+    return Location.objects.filter(normalized_name__contains=Location.normalize(query))
+
+def _trigrams(text: str) -> set:
+    """Trigram set computed the way pg_trgm does: per word, padded with two leading spaces and one trailing"""
+    trigrams = set()
+    for word in text.split():
+        padded = f'  {word} '
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+def trigram_similarity(a: str, b: str) -> float:
+    """Shared trigrams over all trigrams, matching pg_trgm's similarity()"""
+    left, right = _trigrams(Location.normalize(a)), _trigrams(Location.normalize(b))
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+def find_similar_locations(query: str, limit: int = 10, threshold: float = 0.3) -> List[Location]:
+    """Fuzzy location lookup, best match first.
+
+    Uses pg_trgm similarity on PostgreSQL and an in-process trigram scan on
+    other backends (SQLite in tests).
+    """
+    normalized = Location.normalize(query)
+    if not normalized:
+        return []
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+        # trigram_similar (the % operator) is what the GIN index serves; the
+        # explicit threshold then trims to the requested similarity
+        return list(
+            Location.objects.filter(normalized_name__trigram_similar=normalized)
+            .annotate(similarity=TrigramSimilarity('normalized_name', normalized))
+            .filter(similarity__gte=threshold)
+            .order_by('-similarity', 'id')[:limit]
+        )
+
+    scored = []
+    for location_id, name in Location.objects.values_list('id', 'normalized_name').iterator():
+        similarity = trigram_similarity(normalized, name)
+        if similarity >= threshold:
+            scored.append((similarity, location_id))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    top_ids = [location_id for _, location_id in scored[:limit]]
+    locations = Location.objects.in_bulk(top_ids)
+    return [locations[location_id] for location_id in top_ids]
@@ -1,6 +1,10 @@
-from django.db.models import Q, Count
-from typing import Optional, List, Dict, Any
-from ..models import Message, Enquiry, User
+from collections import Counter
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Count, F, Max, OuterRef, Subquery, Sum
+from typing import Optional, List, Dict, Any, Iterable
+from ..models import Message, Enquiry, Product, User, EnquiryReadState, UnreadCounter
+from .search_utils import search_ids
+from .stats_utils import aggregate_stats, count_if
 
 def get_message_by_id(message_id: int) -> Optional[Message]:
     """Get message by ID"""
@@ -50,11 +54,8 @@ def get_messages_by_user_with_details(user_id: int) -> List[Message]:
     )
 
 def search_messages(query: str) -> List[Message]:
-    """Search messages by content or sender email"""
-    return Message.objects.filter(
-        Q(content__icontains=query) |
-        Q(sender__email__icontains=query)
-    )
+    """Search messages by content or sender email (full-text index)"""
+    return Message.objects.filter(id__in=search_ids('message', query))
 
 def get_recent_messages(limit: int = 10) -> List[Message]:
     """Get most recent messages"""
@@ -66,15 +67,12 @@ def get_messages_by_date_range(start_date, end_date) -> List[Message]:
 
 def get_message_stats() -> Dict[str, Any]:
     """Get message statistics"""
-    total_messages = Message.objects.count()
-    total_enquiries_with_messages = Message.objects.values('enquiry').distinct().count()
-    total_senders = Message.objects.values('sender').distinct().count()
-    
-    return {
-        'total_messages': total_messages,
-        'total_enquiries_with_messages': total_enquiries_with_messages,
-        'total_senders': total_senders
-    }
+    return aggregate_stats(
+        Message.objects.all(),
+        total_messages=count_if(),
+        total_enquiries_with_messages=Count('enquiry', distinct=True),
+        total_senders=Count('sender', distinct=True)
+    )
 
 def get_user_message_stats(user_id: int) -> Dict[str, Any]:
     """Get message statistics for a specific user"""
@@ -97,14 +95,11 @@ def get_user_message_stats(user_id: int) -> Dict[str, Any]:
 
 def get_enquiry_message_stats(enquiry_id: int) -> Dict[str, Any]:
     """Get message statistics for a specific enquiry"""
-    messages = Message.objects.filter(enquiry_id=enquiry_id)
-    total_messages = messages.count()
-    unique_senders = messages.values('sender').distinct().count()
-    
-    return {
-        'total_messages': total_messages,
-        'unique_senders': unique_senders
-    }
+    return aggregate_stats(
+        Message.objects.filter(enquiry_id=enquiry_id),
+        total_messages=count_if(),
+        unique_senders=Count('sender', distinct=True)
+    )
 
 def get_conversation_messages(enquiry_id: int, user_id: int) -> List[Message]:
     """Get messages for a conversation where user is involved"""
@@ -116,10 +111,139 @@ def get_conversation_messages(enquiry_id: int, user_id: int) -> List[Message]:
         Q(enquiry__product__seller_id=user_id)
     ).order_by('timestamp')
 
+# Unread tracking: each participant has a read watermark per enquiry
+# (EnquiryReadState.last_read_id) with the number of later messages from
+# others, and one UnreadCounter with the total. Inserts and reads adjust both
+# incrementally, so a badge is one primary-key lookup however many messages
+# the user has. The same rows carry the thread's last_activity_at, so the
+# inbox is one ordered index scan instead of an OR across message joins.
+
+def _bump(queryset, create, field: str, delta: int) -> None:
+    """Add delta to queryset's row, creating it with create() if missing"""
+    if queryset.update(**{field: F(field) + delta}):
+        return
+    try:
+        with transaction.atomic():
+            create()
+    except IntegrityError:
+        # Another writer created the row first
+        queryset.update(**{field: F(field) + delta})
+
+def _bump_unread(user_id: int, enquiry_id: int, delta: int) -> None:
+    _bump(EnquiryReadState.objects.filter(user_id=user_id, enquiry_id=enquiry_id),
+          lambda: EnquiryReadState.objects.create(user_id=user_id, enquiry_id=enquiry_id, unread_count=delta),
+          'unread_count', delta)
+    _bump_unread_total(user_id, delta)
+
+def _bump_unread_total(user_id: int, delta: int) -> None:
+    _bump(UnreadCounter.objects.filter(user_id=user_id),
+          lambda: UnreadCounter.objects.create(user_id=user_id, count=delta), 'count', delta)
+
+def count_new_messages(messages: Iterable[Message]) -> None:
+    """Count new messages as unread for the enquiry participants other than the sender"""
+    messages = list(messages)
+    participants = {
+        enquiry_id: {buyer_id, seller_id} for enquiry_id, buyer_id, seller_id in
+        Enquiry.objects.filter(id__in={message.enquiry_id for message in messages}).values_list('id', 'buyer_id', 'product__seller_id')
+    }
+    unread = Counter(
+        (user_id, message.enquiry_id)
+        for message in messages for user_id in participants.get(message.enquiry_id, ()) if user_id != message.sender_id
+    )
+    for (user_id, enquiry_id), count in unread.items():
+        _bump_unread(user_id, enquiry_id, count)
+
+def open_enquiry_threads(enquiries: Iterable[Enquiry]) -> None:
+    """Give the buyer and seller of new enquiries their inbox rows"""
+    enquiries = list(enquiries)
+    sellers = dict(Product.objects.filter(id__in={enquiry.product_id for enquiry in enquiries}).values_list('id', 'seller_id'))
+    EnquiryReadState.objects.bulk_create([
+        EnquiryReadState(user_id=user_id, enquiry_id=enquiry.pk, last_activity_at=enquiry.last_activity_at)
+        for enquiry in enquiries for user_id in {enquiry.buyer_id, sellers.get(enquiry.product_id)} if user_id is not None
+    ], ignore_conflicts=True)
+
+def touch_enquiry_threads(messages: Iterable[Message]) -> None:
+    """Point each enquiry (and its participants' inbox rows) at its newest message"""
+    latest = {}
+    for message in messages:
+        if message.enquiry_id not in latest or message.pk > latest[message.enquiry_id].pk:
+            latest[message.enquiry_id] = message
+    for enquiry_id, message in latest.items():
+        # Concurrent inserts may commit out of order: never move back to an older message
+        Enquiry.objects.filter(Q(last_message__isnull=True) | Q(last_message_id__lt=message.pk), pk=enquiry_id).update(
+            last_message_id=message.pk, last_activity_at=message.timestamp
+        )
+        EnquiryReadState.objects.filter(enquiry_id=enquiry_id, last_activity_at__lt=message.timestamp).update(last_activity_at=message.timestamp)
+
+def restore_last_message(message: Message) -> None:
+    """After deleting an enquiry's newest message (the FK is nulled), point it at the one before.
+
+    The thread's activity (on the enquiry and its inbox rows) falls back to
+    that message's timestamp, or the enquiry's creation when none is left.
+    """
+    previous = Message.objects.filter(enquiry_id=message.enquiry_id).order_by('-id').values('id', 'timestamp').first()
+    enquiry = Enquiry.objects.filter(pk=message.enquiry_id, last_message__isnull=True)
+    if previous:
+        restored = enquiry.update(last_message_id=previous['id'], last_activity_at=previous['timestamp'])
+    else:
+        restored = enquiry.update(last_activity_at=F('created_at'))
+    if restored:
+        EnquiryReadState.objects.filter(enquiry_id=message.enquiry_id).update(
+            last_activity_at=Subquery(Enquiry.objects.filter(pk=OuterRef('enquiry_id')).values('last_activity_at')[:1])
+        )
+
+def get_inbox(user_id: int):
+    """The user's enquiry threads, most recent activity first (an index scan over their inbox rows)"""
+    return EnquiryReadState.objects.filter(user_id=user_id).order_by('-last_activity_at', '-id')
+
+def discard_deleted_message(message: Message) -> None:
+    """Uncount a deleted message for the participants who had not read it"""
+    states = EnquiryReadState.objects.filter(enquiry_id=message.enquiry_id, last_read_id__lt=message.id, unread_count__gt=0).exclude(user_id=message.sender_id)
+    user_ids = list(states.values_list('user_id', flat=True))
+    if user_ids:
+        states.update(unread_count=F('unread_count') - 1)
+        UnreadCounter.objects.filter(user_id__in=user_ids).update(count=F('count') - 1)
+
+def discard_enquiry_unread(enquiry_id: int) -> None:
+    """Take an enquiry's unread messages off its participants' counters (before deleting it)"""
+    states = EnquiryReadState.objects.filter(enquiry_id=enquiry_id, unread_count__gt=0)
+    for user_id, unread in states.values_list('user_id', 'unread_count'):
+        _bump_unread_total(user_id, -unread)
+    states.update(unread_count=0)
+
+def mark_enquiry_read(user_id: int, enquiry_id: int, message_id: Optional[int] = None) -> EnquiryReadState:
+    """Move the user's watermark to message_id (default: the latest message); it never moves back.
+
+    The watermark is clamped to the enquiry's latest message, so an id from
+    another thread (or one not yet written) cannot pre-mark future messages read.
+    """
+    with transaction.atomic():
+        latest = Message.objects.filter(enquiry_id=enquiry_id).aggregate(latest=Max('id'))['latest'] or 0
+        message_id = latest if message_id is None else min(message_id, latest)
+        # The row lock orders this against concurrent inserts counting into the same state
+        state, _ = EnquiryReadState.objects.select_for_update().get_or_create(user_id=user_id, enquiry_id=enquiry_id)
+        state.last_read_id = max(state.last_read_id, message_id)
+        unread = Message.objects.filter(enquiry_id=enquiry_id, id__gt=state.last_read_id).exclude(sender_id=user_id).count()
+        delta, state.unread_count = unread - state.unread_count, unread
+        state.save(update_fields=['last_read_id', 'unread_count'])
+        if delta:
+            _bump_unread_total(user_id, delta)
+    return state
+
 def get_unread_messages_count(user_id: int) -> int:
-    """Get count of unread messages for user (placeholder for future implementation)"""
-    # This is a placeholder - you might want to add a 'read' field to Message model
-    return Message.objects.filter(
-        Q(enquiry__buyer_id=user_id) |
-        Q(enquiry__product__seller_id=user_id)
-    ).exclude(sender_id=user_id).count() 
\ No newline at end of file
+    """Unread messages across the user's enquiries (one primary-key lookup)"""
+    return UnreadCounter.objects.filter(user_id=user_id).values_list('count', flat=True).first() or 0
+
+def get_unread_counts_by_enquiry(user_id: int) -> Dict[int, int]:
+    """{enquiry id: unread messages} for the user's enquiries with anything unread"""
+    return dict(EnquiryReadState.objects.filter(user_id=user_id, unread_count__gt=0).values_list('enquiry_id', 'unread_count'))
+
+def rebuild_unread_counters() -> None:
+    """Recount every read state and counter from the messages (repairs drift; keeps watermarks)"""
+    with transaction.atomic():
+        for state in EnquiryReadState.objects.iterator():
+            state.unread_count = Message.objects.filter(enquiry_id=state.enquiry_id, id__gt=state.last_read_id).exclude(sender_id=state.user_id).count()
+            state.save(update_fields=['unread_count'])
+        totals = EnquiryReadState.objects.values_list('user_id').annotate(total=Sum('unread_count')).order_by()
+        UnreadCounter.objects.all().delete()
+        UnreadCounter.objects.bulk_create([UnreadCounter(user_id=user_id, count=total) for user_id, total in totals], batch_size=1000)
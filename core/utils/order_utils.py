@@ -1,6 +1,20 @@
 from django.db.models import Q, Count, Sum, Avg
 from typing import Optional, List, Dict, Any
 from ..models import Order, Enquiry, User
+from .search_utils import search_ids
+from .stats_utils import aggregate_stats, count_if
+
+ORDER_STATUS_BUCKETS = {
+    'requested_orders': Q(status='Requested'),
+    'picked_orders': Q(status='Picked'),
+    'in_transit_orders': Q(status='In Transit'),
+    'delivered_orders': Q(status='Delivered'),
+}
+
+def _order_status_stats(orders, **extra) -> Dict[str, Any]:
+    """Total and per-status order counts in a single query"""
+    buckets = {name: count_if(condition) for name, condition in ORDER_STATUS_BUCKETS.items()}
+    return aggregate_stats(orders, total_orders=count_if(), **buckets, **extra)
 
 def get_order_by_id(order_id: int) -> Optional[Order]:
     """Get order by ID"""
@@ -78,82 +92,27 @@ def get_orders_by_transporter_with_details(transporter_id: int) -> List[Order]:
     ).filter(transporter_id=transporter_id)
 
 def search_orders(query: str) -> List[Order]:
-    """Search orders by buyer email, seller email, or transporter email"""
-    return Order.objects.filter(
-        Q(enquiry__buyer__email__icontains=query) |
-        Q(enquiry__product__seller__email__icontains=query) |
-        Q(transporter__email__icontains=query)
-    )
+    """Search orders by buyer, seller or transporter email, status or commodity (full-text index)"""
+    return Order.objects.filter(id__in=search_ids('order', query))
 
 def get_order_stats() -> Dict[str, Any]:
     """Get order statistics"""
-    total_orders = Order.objects.count()
-    requested_orders = Order.objects.filter(status='Requested').count()
-    picked_orders = Order.objects.filter(status='Picked').count()
-    in_transit_orders = Order.objects.filter(status='In Transit').count()
-    delivered_orders = Order.objects.filter(status='Delivered').count()
-    
-    available_jobs = Order.objects.filter(status='Requested', transporter__isnull=True).count()
-    
-    return {
-        'total_orders': total_orders,
-        'requested_orders': requested_orders,
-        'picked_orders': picked_orders,
-        'in_transit_orders': in_transit_orders,
-        'delivered_orders': delivered_orders,
-        'available_jobs': available_jobs
-    }
+    return _order_status_stats(
+        Order.objects.all(),
+        available_jobs=count_if(Q(status='Requested', transporter__isnull=True))
+    )
 
 def get_buyer_order_stats(buyer_id: int) -> Dict[str, Any]:
     """Get order statistics for a specific buyer"""
-    orders = Order.objects.filter(enquiry__buyer_id=buyer_id)
-    total_orders = orders.count()
-    requested_orders = orders.filter(status='Requested').count()
-    picked_orders = orders.filter(status='Picked').count()
-    in_transit_orders = orders.filter(status='In Transit').count()
-    delivered_orders = orders.filter(status='Delivered').count()
-    
-    return {
-        'total_orders': total_orders,
-        'requested_orders': requested_orders,
-        'picked_orders': picked_orders,
-        'in_transit_orders': in_transit_orders,
-        'delivered_orders': delivered_orders
-    }
+    return _order_status_stats(Order.objects.filter(enquiry__buyer_id=buyer_id))
 
 def get_seller_order_stats(seller_id: int) -> Dict[str, Any]:
     """Get order statistics for a specific seller"""
-    orders = Order.objects.filter(enquiry__product__seller_id=seller_id)
-    total_orders = orders.count()
-    requested_orders = orders.filter(status='Requested').count()
-    picked_orders = orders.filter(status='Picked').count()
-    in_transit_orders = orders.filter(status='In Transit').count()
-    delivered_orders = orders.filter(status='Delivered').count()
-    
-    return {
-        'total_orders': total_orders,
-        'requested_orders': requested_orders,
-        'picked_orders': picked_orders,
-        'in_transit_orders': in_transit_orders,
-        'delivered_orders': delivered_orders
-    }
+    return _order_status_stats(Order.objects.filter(enquiry__product__seller_id=seller_id))
 
 def get_transporter_order_stats(transporter_id: int) -> Dict[str, Any]:
     """Get order statistics for a specific transporter"""
-    orders = Order.objects.filter(transporter_id=transporter_id)
-    total_orders = orders.count()
-    requested_orders = orders.filter(status='Requested').count()
-    picked_orders = orders.filter(status='Picked').count()
-    in_transit_orders = orders.filter(status='In Transit').count()
-    delivered_orders = orders.filter(status='Delivered').count()
-    
-    return {
-        'total_orders': total_orders,
-        'requested_orders': requested_orders,
-        'picked_orders': picked_orders,
-        'in_transit_orders': in_transit_orders,
-        'delivered_orders': delivered_orders
-    }
+    return _order_status_stats(Order.objects.filter(transporter_id=transporter_id))
 
 def get_recent_orders(limit: int = 10) -> List[Order]:
     """Get most recent orders"""
@@ -0,0 +1,91 @@
+import datetime
+import re
+from typing import Dict, List
+
+# Monthly range partitions of the audit log on PostgreSQL. core_auditlog is a
+# partitioned parent with one child table per calendar month
+# (core_auditlog_y2025m01) plus a default partition that catches rows no
+# monthly partition covers yet. Retention drops whole month tables instead of
+# deleting rows. These helpers take a connection and run plain SQL; migration
+# 0013 converts the table with its own frozen copy of the month layout.
+
+AUDIT_TABLE = 'core_auditlog'
+AUDIT_DEFAULT_PARTITION = f'{AUDIT_TABLE}_default'
+_PARTITION_NAME = re.compile(rf'^{AUDIT_TABLE}_y(\d{{4}})m(\d{{2}})$')
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    """First day of the month `months` after (or before) the month of the given date"""
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: datetime.date) -> str:
+    return f'{AUDIT_TABLE}_y{month.year:04d}m{month.month:02d}'
+
+def is_partitioned(connection) -> bool:
+    """Whether the audit table is a partitioned parent (PostgreSQL only)"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE relname = %s', [AUDIT_TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+def list_partitions(connection) -> Dict[datetime.date, str]:
+    """{first day of month: table name} for the attached monthly partitions"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+            'WHERE parent.relname = %s', [AUDIT_TABLE]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = {}
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions[datetime.date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+def create_month_partition(connection, month: datetime.date) -> bool:
+    """Attach the partition for one month; rows already in the default partition move into it.
+
+    Returns False when the partition already exists.
+    """
+    month = month.replace(day=1)
+    if month in list_partitions(connection):
+        return False
+    name = partition_name(month)
+    bounds = [f'{month.isoformat()} 00:00:00+00', f'{add_months(month, 1).isoformat()} 00:00:00+00']
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {name} (LIKE {AUDIT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        # A default partition holding rows of the new range would block ATTACH
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {AUDIT_DEFAULT_PARTITION} WHERE "timestamp" >= %s AND "timestamp" < %s '
+            f'RETURNING id, action, "timestamp", details, user_id) '
+            f'INSERT INTO {name} (id, action, "timestamp", details, user_id) SELECT * FROM moved', bounds
+        )
+        cursor.execute(f"ALTER TABLE {AUDIT_TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{bounds[0]}') TO ('{bounds[1]}')")
+    return True
+
+def ensure_partitions(connection, first_month: datetime.date, last_month: datetime.date) -> List[str]:
+    """Create the monthly partitions from first_month through last_month; returns the new table names"""
+    created = []
+    month = first_month.replace(day=1)
+    while month <= last_month:
+        if create_month_partition(connection, month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+def drop_partitions_before(connection, cutoff: datetime.date) -> List[str]:
+    """Drop monthly partitions that end on or before cutoff and purge older rows from the default partition"""
+    dropped = []
+    with connection.cursor() as cursor:
+        for month, name in sorted(list_partitions(connection).items()):
+            if add_months(month, 1) <= cutoff:
+                cursor.execute(f'ALTER TABLE {AUDIT_TABLE} DETACH PARTITION {name}')
+                cursor.execute(f'DROP TABLE {name}')
+                dropped.append(name)
+        cursor.execute(f'DELETE FROM {AUDIT_DEFAULT_PARTITION} WHERE "timestamp" < %s', [f'{cutoff.isoformat()} 00:00:00+00'])
+    return dropped
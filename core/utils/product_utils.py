@@ -1,6 +1,11 @@
 from django.db.models import Q, Avg, Count, Sum
 from typing import Optional, List, Dict, Any
 from ..models import Product, User
+from .search_utils import search_ids
+from .location_utils import get_matching_locations
+from .stats_utils import aggregate_stats, count_if, choice_buckets, split_buckets
+
+COMMODITY_TYPES = ['Biomass', 'Briquettes', 'Biodiesel']
 
 def get_product_by_id(product_id: int) -> Optional[Product]:
     """Get product by ID"""
@@ -23,7 +28,7 @@ def get_products_by_commodity_type(commodity_type: str) -> List[Product]:
 
 def get_products_by_location(location: str) -> List[Product]:
     """Get products by pickup location"""
-    return Product.objects.filter(pickup_location__icontains=location)
+    return Product.objects.filter(pickup_place__in=get_matching_locations(location))
 
 def get_products_by_price_range(min_price: float, max_price: float) -> List[Product]:
     """Get products within price range"""
@@ -34,11 +39,8 @@ def get_products_by_quantity_range(min_quantity: float, max_quantity: float) ->
     return Product.objects.filter(quantity__gte=min_quantity, quantity__lte=max_quantity)
 
 def search_products(query: str) -> List[Product]:
-    """Search products by commodity type or pickup location"""
-    return Product.objects.filter(
-        Q(commodity_type__icontains=query) |
-        Q(pickup_location__icontains=query)
-    )
+    """Search products by commodity type, pickup location or seller (full-text index)"""
+    return Product.objects.filter(id__in=search_ids('product', query))
 
 def get_products_with_seller_info() -> List[Product]:
     """Get products with seller information"""
@@ -58,40 +60,39 @@ def get_products_by_unit(unit: str) -> List[Product]:
 
 def get_product_stats() -> Dict[str, Any]:
     """Get product statistics"""
-    total_products = Product.objects.count()
-    total_sellers = Product.objects.values('seller').distinct().count()
-    
-    commodity_stats = {}
-    for commodity in ['Biomass', 'Briquettes', 'Biodiesel']:
-        commodity_stats[commodity] = Product.objects.filter(commodity_type=commodity).count()
-    
-    avg_price = Product.objects.aggregate(avg_price=Avg('price'))
-    total_quantity = Product.objects.aggregate(total_quantity=Sum('quantity'))
-    
+    stats = aggregate_stats(
+        Product.objects.all(),
+        total_products=count_if(),
+        total_sellers=Count('seller', distinct=True),
+        **choice_buckets('commodity_type', COMMODITY_TYPES, 'commodity'),
+        average_price=Avg('price'),
+        total_quantity=Sum('quantity')
+    )
+    commodity_stats = split_buckets(stats, COMMODITY_TYPES, 'commodity')
     return {
-        'total_products': total_products,
-        'total_sellers': total_sellers,
+        'total_products': stats['total_products'],
+        'total_sellers': stats['total_sellers'],
         'commodity_stats': commodity_stats,
-        'average_price': avg_price['avg_price'],
-        'total_quantity': total_quantity['total_quantity']
+        'average_price': stats['average_price'],
+        'total_quantity': stats['total_quantity']
     }
 
 def get_seller_products_with_stats(seller_id: int) -> Dict[str, Any]:
     """Get seller's products with statistics"""
     products = Product.objects.filter(seller_id=seller_id)
-    total_products = products.count()
-    total_value = products.aggregate(total_value=Sum('price'))
-    avg_price = products.aggregate(avg_price=Avg('price'))
-    
-    commodity_distribution = {}
-    for commodity in ['Biomass', 'Briquettes', 'Biodiesel']:
-        commodity_distribution[commodity] = products.filter(commodity_type=commodity).count()
-    
+    stats = aggregate_stats(
+        products,
+        total_products=count_if(),
+        total_value=Sum('price'),
+        average_price=Avg('price'),
+        **choice_buckets('commodity_type', COMMODITY_TYPES, 'commodity')
+    )
+    commodity_distribution = split_buckets(stats, COMMODITY_TYPES, 'commodity')
     return {
         'products': products,
-        'total_products': total_products,
-        'total_value': total_value['total_value'],
-        'average_price': avg_price['avg_price'],
+        'total_products': stats['total_products'],
+        'total_value': stats['total_value'],
+        'average_price': stats['average_price'],
         'commodity_distribution': commodity_distribution
     }
 
@@ -1,6 +1,9 @@
-from django.db.models import Q, Count
+from itertools import groupby
+from django.db.models import Q, Count, Exists, OuterRef
 from typing import Optional, List, Dict, Any
 from ..models import Route, User
+from .location_utils import get_matching_locations
+from .stats_utils import aggregate_stats, count_if
 
 def get_route_by_id(route_id: int) -> Optional[Route]:
     """Get route by ID"""
@@ -19,17 +22,18 @@ def get_routes_by_transporter(transporter_id: int) -> List[Route]:
 
 def get_routes_by_origin(origin: str) -> List[Route]:
     """Get routes by origin"""
-    return Route.objects.filter(origin__icontains=origin)
+    return Route.objects.filter(origin_place__in=get_matching_locations(origin))
 
 def get_routes_by_destination(destination: str) -> List[Route]:
     """Get routes by destination"""
-    return Route.objects.filter(destination__icontains=destination)
+    return Route.objects.filter(destination_place__in=get_matching_locations(destination))
 
 def get_routes_by_location(location: str) -> List[Route]:
     """Get routes that pass through a specific location"""
+    locations = get_matching_locations(location)
     return Route.objects.filter(
-        Q(origin__icontains=location) |
-        Q(destination__icontains=location)
+        Q(origin_place__in=locations) |
+        Q(destination_place__in=locations)
     )
 
 def get_routes_with_transporter_details() -> List[Route]:
@@ -50,28 +54,20 @@ def search_routes(query: str) -> List[Route]:
 
 def get_route_stats() -> Dict[str, Any]:
     """Get route statistics"""
-    total_routes = Route.objects.count()
-    total_transporters = Route.objects.values('transporter').distinct().count()
-    
-    return {
-        'total_routes': total_routes,
-        'total_transporters': total_transporters
-    }
+    return aggregate_stats(
+        Route.objects.all(),
+        total_routes=count_if(),
+        total_transporters=Count('transporter', distinct=True)
+    )
 
 def get_transporter_route_stats(transporter_id: int) -> Dict[str, Any]:
     """Get route statistics for a specific transporter"""
-    routes = Route.objects.filter(transporter_id=transporter_id)
-    total_routes = routes.count()
-    
-    # Get unique origins and destinations
-    unique_origins = routes.values('origin').distinct().count()
-    unique_destinations = routes.values('destination').distinct().count()
-    
-    return {
-        'total_routes': total_routes,
-        'unique_origins': unique_origins,
-        'unique_destinations': unique_destinations
-    }
+    return aggregate_stats(
+        Route.objects.filter(transporter_id=transporter_id),
+        total_routes=count_if(),
+        unique_origins=Count('origin', distinct=True),
+        unique_destinations=Count('destination', distinct=True)
+    )
 
 def get_recent_routes(limit: int = 10) -> List[Route]:
     """Get most recent routes"""
@@ -89,60 +85,89 @@ def get_popular_routes(limit: int = 10) -> List[Dict[str, Any]]:
     
     return list(routes)
 
-def get_route_network() -> Dict[str, Any]:
-    """Get route network information"""
-    total_routes = Route.objects.count()
-    unique_origins = Route.objects.values('origin').distinct().count()
-    unique_destinations = Route.objects.values('destination').distinct().count()
-    
-    # Get all unique locations
-    all_locations = set()
-    for route in Route.objects.all():
-        all_locations.add(route.origin)
-        all_locations.add(route.destination)
-    
+def build_route_network(routes, chunk_size: int = 2000) -> Dict[str, Any]:
+    """Build an adjacency map with degree counts from a Route queryset.
+
+    Routes are grouped by (origin, destination) in SQL and the edges are
+    streamed in chunks, so memory grows with the number of distinct edges
+    rather than the number of Route rows.
+    """
+    edges = routes.values_list('origin', 'destination').annotate(route_count=Count('id')).order_by()
+    adjacency: Dict[str, Dict[str, int]] = {}
+    degrees: Dict[str, Dict[str, int]] = {}
+    destinations = set()
+    total_routes = 0
+    for origin, destination, route_count in edges.iterator(chunk_size=chunk_size):
+        total_routes += route_count
+        adjacency.setdefault(origin, {})[destination] = route_count
+        destinations.add(destination)
+        degrees.setdefault(origin, {'out': 0, 'in': 0})['out'] += route_count
+        degrees.setdefault(destination, {'out': 0, 'in': 0})['in'] += route_count
+
     return {
         'total_routes': total_routes,
-        'unique_origins': unique_origins,
-        'unique_destinations': unique_destinations,
-        'total_locations': len(all_locations),
-        'locations': list(all_locations)
+        'unique_origins': len(adjacency),
+        'unique_destinations': len(destinations),
+        'total_locations': len(degrees),
+        'locations': list(degrees),
+        'adjacency': adjacency,
+        'degrees': degrees
     }
 
+def get_route_network() -> Dict[str, Any]:
+    """Get route network information"""
+    return build_route_network(Route.objects.all())
+
 def get_transporter_route_network(transporter_id: int) -> Dict[str, Any]:
     """Get route network information for a specific transporter"""
-    routes = Route.objects.filter(transporter_id=transporter_id)
-    total_routes = routes.count()
-    
-    # Get unique locations for this transporter
-    locations = set()
-    for route in routes:
-        locations.add(route.origin)
-        locations.add(route.destination)
-    
+    network = build_route_network(Route.objects.filter(transporter_id=transporter_id))
     return {
-        'total_routes': total_routes,
-        'total_locations': len(locations),
-        'locations': list(locations)
+        'total_routes': network['total_routes'],
+        'total_locations': network['total_locations'],
+        'locations': network['locations'],
+        'adjacency': network['adjacency'],
+        'degrees': network['degrees']
     }
 
 def find_common_routes(transporter1_id: int, transporter2_id: int) -> List[Route]:
-    """Find routes that are common between two transporters"""
-    routes1 = Route.objects.filter(transporter_id=transporter1_id)
-    routes2 = Route.objects.filter(transporter_id=transporter2_id)
-    
-    common_routes = []
-    for route1 in routes1:
-        for route2 in routes2:
-            if (route1.origin == route2.origin and route1.destination == route2.destination):
-                common_routes.append(route1)
-                break
-    
-    return common_routes
+    """Find routes of the first transporter that the second also covers (same origin and destination)"""
+    return Route.objects.filter(transporter_id=transporter1_id).filter(
+        Exists(Route.objects.filter(
+            transporter_id=transporter2_id,
+            origin=OuterRef('origin'),
+            destination=OuterRef('destination')
+        ))
+    )
+
+def get_route_overlap_matrix(transporter_ids: Optional[List[int]] = None, chunk_size: int = 2000) -> Dict[int, Dict[int, int]]:
+    """Count shared (origin, destination) pairs between every pair of transporters.
+
+    matrix[a][b] is the number of distinct routes a and b both cover and
+    matrix[a][a] the number of distinct routes a covers. Pass None to cover
+    every transporter with routes. Edges are streamed in (origin, destination)
+    order, so each edge's transporters are grouped in one pass.
+    """
+    routes = Route.objects.all()
+    if transporter_ids is not None:
+        routes = routes.filter(transporter_id__in=transporter_ids)
+    edges = routes.values_list('origin', 'destination', 'transporter_id').distinct().order_by('origin', 'destination')
+
+    matrix: Dict[int, Dict[int, int]] = {
+        transporter_id: {other_id: 0 for other_id in transporter_ids}
+        for transporter_id in (transporter_ids or [])
+    }
+    for _, group in groupby(edges.iterator(chunk_size=chunk_size), key=lambda row: row[:2]):
+        covering = [transporter_id for _, _, transporter_id in group]
+        for transporter_id in covering:
+            row = matrix.setdefault(transporter_id, {})
+            for other_id in covering:
+                row[other_id] = row.get(other_id, 0) + 1
+    return matrix
 
 def get_route_suggestions(origin: str, destination: str) -> List[Route]:
     """Get route suggestions based on origin and destination"""
     return Route.objects.filter(
-        Q(origin__icontains=origin) |
-        Q(destination__icontains=destination)
-    ).select_related('transporter') 
\ No newline at end of file
+        Q(origin_place__in=get_matching_locations(origin)) |
+        Q(destination_place__in=get_matching_locations(destination))
+    ).select_related('transporter')
+
@@ -0,0 +1,163 @@
+import re
+from django.db import connection
+from django.db.models import Q, F, Case, When, Value, IntegerField
+from typing import List, Dict, Tuple, Iterable, Optional
+from ..models import SearchDocument, User, Product, Enquiry, Message, Order, Transaction
+
+# Each searchable entity is flattened into one SearchDocument row: title
+# fields rank above body fields. Text is stored pre-tokenized so PostgreSQL's
+# tsvector and the SQLite fallback see exactly the same terms (emails split
+# into their parts, punctuation dropped).
+
+SEARCH_CONFIG = 'simple'
+SEARCH_CHUNK_SIZE = 1000
+
+SEARCH_SOURCES = {
+    'product': (Product, ['commodity_type', 'pickup_location'], ['unit_of_measure', 'seller__email', 'seller__username']),
+    'enquiry': (Enquiry, ['product__commodity_type', 'status'], ['buyer__email', 'product__seller__email', 'product__pickup_location']),
+    'message': (Message, ['content'], ['sender__email']),
+    'order': (Order, ['status', 'enquiry__product__commodity_type'], ['enquiry__product__pickup_location', 'enquiry__buyer__email', 'enquiry__product__seller__email', 'transporter__email']),
+    'transaction': (Transaction, ['invoice_number'], ['order__enquiry__buyer__email', 'order__enquiry__product__seller__email', 'order__transporter__email']),
+}
+
+SEARCH_ENTITIES = {model: entity for entity, (model, _, _) in SEARCH_SOURCES.items()}
+
+# Documents that copy text from another model: {changed model: {entity: [lookups to the changed pk]}}
+SEARCH_DEPENDENTS = {
+    User: {
+        'product': ['seller_id'],
+        'enquiry': ['buyer_id', 'product__seller_id'],
+        'message': ['sender_id'],
+        'order': ['enquiry__buyer_id', 'enquiry__product__seller_id', 'transporter_id'],
+        'transaction': ['order__enquiry__buyer_id', 'order__enquiry__product__seller_id', 'order__transporter_id'],
+    },
+    Product: {'enquiry': ['product_id'], 'order': ['enquiry__product_id'], 'transaction': ['order__enquiry__product_id']},
+    Enquiry: {'order': ['enquiry_id'], 'transaction': ['order__enquiry_id']},
+    Order: {'transaction': ['order_id']},
+}
+
+def embedded_fields(model) -> List[str]:
+    """Columns of model (attnames) whose values documents of other entities embed.
+
+    Derived from SEARCH_SOURCES and SEARCH_DEPENDENTS: Product embeds
+    commodity_type, pickup_location and seller_id into enquiry, order and
+    transaction documents, so only a change to one of those needs
+    reindex_dependents.
+    """
+    names = []
+    for entity, lookups in SEARCH_DEPENDENTS.get(model, {}).items():
+        _, title_fields, body_fields = SEARCH_SOURCES[entity]
+        for lookup in lookups:
+            prefix = lookup[:-len('_id')] + '__'
+            for path in title_fields + body_fields:
+                if path.startswith(prefix):
+                    names.append(model._meta.get_field(path[len(prefix):].split('__')[0]).attname)
+    return list(dict.fromkeys(names))
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; the same tokenizer feeds documents and queries"""
+    return re.findall(r'\w+', str(text or '').lower())
+
+def _document_text(values: Iterable) -> str:
+    return ' '.join(token for value in values for token in tokenize(value))
+
+def _chunks(ids: Iterable[int], size: int = SEARCH_CHUNK_SIZE):
+    chunk = []
+    for object_id in ids:
+        chunk.append(object_id)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def index_documents(entity: str, ids: Iterable[int]) -> int:
+    """Rebuild the search documents for the given rows; returns the number written"""
+    model, title_fields, body_fields = SEARCH_SOURCES[entity]
+    written = 0
+    for chunk in _chunks(ids):
+        documents = [
+            SearchDocument(
+                entity=entity, object_id=row[0],
+                title=_document_text(row[1:1 + len(title_fields)]),
+                body=_document_text(row[1 + len(title_fields):]),
+            )
+            for row in model.objects.filter(pk__in=chunk).values_list('pk', *title_fields, *body_fields)
+        ]
+        found = {document.object_id for document in documents}
+        SearchDocument.objects.filter(entity=entity, object_id__in=set(chunk) - found).delete()
+        SearchDocument.objects.bulk_create(
+            documents, update_conflicts=True,
+            unique_fields=['entity', 'object_id'], update_fields=['title', 'body', 'updated_at'],
+        )
+        if connection.vendor == 'postgresql':
+            from django.contrib.postgres.search import SearchVector
+            SearchDocument.objects.filter(entity=entity, object_id__in=found).update(
+                search_vector=SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+                SearchVector('body', weight='B', config=SEARCH_CONFIG)
+            )
+        written += len(documents)
+    return written
+
+def remove_document(entity: str, object_id: int) -> None:
+    """Drop the search document for a deleted row"""
+    SearchDocument.objects.filter(entity=entity, object_id=object_id).delete()
+
+def reindex_dependents(model, pk: int) -> int:
+    """Refresh documents that embed text from model/pk (e.g. a user's email)"""
+    written = 0
+    for entity, lookups in SEARCH_DEPENDENTS.get(model, {}).items():
+        source = SEARCH_SOURCES[entity][0]
+        condition = Q()
+        for lookup in lookups:
+            condition |= Q(**{lookup: pk})
+        ids = source.objects.filter(condition).values_list('pk', flat=True).iterator(chunk_size=SEARCH_CHUNK_SIZE)
+        written += index_documents(entity, ids)
+    return written
+
+def rebuild_search_index(entities: Optional[List[str]] = None) -> int:
+    """Reindex every row of the given entities (all by default); returns documents written"""
+    written = 0
+    for entity in entities or SEARCH_SOURCES:
+        model = SEARCH_SOURCES[entity][0]
+        SearchDocument.objects.filter(entity=entity).exclude(object_id__in=model.objects.values('pk')).delete()
+        written += index_documents(entity, model.objects.values_list('pk', flat=True).iterator(chunk_size=SEARCH_CHUNK_SIZE))
+    return written
+
+def search_documents(entity: str, query: str):
+    """SearchDocument rows of one entity matching every query term (as a prefix), annotated with rank.
+
+    PostgreSQL matches a prefix tsquery against the GIN-indexed tsvector and
+    ranks with ts_rank; other backends (SQLite in tests) match token prefixes
+    in the stored text and rank title hits above body hits.
+    """
+    terms = tokenize(query)
+    documents = SearchDocument.objects.filter(entity=entity)
+    if not terms:
+        return documents.none()
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        search_query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config=SEARCH_CONFIG)
+        return documents.filter(search_vector=search_query).annotate(rank=SearchRank(F('search_vector'), search_query))
+
+    score = Value(0)
+    for term in terms:
+        in_title = Q(title__startswith=term) | Q(title__contains=f' {term}')
+        in_body = Q(body__startswith=term) | Q(body__contains=f' {term}')
+        documents = documents.filter(in_title | in_body)
+        score = score + Case(When(in_title, then=Value(2)), default=Value(1), output_field=IntegerField())
+    return documents.annotate(rank=score)
+
+def search_ids(entity: str, query: str):
+    """Subquery of matching object ids, for filtering the entity's own table"""
+    return search_documents(entity, query).values('object_id')
+
+def search(query: str, entities: Optional[List[str]] = None, limit: int = 10) -> Dict[str, List[Tuple[int, float]]]:
+    """Best-ranked (object_id, rank) pairs per entity"""
+    return {
+        entity: [
+            (object_id, float(rank))
+            for object_id, rank in search_documents(entity, query).order_by('-rank', 'object_id').values_list('object_id', 'rank')[:limit]
+        ]
+        for entity in (entities or SEARCH_SOURCES)
+    }
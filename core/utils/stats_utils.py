@@ -0,0 +1,22 @@
+from django.db.models import Q, Count
+from typing import Optional, Dict, Any, Iterable
+
+def count_if(condition: Optional[Q] = None) -> Count:
+    """Count rows matching condition (all rows when None) inside an aggregate"""
+    return Count('pk', filter=condition)
+
+def bucket_alias(prefix: str, value: str) -> str:
+    """Aggregate alias for a choice bucket (aliases may not contain spaces)"""
+    return f"{prefix}_{value.lower().replace(' ', '_')}"
+
+def choice_buckets(field: str, values: Iterable[str], prefix: str) -> Dict[str, Count]:
+    """Build one conditional count per choice value of field"""
+    return {bucket_alias(prefix, value): count_if(Q(**{field: value})) for value in values}
+
+def split_buckets(stats: Dict[str, Any], values: Iterable[str], prefix: str) -> Dict[str, int]:
+    """Move the counts built by choice_buckets out of stats into a {value: count} dict"""
+    return {value: stats.pop(bucket_alias(prefix, value)) for value in values}
+
+def aggregate_stats(queryset, **aggregates) -> Dict[str, Any]:
+    """Evaluate every conditional count and aggregate over queryset in a single query"""
+    return queryset.aggregate(**aggregates)
@@ -1,6 +1,17 @@
 from django.db.models import Q, Count, Sum, Avg
 from typing import Optional, List, Dict, Any
 from ..models import Transaction, Order, User
+from .search_utils import search_ids
+from .stats_utils import aggregate_stats, count_if
+
+def _transaction_totals(transactions) -> Dict[str, Any]:
+    """Count, sum and average amount of transactions in a single query"""
+    return aggregate_stats(
+        transactions,
+        total_transactions=count_if(),
+        total_amount=Sum('amount'),
+        average_amount=Avg('amount')
+    )
 
 def get_transaction_by_id(transaction_id: int) -> Optional[Transaction]:
     """Get transaction by ID"""
@@ -65,64 +76,24 @@ def get_transactions_by_amount_range(min_amount: float, max_amount: float) -> Li
     return Transaction.objects.filter(amount__gte=min_amount, amount__lte=max_amount)
 
 def search_transactions(query: str) -> List[Transaction]:
-    """Search transactions by invoice number or user emails"""
-    return Transaction.objects.filter(
-        Q(invoice_number__icontains=query) |
-        Q(order__enquiry__buyer__email__icontains=query) |
-        Q(order__enquiry__product__seller__email__icontains=query) |
-        Q(order__transporter__email__icontains=query)
-    )
+    """Search transactions by invoice number or user emails (full-text index)"""
+    return Transaction.objects.filter(id__in=search_ids('transaction', query))
 
 def get_transaction_stats() -> Dict[str, Any]:
     """Get transaction statistics"""
-    total_transactions = Transaction.objects.count()
-    total_amount = Transaction.objects.aggregate(total_amount=Sum('amount'))
-    avg_amount = Transaction.objects.aggregate(avg_amount=Avg('amount'))
-    
-    return {
-        'total_transactions': total_transactions,
-        'total_amount': total_amount['total_amount'],
-        'average_amount': avg_amount['avg_amount']
-    }
+    return _transaction_totals(Transaction.objects.all())
 
 def get_buyer_transaction_stats(buyer_id: int) -> Dict[str, Any]:
     """Get transaction statistics for a specific buyer"""
-    transactions = Transaction.objects.filter(order__enquiry__buyer_id=buyer_id)
-    total_transactions = transactions.count()
-    total_amount = transactions.aggregate(total_amount=Sum('amount'))
-    avg_amount = transactions.aggregate(avg_amount=Avg('amount'))
-    
-    return {
-        'total_transactions': total_transactions,
-        'total_amount': total_amount['total_amount'],
-        'average_amount': avg_amount['avg_amount']
-    }
+    return _transaction_totals(Transaction.objects.filter(order__enquiry__buyer_id=buyer_id))
 
 def get_seller_transaction_stats(seller_id: int) -> Dict[str, Any]:
     """Get transaction statistics for a specific seller"""
-    transactions = Transaction.objects.filter(order__enquiry__product__seller_id=seller_id)
-    total_transactions = transactions.count()
-    total_amount = transactions.aggregate(total_amount=Sum('amount'))
-    avg_amount = transactions.aggregate(avg_amount=Avg('amount'))
-    
-    return {
-        'total_transactions': total_transactions,
-        'total_amount': total_amount['total_amount'],
-        'average_amount': avg_amount['avg_amount']
-    }
+    return _transaction_totals(Transaction.objects.filter(order__enquiry__product__seller_id=seller_id))
 
 def get_transporter_transaction_stats(transporter_id: int) -> Dict[str, Any]:
     """Get transaction statistics for a specific transporter"""
-    transactions = Transaction.objects.filter(order__transporter_id=transporter_id)
-    total_transactions = transactions.count()
-    total_amount = transactions.aggregate(total_amount=Sum('amount'))
-    avg_amount = transactions.aggregate(avg_amount=Avg('amount'))
-    
-    return {
-        'total_transactions': total_transactions,
-        'total_amount': total_amount['total_amount'],
-        'average_amount': avg_amount['avg_amount']
-    }
+    return _transaction_totals(Transaction.objects.filter(order__transporter_id=transporter_id))
 
 def get_recent_transactions(limit: int = 10) -> List[Transaction]:
     """Get most recent transactions"""
@@ -142,15 +113,10 @@ def get_high_value_transactions(min_amount: float) -> List[Transaction]:
 
 def get_transaction_summary_by_period(start_date, end_date) -> Dict[str, Any]:
     """Get transaction summary for a specific period"""
-    transactions = Transaction.objects.filter(created_at__range=[start_date, end_date])
-    total_transactions = transactions.count()
-    total_amount = transactions.aggregate(total_amount=Sum('amount'))
-    avg_amount = transactions.aggregate(avg_amount=Avg('amount'))
-    
+    totals = _transaction_totals(Transaction.objects.filter(created_at__range=[start_date, end_date]))
     return {
         'period_start': start_date,
         'period_end': end_date,
-        'total_transactions': total_transactions,
-        'total_amount': total_amount['total_amount'],
-        'average_amount': avg_amount['avg_amount']
-    } 
\ No newline at end of file
+        **totals
+    }
+
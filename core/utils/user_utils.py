@@ -2,6 +2,8 @@ from django.contrib.auth import get_user_model
 from django.db.models import Q
 from typing import Optional, List, Dict, Any
 from ..models import User, Profile
+from .location_utils import get_matching_locations
+from .stats_utils import aggregate_stats, count_if, choice_buckets, split_buckets
 
 User = get_user_model()
 
@@ -71,7 +73,7 @@ def get_users_with_profiles() -> List[User]:
 
 def get_users_by_location(location: str) -> List[User]:
     """Get users by location"""
-    return User.objects.filter(profile__location__icontains=location)
+    return User.objects.filter(profile__place__in=get_matching_locations(location))
 
 def get_users_by_gst_number(gst_number: str) -> List[User]:
     """Get users by GST number"""
@@ -83,17 +85,14 @@ def get_active_users() -> List[User]:
 
 def get_user_stats() -> Dict[str, Any]:
     """Get user statistics"""
-    total_users = User.objects.count()
-    verified_users = User.objects.filter(is_verified=True).count()
-    unverified_users = User.objects.filter(is_verified=False).count()
-    
-    role_stats = {}
-    for role in ['Buyer', 'Seller', 'Transporter', 'Admin']:
-        role_stats[role] = User.objects.filter(role=role).count()
-    
-    return {
-        'total_users': total_users,
-        'verified_users': verified_users,
-        'unverified_users': unverified_users,
-        'role_stats': role_stats
-    } 
\ No newline at end of file
+    roles = ['Buyer', 'Seller', 'Transporter', 'Admin']
+    stats = aggregate_stats(
+        User.objects.all(),
+        total_users=count_if(),
+        verified_users=count_if(Q(is_verified=True)),
+        unverified_users=count_if(Q(is_verified=False)),
+        **choice_buckets('role', roles, 'role')
+    )
+    stats['role_stats'] = split_buckets(stats, roles, 'role')
+    return stats
+
@@ -1,28 +1,45 @@
 from django.shortcuts import render
-from rest_framework import viewsets, permissions
+from rest_framework import mixins, viewsets, permissions
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.parsers import MultiPartParser
 from django.contrib.auth import authenticate
+from django.core.exceptions import ValidationError as DjangoValidationError
 from .models import User, Profile, Product, Enquiry, Message, Order, Transaction, AuditLog, Route
 from .serializers import (
     UserSerializer, ProfileSerializer, ProductSerializer, EnquirySerializer,
-    MessageSerializer, OrderSerializer, TransactionSerializer, AuditLogSerializer, RouteSerializer
+    MessageSerializer, OrderSerializer, TransactionSerializer, AuditLogSerializer, RouteSerializer,
+    InboxSerializer, apply_eager_loading
 )
+from .authentication import ClaimsRefreshToken
+from .cache import CATALOG_NAMESPACE, PROFILES_NAMESPACE, ROUTES_NAMESPACE
 from .permissions import IsBuyer, IsSeller, IsTransporter, IsAdmin
+from .mixins import AuditMixin, EagerLoadingMixin, FastListMixin, ConditionalGetMixin, CatalogCacheMixin, BulkCreateMixin, StreamingExportMixin
+from .filters import ProductFilter, EnquiryFilter, MessageFilter, OrderFilter
+from .pagination import TimestampCursorPagination, DateJoinedCursorPagination, IdCursorPagination, InboxCursorPagination
 import logging
 logger = logging.getLogger(__name__)
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from core.utils.product_utils import update_product, delete_product
 from core.utils.enquiry_utils import get_enquiry_by_id, respond_to_enquiry
+from core.utils.message_utils import get_inbox, get_unread_counts_by_enquiry, get_unread_messages_count, mark_enquiry_read
+from core.utils.dashboard_utils import get_dashboard_counts, get_dashboard_stats
+from core.utils.geo_utils import get_products_within_radius
+from core.utils.order_utils import get_orders_by_date_range
+from core.utils.transaction_utils import get_transactions_by_date_range
+from core.utils.audit_utils import get_audit_logs_by_date_range
+from core.utils.import_utils import ImportFormatError, import_products, iter_product_rows
+from core.utils.search_utils import SEARCH_SOURCES, search
 
 # Create your views here.
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(AuditMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
+    pagination_class = DateJoinedCursorPagination
+    ordering_fields = ['date_joined']
 
     def list(self, request, *args, **kwargs):
         try:
@@ -38,15 +55,25 @@ class UserViewSet(viewsets.ModelViewSet):
             logger.error(f"UserViewSet create error: {str(e)}", exc_info=True)
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class ProfileViewSet(viewsets.ModelViewSet):
+class ProfileViewSet(AuditMixin, ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Profile.objects.all()
     serializer_class = ProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = IdCursorPagination
+    ordering_fields = ['id']
+    conditional_namespace = PROFILES_NAMESPACE
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(AuditMixin, CatalogCacheMixin, ConditionalGetMixin, FastListMixin, BulkCreateMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.AllowAny]
+    owner_field = 'seller'
+    bulk_permission_classes = [IsSeller|IsAdmin]
+    # Saving a user also saves its profile, which bumps the catalog (and moves its timestamp)
+    conditional_namespace = CATALOG_NAMESPACE
+    conditional_timestamp_fields = ('updated_at', 'seller__profile__updated_at')
+    filterset_class = ProductFilter
+    ordering_fields = ['created_at', 'price', 'quantity', 'commodity_type']
 
     @action(detail=True, methods=['patch'], permission_classes=[IsSeller|IsAdmin])
     def update_product(self, request, pk=None):
@@ -68,10 +95,56 @@ class ProductViewSet(viewsets.ModelViewSet):
         product = self.get_object()
         return Response(ProductSerializer(product).data)
 
-class EnquiryViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser], permission_classes=[IsSeller|IsAdmin])
+    def import_file(self, request):
+        """Import products for the current user from an uploaded CSV (or .xlsx) sheet"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload the sheet as the multipart field "file"'}, status=status.HTTP_400_BAD_REQUEST)
+        flags = {name: str(request.data.get(name, '')).lower() in ('1', 'true', 'yes') for name in ('dry_run', 'atomic')}
+        try:
+            report = import_products(iter_product_rows(upload, upload.name), request.user, **flags)
+        except ImportFormatError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if report['created']:
+            return Response(report, status=status.HTTP_201_CREATED)
+        if report['failed'] and not flags['dry_run']:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    def nearby(self, request):
+        """Products picked up within radius_km of (lat, lng), nearest first"""
+        try:
+            latitude = float(request.query_params['lat'])
+            longitude = float(request.query_params['lng'])
+            radius_km = float(request.query_params.get('radius_km', 50))
+            limit = int(request.query_params.get('limit', 50))
+        except (KeyError, ValueError):
+            return Response({'error': 'lat and lng are required numbers'}, status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or not 0 < radius_km <= 1000:
+            return Response({'error': 'Coordinates or radius_km out of range'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        nearby = get_products_within_radius(latitude, longitude, radius_km, queryset)[:max(1, min(limit, 500))]
+        products = queryset.in_bulk([product_id for product_id, _ in nearby])
+        results = []
+        for product_id, distance in nearby:
+            item = self.get_serializer(products[product_id]).data
+            item['distance_km'] = round(distance, 2)
+            results.append(item)
+        return Response({'results': results})
+
+class EnquiryViewSet(AuditMixin, BulkCreateMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Enquiry.objects.all()
     serializer_class = EnquirySerializer
     permission_classes = [IsBuyer|IsSeller|IsAdmin]
+    owner_field = 'buyer'
+    bulk_permission_classes = [IsBuyer|IsAdmin]
+    filterset_class = EnquiryFilter
+    # Cursor orderings must be non-null (see KeysetCursorPaginationMixin)
+    ordering_fields = ['created_at', 'quantity', 'status']
+    unaudited_actions = ('read',)
 
     @action(detail=True, methods=['patch'], permission_classes=[IsSeller|IsAdmin])
     def respond(self, request, pk=None):
@@ -82,36 +155,92 @@ class EnquiryViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Enquiry not found'}, status=404)
         return Response(EnquirySerializer(enquiry).data)
 
-class MessageViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['post'], permission_classes=[IsBuyer|IsSeller])
+    def read(self, request, pk=None):
+        """Mark the thread read up to `message` (default: the latest message)"""
+        try:
+            # The router accepts any path segment: like get_object(), a non-numeric pk is a 404
+            enquiry_id = Enquiry._meta.pk.to_python(pk)
+        except DjangoValidationError:
+            return Response({'error': 'Enquiry not found'}, status=404)
+        participants = Enquiry.objects.filter(pk=enquiry_id).values_list('buyer_id', 'product__seller_id').first()
+        if participants is None:
+            return Response({'error': 'Enquiry not found'}, status=404)
+        if request.user.pk not in participants:
+            return Response({'error': 'Only the buyer and seller of an enquiry can mark it read'}, status=403)
+        message_id = request.data.get('message')
+        if message_id is not None and not (str(message_id).isdigit() and Message.objects.filter(pk=message_id, enquiry_id=enquiry_id).exists()):
+            return Response({'message': ['A message of this enquiry is required.']}, status=400)
+        state = mark_enquiry_read(request.user.pk, enquiry_id, int(message_id) if message_id is not None else None)
+        return Response({
+            'enquiry': state.enquiry_id, 'last_read_id': state.last_read_id,
+            'unread': state.unread_count, 'total_unread': get_unread_messages_count(request.user.pk),
+        })
+
+class MessageViewSet(AuditMixin, BulkCreateMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Message.objects.all()
     serializer_class = MessageSerializer
     permission_classes = [IsBuyer|IsSeller|IsAdmin]
+    owner_field = 'sender'
+    pagination_class = TimestampCursorPagination
+    filterset_class = MessageFilter
+    ordering_fields = ['timestamp']
 
-class OrderViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def unread(self, request):
+        """Unread badge: the user's total, plus per-enquiry counts with ?by_enquiry=true"""
+        data = {'unread': get_unread_messages_count(request.user.pk)}
+        if request.query_params.get('by_enquiry') in ('1', 'true'):
+            data['enquiries'] = get_unread_counts_by_enquiry(request.user.pk)
+        return Response(data)
+
+class InboxViewSet(FastListMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    """The requesting user's enquiry threads, most recent activity first"""
+    serializer_class = InboxSerializer
+    permission_classes = [IsBuyer|IsSeller]
+    pagination_class = InboxCursorPagination
+    # The fixed keyset order is what the inbox index serves
+    filter_backends = []
+
+    def get_queryset(self):
+        return get_inbox(self.request.user.pk)
+
+class OrderViewSet(AuditMixin, StreamingExportMixin, FastListMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsBuyer|IsSeller|IsTransporter|IsAdmin]
+    filterset_class = OrderFilter
+    ordering_fields = ['created_at', 'updated_at', 'status']
+    export_permission_classes = [IsAdmin]
+    export_date_range = staticmethod(get_orders_by_date_range)
 
     @action(detail=False, methods=['get'], permission_classes=[IsTransporter])
     def available_jobs(self, request):
-        jobs = Order.objects.filter(status='Requested', transporter__isnull=True)
-        serializer = self.get_serializer(jobs, many=True)
-        return Response(serializer.data)
+        jobs = self.filter_queryset(self.get_queryset()).filter(status='Requested', transporter__isnull=True)
+        return self.get_list_response(jobs)
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(AuditMixin, StreamingExportMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
     permission_classes = [IsBuyer|IsSeller|IsAdmin]
+    export_permission_classes = [IsAdmin]
+    export_date_range = staticmethod(get_transactions_by_date_range)
+    ordering_fields = ['created_at']
 
-class AuditLogViewSet(viewsets.ModelViewSet):
+class AuditLogViewSet(AuditMixin, StreamingExportMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = AuditLog.objects.all()
     serializer_class = AuditLogSerializer
     permission_classes = [IsAdmin]
+    pagination_class = TimestampCursorPagination
+    export_date_range = staticmethod(get_audit_logs_by_date_range)
+    ordering_fields = ['timestamp']
 
-class RouteViewSet(viewsets.ModelViewSet):
+class RouteViewSet(AuditMixin, ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Route.objects.all()
     serializer_class = RouteSerializer
     permission_classes = [IsTransporter|IsAdmin]
+    ordering_fields = ['created_at']
+    conditional_namespace = ROUTES_NAMESPACE
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -135,13 +264,14 @@ def register(request):
             password=data['password'],
             role=data['role']
         )
-        Profile.objects.filter(user=user).update(
-            gst_number=data['gst_number'],
-            kyc_document=data['kyc_document'],
-            location=data['location'],
-            contact_info=data['contact_info']
-        )
-        refresh = RefreshToken.for_user(user)
+        # save() runs the profile signals: canonical place, profiles ETag version
+        profile = user.profile
+        profile.gst_number = data['gst_number']
+        profile.kyc_document = data['kyc_document']
+        profile.location = data['location']
+        profile.contact_info = data['contact_info']
+        profile.save()
+        refresh = ClaimsRefreshToken.for_user(user)
         logger.info(f"User registered: {user.email}")
         return Response({
             'user_id': user.id,
@@ -167,7 +297,7 @@ def login(request):
         if user is None:
             logger.warning(f"Login failed for email: {email}")
             return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
         logger.info(f"User logged in: {user.email}")
         return Response({
             'user_id': user.id,
@@ -183,3 +313,62 @@ def login(request):
         return Response({'error': f'Login failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 from rest_framework_simplejwt.views import TokenRefreshView
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard(request):
+    """Dashboard counters for the current user, read from the rollup table"""
+    user = request.user
+    return Response({
+        'role': user.role,
+        'metrics': get_dashboard_stats(user.id, user.role),
+        'counts': get_dashboard_counts(user.id, user.role),
+    })
+
+# Each entity is searchable by the roles its viewset admits, rendered by that viewset's serializer
+SEARCH_VIEWSETS = {
+    'product': ProductViewSet,
+    'enquiry': EnquiryViewSet,
+    'message': MessageViewSet,
+    'order': OrderViewSet,
+    'transaction': TransactionViewSet,
+}
+
+def searchable_entities(request):
+    return [
+        entity for entity, viewset in SEARCH_VIEWSETS.items()
+        if all(permission().has_permission(request, viewset()) for permission in viewset.permission_classes)
+    ]
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_view(request):
+    """Ranked full-text search across products, enquiries, messages, orders and transactions"""
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'Query parameter q is required'}, status=status.HTTP_400_BAD_REQUEST)
+    allowed = searchable_entities(request)
+    entities = [entity for entity in request.query_params.get('type', '').split(',') if entity] or allowed
+    unknown = [entity for entity in entities if entity not in SEARCH_SOURCES]
+    if unknown:
+        return Response({'error': f"Unknown type: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+    forbidden = [entity for entity in entities if entity not in allowed]
+    if forbidden:
+        return Response({'error': f"Not allowed to search: {', '.join(forbidden)}"}, status=status.HTTP_403_FORBIDDEN)
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 10)), 50))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = {}
+    for entity, matches in search(query, entities, limit).items():
+        serializer_class = SEARCH_VIEWSETS[entity].serializer_class
+        queryset = apply_eager_loading(SEARCH_SOURCES[entity][0].objects.all(), serializer_class())
+        objects = queryset.in_bulk([object_id for object_id, _ in matches])
+        results[entity] = []
+        for object_id, rank in matches:
+            if object_id in objects:
+                item = serializer_class(objects[object_id], context={'request': request}).data
+                item['rank'] = rank
+                results[entity].append(item)
+    return Response({'query': query, 'results': results})
@@ -0,0 +1,75 @@
+import * as React from "react"
+import axios from "axios"
+
+type EventHandlers = Record<string, (data: any) => void>
+
+const RECONNECT_DELAY_MS = 3000
+
+// Exchange the stored refresh token for a new access token; false when the
+// session is over (no refresh token, or the server refused it)
+async function refreshAccessToken() {
+  const refresh = localStorage.getItem("refresh_token")
+  if (!refresh) return false
+  try {
+    const apiUrl = import.meta.env.VITE_API_URL
+    const res = await axios.post(`${apiUrl}auth/refresh/`, { refresh })
+    localStorage.setItem("access_token", res.data.access)
+    if (res.data.refresh) localStorage.setItem("refresh_token", res.data.refresh)
+    return true
+  } catch (err) {
+    return false
+  }
+}
+
+// Server-Sent Events from /api/events/ for the signed-in user. EventSource
+// retries dropped connections by itself, but a refused one (401 once the
+// access token expires or its claims change) closes for good: the stream
+// then refreshes the token and reconnects from the last event it saw, and
+// onReconnect lets the page refetch in case events fell out of the history.
+export function useEventStream(handlers: EventHandlers, { enabled = true, onReconnect }: { enabled?: boolean; onReconnect?: () => void } = {}) {
+  const handlersRef = React.useRef(handlers)
+  const onReconnectRef = React.useRef(onReconnect)
+  handlersRef.current = handlers
+  onReconnectRef.current = onReconnect
+  const events = Object.keys(handlers).join(",")
+
+  React.useEffect(() => {
+    if (!enabled) return
+    const apiUrl = import.meta.env.VITE_API_URL
+    let source: EventSource | null = null
+    let lastEventId = ""
+    let timer: ReturnType<typeof setTimeout> | undefined
+    let closed = false
+
+    const connect = (reconnected = false) => {
+      const token = localStorage.getItem("access_token")
+      if (closed || !token) return
+      // EventSource cannot send headers, so the token goes in the query string
+      const params = new URLSearchParams({ access_token: token })
+      if (lastEventId) params.set("last_event_id", lastEventId)
+      source = new EventSource(`${apiUrl}events/?${params}`)
+      for (const name of events.split(",")) {
+        source.addEventListener(name, (event) => {
+          const message = event as MessageEvent
+          lastEventId = message.lastEventId || lastEventId
+          handlersRef.current[name]?.(JSON.parse(message.data))
+        })
+      }
+      if (reconnected) source.addEventListener("open", () => onReconnectRef.current?.(), { once: true })
+      source.onerror = () => {
+        if (!source || source.readyState !== EventSource.CLOSED) return
+        source.close()
+        refreshAccessToken().then((refreshed) => {
+          if (refreshed && !closed) timer = setTimeout(() => connect(true), RECONNECT_DELAY_MS)
+        })
+      }
+    }
+
+    connect()
+    return () => {
+      closed = true
+      clearTimeout(timer)
+      source?.close()
+    }
+  }, [enabled, events])
+}
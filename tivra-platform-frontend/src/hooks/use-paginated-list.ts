@@ -0,0 +1,76 @@
+import * as React from "react"
+import axios from "axios"
+
+type ListParams = Record<string, string | number | boolean | undefined>
+
+// Cursor-paginated DRF list: filters go to the server as query parameters, the
+// first page loads whenever they change and loadMore() follows `next`, so the
+// page shows every matching row instead of filtering one downloaded page.
+export function usePaginatedList<T = any>(path: string, params: ListParams = {}, { auth = true } = {}) {
+  const [items, setItems] = React.useState<T[]>([])
+  const [next, setNext] = React.useState<string | null>(null)
+  const [loading, setLoading] = React.useState(true)
+  const [loadingMore, setLoadingMore] = React.useState(false)
+  // Responses to superseded requests (an older filter) are dropped
+  const generation = React.useRef(0)
+  const query = JSON.stringify(
+    Object.fromEntries(Object.entries(params).filter(([, value]) => value !== undefined && value !== ""))
+  )
+
+  const headers = () => {
+    const token = localStorage.getItem("access_token")
+    return auth && token ? { Authorization: `Bearer ${token}` } : {}
+  }
+
+  const reload = React.useCallback(async (showLoading = true) => {
+    const current = ++generation.current
+    if (showLoading) setLoading(true)
+    try {
+      const apiUrl = import.meta.env.VITE_API_URL
+      const res = await axios.get(`${apiUrl}${path}`, { headers: headers(), params: JSON.parse(query) })
+      if (current !== generation.current) return
+      setItems(res.data.results ?? res.data)
+      setNext(res.data.next ?? null)
+    } catch (err) {
+      if (current !== generation.current) return
+      setItems([])
+      setNext(null)
+    } finally {
+      if (current === generation.current) setLoading(false)
+    }
+  }, [path, query, auth])
+
+  React.useEffect(() => {
+    reload()
+  }, [reload])
+
+  const loadMore = async () => {
+    if (!next || loadingMore) return
+    const current = generation.current
+    setLoadingMore(true)
+    try {
+      const res = await axios.get(next, { headers: headers() })
+      if (current !== generation.current) return
+      setItems((loaded) => [...loaded, ...(res.data.results ?? [])])
+      setNext(res.data.next ?? null)
+    } catch (err) {
+      console.error("Load more failed:", err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  return { items, setItems, loading, loadingMore, hasMore: next !== null, loadMore, reload }
+}
+
+// The value after it has stopped changing for `delay` ms (search boxes)
+export function useDebouncedValue<T>(value: T, delay = 300) {
+  const [debounced, setDebounced] = React.useState(value)
+
+  React.useEffect(() => {
+    const timer = setTimeout(() => setDebounced(value), delay)
+    return () => clearTimeout(timer)
+  }, [value, delay])
+
+  return debounced
+}
@@ -1,7 +1,7 @@
 
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
-import { Search, Filter, ShoppingCart, Clock, MessageSquare, Star, MapPin } from 'lucide-react';
+import { Search, Filter, ShoppingCart, TrendingUp, MessageSquare, Star, MapPin } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Input } from '@/components/ui/input';
@@ -15,6 +15,7 @@ const BuyerDashboard = () => {
   const [products, setProducts] = useState([]);
   const [orders, setOrders] = useState([]);
   const [enquiries, setEnquiries] = useState([]);
+  const [stats, setStats] = useState({ metrics: {}, counts: {} });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
 
@@ -47,19 +48,25 @@ const BuyerDashboard = () => {
           headers: { Authorization: `Bearer ${token}` },
         });
         console.log('Products response:', productsResponse);
-        setProducts(productsResponse.data || []);
+        setProducts(productsResponse.data?.results ?? productsResponse.data ?? []);
 
         // Fetch orders
         const ordersResponse = await axios.get(`${apiUrl}orders/`, {
           headers: { Authorization: `Bearer ${token}` },
         });
-        setOrders(ordersResponse.data || []);
+        setOrders(ordersResponse.data?.results ?? ordersResponse.data ?? []);
 
         // Fetch enquiries
         const enquiriesResponse = await axios.get(`${apiUrl}enquiries/`, {
           headers: { Authorization: `Bearer ${token}` },
         });
-        setEnquiries(enquiriesResponse.data || []);
+        setEnquiries(enquiriesResponse.data?.results ?? enquiriesResponse.data ?? []);
+
+        // Stat cards: all-time totals, not the length of one page of the lists above
+        const dashboardResponse = await axios.get(`${apiUrl}dashboard/`, {
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        setStats(dashboardResponse.data);
 
       } catch (err: any) {
         console.error('Data fetch error:', err);
@@ -75,6 +82,7 @@ const BuyerDashboard = () => {
         setProducts([]);
         setOrders([]);
         setEnquiries([]);
+        setStats({ metrics: {}, counts: {} });
       } finally {
         setLoading(false);
       }
@@ -83,6 +91,9 @@ const BuyerDashboard = () => {
     fetchData();
   }, []);
 
+  const metric = (name) => stats.metrics[name]?.count ?? 0;
+  const spend = Number(stats.metrics['transactions']?.amount ?? 0);
+
   // Example: Send new enquiry
   const sendEnquiry = async (productId, quantity, offeredPrice) => {
     const token = localStorage.getItem('access_token');
@@ -99,7 +110,7 @@ const BuyerDashboard = () => {
       const res = await axios.get(`${apiUrl}enquiries/`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setEnquiries(res.data || []);
+      setEnquiries(res.data?.results ?? res.data ?? []);
     } catch (err) {
       console.error('Send enquiry error:', err, err?.response);
     }
@@ -120,7 +131,7 @@ const BuyerDashboard = () => {
       const res = await axios.get(`${apiUrl}orders/`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setOrders(res.data || []);
+      setOrders(res.data?.results ?? res.data ?? []);
     } catch (err) {
       console.error('Create order error:', err, err?.response);
     }
@@ -234,7 +245,7 @@ const BuyerDashboard = () => {
               <ShoppingCart className="h-4 w-4 text-muted-foreground" />
             </CardHeader>
             <CardContent>
-              <div className="text-2xl font-bold">{orders.length}</div>
+              <div className="text-2xl font-bold">{metric('orders')}</div>
               <p className="text-xs text-muted-foreground">Total orders</p>
             </CardContent>
           </Card>
@@ -244,18 +255,18 @@ const BuyerDashboard = () => {
               <MessageSquare className="h-4 w-4 text-muted-foreground" />
             </CardHeader>
             <CardContent>
-              <div className="text-2xl font-bold">{enquiries.filter(e => e.status === 'Pending').length}</div>
+              <div className="text-2xl font-bold">{metric('enquiries_pending')}</div>
               <p className="text-xs text-muted-foreground">Awaiting response</p>
             </CardContent>
           </Card>
           <Card>
             <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
-              <CardTitle className="text-sm font-medium">Available Products</CardTitle>
-              <Clock className="h-4 w-4 text-muted-foreground" />
+              <CardTitle className="text-sm font-medium">Total Spend</CardTitle>
+              <TrendingUp className="h-4 w-4 text-muted-foreground" />
             </CardHeader>
             <CardContent>
-              <div className="text-2xl font-bold">{products.length}</div>
-              <p className="text-xs text-muted-foreground">Ready to buy</p>
+              <div className="text-2xl font-bold">₹{spend.toLocaleString('en-IN')}</div>
+              <p className="text-xs text-muted-foreground">All time</p>
             </CardContent>
           </Card>
           <Card>
@@ -264,7 +275,7 @@ const BuyerDashboard = () => {
               <Star className="h-4 w-4 text-muted-foreground" />
             </CardHeader>
             <CardContent>
-              <div className="text-2xl font-bold">{enquiries.length}</div>
+              <div className="text-2xl font-bold">{metric('enquiries')}</div>
               <p className="text-xs text-muted-foreground">All time</p>
             </CardContent>
           </Card>
@@ -14,12 +14,12 @@ const Deliveries = () => {
         const token = localStorage.getItem('access_token');
         const userId = localStorage.getItem('user_id');
         const apiUrl = import.meta.env.VITE_API_URL;
+        // Only show deliveries assigned to this transporter
         const res = await axios.get(`${apiUrl}orders/`, {
           headers: { Authorization: `Bearer ${token}` },
+          params: { transporter: userId },
         });
-        // Only show deliveries assigned to this transporter
-        const filtered = res.data.filter(order => order.transporter && String(order.transporter.id) === String(userId));
-        setDeliveries(filtered);
+        setDeliveries(res.data.results ?? res.data);
       } catch (err) {
         setDeliveries([]);
       } finally {
@@ -1,39 +1,21 @@
-import React, { useEffect, useState } from 'react';
+import React, { useState } from 'react';
 import { MessageSquare, Search } from 'lucide-react';
-import axios from 'axios';
+import { useDebouncedValue, usePaginatedList } from '@/hooks/use-paginated-list';
+import { useEventStream } from '@/hooks/use-event-stream';
 
 const Enquiries = () => {
-  const [enquiries, setEnquiries] = useState([]);
-  const [loading, setLoading] = useState(true);
   const [search, setSearch] = useState('');
+  const query = useDebouncedValue(search.trim());
+  // Searched by the server (?q=) and paged through with Load more
+  const { items: enquiries, setItems: setEnquiries, loading, loadingMore, hasMore, loadMore, reload } = usePaginatedList('enquiries/', { q: query });
 
-  useEffect(() => {
-    const fetchEnquiries = async () => {
-      setLoading(true);
-      try {
-        const token = localStorage.getItem('access_token');
-        const apiUrl = import.meta.env.VITE_API_URL;
-        const res = await axios.get(`${apiUrl}enquiries/`, {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        setEnquiries(res.data);
-      } catch (err) {
-        setEnquiries([]);
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchEnquiries();
-  }, []);
-
-  const filtered = enquiries.filter((enq) => {
-    const product = enq.product?.commodity_type || '';
-    const status = enq.status || '';
-    return (
-      product.toLowerCase().includes(search.toLowerCase()) ||
-      status.toLowerCase().includes(search.toLowerCase())
-    );
-  });
+  // Status changes are pushed over Server-Sent Events; a new enquiry reloads the first page once
+  useEventStream({
+    'enquiry.updated': (update) => {
+      setEnquiries((current) => current.map((enq) => enq.id === update.id ? { ...enq, status: update.status } : enq));
+    },
+    'enquiry.created': () => reload(false),
+  }, { onReconnect: () => reload(false) });
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-green-50 to-yellow-50 flex flex-col items-center py-12">
@@ -53,14 +35,14 @@ const Enquiries = () => {
         </div>
         {loading ? (
           <div className="text-gray-500 text-center py-12">Loading...</div>
-        ) : filtered.length === 0 ? (
+        ) : enquiries.length === 0 ? (
           <div className="text-gray-500 text-center py-12">
             <p className="mb-2">You have no enquiries yet.</p>
             <p>Start exploring products and send your first enquiry!</p>
           </div>
         ) : (
           <div className="space-y-4">
-            {filtered.map((enq) => (
+            {enquiries.map((enq) => (
               <div key={enq.id} className="p-4 rounded-lg border bg-gray-50 flex flex-col md:flex-row md:items-center md:justify-between">
                 <div>
                   <div className="font-semibold text-green-700">{enq.product?.commodity_type || 'Product'}</div>
@@ -76,6 +58,17 @@ const Enquiries = () => {
             ))}
           </div>
         )}
+        {!loading && hasMore && (
+          <div className="text-center mt-6">
+            <button
+              className="px-4 py-2 rounded border border-green-300 text-green-800 hover:bg-green-50 disabled:opacity-50"
+              onClick={loadMore}
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
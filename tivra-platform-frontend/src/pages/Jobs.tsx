@@ -1,35 +1,14 @@
-import React, { useEffect, useState } from 'react';
+import React, { useState } from 'react';
 import { PackageSearch, Search } from 'lucide-react';
-import axios from 'axios';
+import { useDebouncedValue, usePaginatedList } from '@/hooks/use-paginated-list';
 
 const Jobs = () => {
-  const [jobs, setJobs] = useState([]);
-  const [loading, setLoading] = useState(true);
   const [search, setSearch] = useState('');
+  const query = useDebouncedValue(search.trim());
+  // Searched by the server (?q=) and paged through with Load more
+  const { items: jobs, loading, loadingMore, hasMore, loadMore } = usePaginatedList('orders/available_jobs/', { q: query });
 
-  useEffect(() => {
-    const fetchJobs = async () => {
-      setLoading(true);
-      try {
-        const token = localStorage.getItem('access_token');
-        const apiUrl = import.meta.env.VITE_API_URL;
-        const res = await axios.get(`${apiUrl}orders/available_jobs/`, {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        setJobs(res.data);
-      } catch (err) {
-        setJobs([]);
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchJobs();
-  }, []);
-
-  const filtered = jobs.filter((job) => {
-    const product = job.enquiry?.product?.commodity_type || '';
-    const location = job.enquiry?.product?.pickup_location || '';
-    return (
+  return (
       product.toLowerCase().includes(search.toLowerCase()) ||
       location.toLowerCase().includes(search.toLowerCase())
     );
@@ -53,14 +32,14 @@ const Jobs = () => {
         </div>
         {loading ? (
           <div className="text-gray-500 text-center py-12">Loading...</div>
-        ) : filtered.length === 0 ? (
+        ) : jobs.length === 0 ? (
           <div className="text-gray-500 text-center py-12">
             <p className="mb-2">No jobs available yet.</p>
             <p>Available jobs for transporters will appear here.</p>
           </div>
         ) : (
           <div className="space-y-4">
-            {filtered.map((job) => (
+            {jobs.map((job) => (
               <div key={job.id} className="p-4 rounded-lg border bg-gray-50 flex flex-col md:flex-row md:items-center md:justify-between">
                 <div>
                   <div className="font-semibold text-green-700">{job.enquiry?.product?.commodity_type || 'Product'}</div>
@@ -76,6 +55,17 @@ const Jobs = () => {
             ))}
           </div>
         )}
+        {!loading && hasMore && (
+          <div className="text-center mt-6">
+            <button
+              className="px-4 py-2 rounded border border-green-300 text-green-800 hover:bg-green-50 disabled:opacity-50"
+              onClick={loadMore}
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -1,39 +1,21 @@
-import React, { useEffect, useState } from 'react';
+import React, { useState } from 'react';
 import { Mail, Search } from 'lucide-react';
-import axios from 'axios';
+import { useDebouncedValue, usePaginatedList } from '@/hooks/use-paginated-list';
+import { useEventStream } from '@/hooks/use-event-stream';
 
 const Messages = () => {
-  const [messages, setMessages] = useState([]);
-  const [loading, setLoading] = useState(true);
   const [search, setSearch] = useState('');
+  const query = useDebouncedValue(search.trim());
+  // Searched by the server (?q=) and paged through with Load more
+  const { items: messages, setItems: setMessages, loading, loadingMore, hasMore, loadMore, reload } = usePaginatedList('messages/', { q: query });
 
-  useEffect(() => {
-    const fetchMessages = async () => {
-      setLoading(true);
-      try {
-        const token = localStorage.getItem('access_token');
-        const apiUrl = import.meta.env.VITE_API_URL;
-        const res = await axios.get(`${apiUrl}messages/`, {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        setMessages(res.data);
-      } catch (err) {
-        setMessages([]);
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchMessages();
-  }, []);
-
-  const filtered = messages.filter((msg) => {
-    const sender = msg.sender?.username || '';
-    const content = msg.content || '';
-    return (
-      sender.toLowerCase().includes(search.toLowerCase()) ||
-      content.toLowerCase().includes(search.toLowerCase())
-    );
-  });
+  // New replies are pushed over Server-Sent Events instead of refetching;
+  // while searching the list only shows what the server matched
+  useEventStream({
+    'message.created': (message) => {
+      setMessages((current) => current.some((msg) => msg.id === message.id) ? current : [message, ...current]);
+    },
+  }, { enabled: !query, onReconnect: () => reload(false) });
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-green-50 to-yellow-50 flex flex-col items-center py-12">
@@ -53,14 +35,14 @@ const Messages = () => {
         </div>
         {loading ? (
           <div className="text-gray-500 text-center py-12">Loading...</div>
-        ) : filtered.length === 0 ? (
+        ) : messages.length === 0 ? (
           <div className="text-gray-500 text-center py-12">
             <p className="mb-2">No messages yet.</p>
             <p>Messages from sellers and transporters will appear here.</p>
           </div>
         ) : (
           <div className="space-y-4">
-            {filtered.map((msg) => (
+            {messages.map((msg) => (
               <div key={msg.id} className="p-4 rounded-lg border bg-gray-50 flex flex-col md:flex-row md:items-center md:justify-between">
                 <div>
                   <div className="font-semibold text-green-700">From: {msg.sender?.username || 'Unknown'}</div>
@@ -76,6 +58,17 @@ const Messages = () => {
             ))}
           </div>
         )}
+        {!loading && hasMore && (
+          <div className="text-center mt-6">
+            <button
+              className="px-4 py-2 rounded border border-green-300 text-green-800 hover:bg-green-50 disabled:opacity-50"
+              onClick={loadMore}
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
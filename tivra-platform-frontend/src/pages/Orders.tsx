@@ -1,39 +1,12 @@
-import React, { useEffect, useState } from 'react';
+import React, { useState } from 'react';
 import { Package, Search } from 'lucide-react';
-import axios from 'axios';
+import { useDebouncedValue, usePaginatedList } from '@/hooks/use-paginated-list';
 
 const Orders = () => {
-  const [orders, setOrders] = useState([]);
-  const [loading, setLoading] = useState(true);
   const [search, setSearch] = useState('');
-
-  useEffect(() => {
-    const fetchOrders = async () => {
-      setLoading(true);
-      try {
-        const token = localStorage.getItem('access_token');
-        const apiUrl = import.meta.env.VITE_API_URL;
-        const res = await axios.get(`${apiUrl}orders/`, {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        setOrders(res.data);
-      } catch (err) {
-        setOrders([]);
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchOrders();
-  }, []);
-
-  const filtered = orders.filter((order) => {
-    const product = order.enquiry?.product?.commodity_type || '';
-    const status = order.status || '';
-    return (
-      product.toLowerCase().includes(search.toLowerCase()) ||
-      status.toLowerCase().includes(search.toLowerCase())
-    );
-  });
+  const query = useDebouncedValue(search.trim());
+  // Searched by the server (?q=) and paged through with Load more
+  const { items: orders, loading, loadingMore, hasMore, loadMore } = usePaginatedList('orders/', { q: query });
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-green-50 to-yellow-50 flex flex-col items-center py-12">
@@ -53,14 +26,14 @@ const Orders = () => {
         </div>
         {loading ? (
           <div className="text-gray-500 text-center py-12">Loading...</div>
-        ) : filtered.length === 0 ? (
+        ) : orders.length === 0 ? (
           <div className="text-gray-500 text-center py-12">
             <p className="mb-2">You have no orders yet.</p>
             <p>Place an enquiry and your orders will appear here.</p>
           </div>
         ) : (
           <div className="space-y-4">
-            {filtered.map((order) => (
+            {orders.map((order) => (
               <div key={order.id} className="p-4 rounded-lg border bg-gray-50 flex flex-col md:flex-row md:items-center md:justify-between">
                 <div>
                   <div className="font-semibold text-green-700">{order.enquiry?.product?.commodity_type || 'Product'}</div>
@@ -76,6 +49,17 @@ const Orders = () => {
             ))}
           </div>
         )}
+        {!loading && hasMore && (
+          <div className="text-center mt-6">
+            <button
+              className="px-4 py-2 rounded border border-green-300 text-green-800 hover:bg-green-50 disabled:opacity-50"
+              onClick={loadMore}
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
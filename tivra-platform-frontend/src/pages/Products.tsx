@@ -6,53 +6,38 @@ import { Button } from '@/components/ui/button';
 import { Card, CardContent } from '@/components/ui/card';
 import { Input } from '@/components/ui/input';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
-import axios from 'axios';
+import { useDebouncedValue, usePaginatedList } from '@/hooks/use-paginated-list';
+
+// Sort choices as ?ordering= values (see ProductViewSet.ordering_fields)
+const SORT_ORDERING: Record<string, string> = {
+  name: 'commodity_type',
+  price_low: 'price',
+  price_high: '-price',
+};
 
 const Products = () => {
-  const [products, setProducts] = useState([]);
   const [searchTerm, setSearchTerm] = useState('');
   const [selectedCategory, setSelectedCategory] = useState('');
   const [selectedLocation, setSelectedLocation] = useState('');
   const [sortBy, setSortBy] = useState('');
+  const [uniqueCategories, setUniqueCategories] = useState<string[]>([]);
+  const [uniqueLocations, setUniqueLocations] = useState<string[]>([]);
+  const query = useDebouncedValue(searchTerm.trim());
 
-  useEffect(() => {
-    const apiUrl = import.meta.env.VITE_API_URL;
-    axios.get(`${apiUrl}products/`)
-      .then((res) => setProducts(res.data))
-      .catch((err) => { console.error('Products error:', err, err?.response); });
-  }, []);
-
-  const filteredProducts = products.filter(product => {
-    // Use backend field names and safe access
-    const name = product.commodity_type || '';
-    const location = product.pickup_location || '';
-    const sellerName = product.seller?.username || '';
-    const matchesSearch = name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                         location.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                         sellerName.toLowerCase().includes(searchTerm.toLowerCase());
-    // Category filter (if you want to filter by commodity_type)
-    const matchesCategory = !selectedCategory || selectedCategory === 'all' || product.commodity_type === selectedCategory;
-    const matchesLocation = !selectedLocation || selectedLocation === 'all' || location === selectedLocation;
-    return matchesSearch && matchesCategory && matchesLocation;
-  });
-
-  const sortedProducts = [...filteredProducts].sort((a, b) => {
-    switch (sortBy) {
-      case 'price_low':
-        return a.price - b.price;
-      case 'price_high':
-        return b.price - a.price;
-      case 'rating':
-        return (b.seller?.profile?.rating || 0) - (a.seller?.profile?.rating || 0);
-      case 'name':
-        return (a.commodity_type || '').localeCompare(b.commodity_type || '');
-      default:
-        return 0;
-    }
-  });
+  // Search, filters and sorting run on the server; Load More follows the cursor
+  const { items: products, loading, loadingMore, hasMore, loadMore } = usePaginatedList('products/', {
+    q: query,
+    commodity_type: selectedCategory === 'all' ? undefined : selectedCategory,
+    location: selectedLocation === 'all' ? undefined : selectedLocation,
+    ordering: SORT_ORDERING[sortBy],
+  }, { auth: false });
 
-  const uniqueLocations = [...new Set(products.map(p => p.pickup_location || '').filter(Boolean))];
-  const uniqueCategories = [...new Set(products.map(p => p.commodity_type || '').filter(Boolean))];
+  // Options only grow, so narrowing the list does not hide the other choices
+  useEffect(() => {
+    const merge = (current: string[], values: string[]) => [...new Set([...current, ...values.filter(Boolean)])];
+    setUniqueCategories((current) => merge(current, products.map(p => p.commodity_type || '')));
+    setUniqueLocations((current) => merge(current, products.map(p => p.pickup_location || '')));
+  }, [products]);
 
   return (
     <div className="min-h-screen bg-gray-50">
@@ -110,7 +95,6 @@ const Products = () => {
                   <SelectItem value="name">Name</SelectItem>
                   <SelectItem value="price_low">Price: Low to High</SelectItem>
                   <SelectItem value="price_high">Price: High to Low</SelectItem>
-                  <SelectItem value="rating">Rating</SelectItem>
                 </SelectContent>
               </Select>
             </div>
@@ -120,7 +104,7 @@ const Products = () => {
         {/* Results Info */}
         <div className="flex justify-between items-center mb-6">
           <p className="text-gray-600">
-            Showing {sortedProducts.length} of {products.length} products
+            Showing {products.length}{hasMore ? '+' : ''} products
           </p>
           <Button variant="outline">
             <Filter className="h-4 w-4 mr-2" />
@@ -130,7 +114,7 @@ const Products = () => {
 
         {/* Products Grid */}
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
-          {sortedProducts.map((product) => (
+          {products.map((product) => (
             <Card key={product.id} className="hover:shadow-lg transition-shadow cursor-pointer">
               <Link to={`/products/${product.id}`}>
                 <div className="h-48 bg-gradient-to-br from-green-100 to-green-200 rounded-t-lg"></div>
@@ -167,16 +151,16 @@ const Products = () => {
         </div>
 
         {/* Load More */}
-        {sortedProducts.length > 0 && (
+        {!loading && hasMore && (
           <div className="text-center mt-8">
-            <Button variant="outline" size="lg">
-              Load More Products
+            <Button variant="outline" size="lg" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? 'Loading...' : 'Load More Products'}
             </Button>
           </div>
         )}
 
         {/* No Results */}
-        {sortedProducts.length === 0 && (
+        {!loading && products.length === 0 && (
           <div className="text-center py-12">
             <div className="text-gray-400 mb-4">
               <Search className="h-16 w-16 mx-auto" />
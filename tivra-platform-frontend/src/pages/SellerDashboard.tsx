@@ -1,6 +1,6 @@
 
 import React, { useState, useEffect } from 'react';
-import { Package, Plus, MessageSquare, TrendingUp, Eye, Edit, Trash2 } from 'lucide-react';
+import { Package, Plus, MessageSquare, TrendingUp, ShoppingCart, Edit, Trash2 } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Input } from '@/components/ui/input';
@@ -16,6 +16,7 @@ const SellerDashboard = () => {
   const [products, setProducts] = useState([]);
   const [enquiries, setEnquiries] = useState([]);
   const [orders, setOrders] = useState([]);
+  const [stats, setStats] = useState({ metrics: {}, counts: {} });
   const [showAddProduct, setShowAddProduct] = useState(false);
   const [newProduct, setNewProduct] = useState({
     name: '',
@@ -39,22 +40,31 @@ const SellerDashboard = () => {
     axios.get(`${apiUrl}products/`, {
       headers: { Authorization: `Bearer ${token}` },
     })
-      .then((res) => setProducts(res.data))
+      .then((res) => setProducts(res.data.results ?? res.data))
       .catch((err) => { console.error('Products error:', err, err?.response); });
     // Fetch enquiries
     axios.get(`${apiUrl}enquiries/`, {
       headers: { Authorization: `Bearer ${token}` },
     })
-      .then((res) => setEnquiries(res.data))
+      .then((res) => setEnquiries(res.data.results ?? res.data))
       .catch((err) => { console.error('Enquiries error:', err, err?.response); });
     // Fetch orders
     axios.get(`${apiUrl}orders/`, {
       headers: { Authorization: `Bearer ${token}` },
     })
-      .then((res) => setOrders(res.data))
+      .then((res) => setOrders(res.data.results ?? res.data))
       .catch((err) => { console.error('Orders error:', err, err?.response); });
+    // Stat cards: all-time totals, not the length of one page of the lists above
+    axios.get(`${apiUrl}dashboard/`, {
+      headers: { Authorization: `Bearer ${token}` },
+    })
+      .then((res) => setStats(res.data))
+      .catch((err) => { console.error('Dashboard error:', err, err?.response); });
   }, []);
 
+  const metric = (name) => stats.metrics[name]?.count ?? 0;
+  const revenue = Number(stats.metrics['transactions']?.amount ?? 0);
+
   // Add product
   const handleAddProduct = async () => {
     const token = localStorage.getItem('access_token');
@@ -76,7 +86,7 @@ const SellerDashboard = () => {
       const res = await axios.get(`${apiUrl}products/`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setProducts(res.data);
+      setProducts(res.data.results ?? res.data);
       setNewProduct({
         name: '',
         category: '',
@@ -105,7 +115,7 @@ const SellerDashboard = () => {
       const res = await axios.get(`${apiUrl}products/`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setProducts(res.data);
+      setProducts(res.data.results ?? res.data);
       setEditProductModal({ open: false, product: null });
       setEditProductFields({});
     } catch (err) {
@@ -125,7 +135,7 @@ const SellerDashboard = () => {
       const res = await axios.get(`${apiUrl}products/`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setProducts(res.data);
+      setProducts(res.data.results ?? res.data);
     } catch (err) {
       console.error('Delete product error:', err, err?.response);
     }
@@ -144,7 +154,7 @@ const SellerDashboard = () => {
       const res = await axios.get(`${apiUrl}enquiries/`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setEnquiries(res.data);
+      setEnquiries(res.data.results ?? res.data);
       setRespondModal({ open: false, enquiry: null });
       setRespondFields({ status: '', message: '' });
     } catch (err) {
@@ -188,20 +198,18 @@ const SellerDashboard = () => {
               <Package className="h-4 w-4 text-muted-foreground" />
             </CardHeader>
             <CardContent>
-              <div className="text-2xl font-bold">{products.length}</div>
+              <div className="text-2xl font-bold">{metric('products')}</div>
               <p className="text-xs text-muted-foreground">Active listings</p>
             </CardContent>
           </Card>
           <Card>
             <CardHeader className="flex flex-row items-center justify-between space-y-0 pb-2">
-              <CardTitle className="text-sm font-medium">Total Views</CardTitle>
-              <Eye className="h-4 w-4 text-muted-foreground" />
+              <CardTitle className="text-sm font-medium">Orders</CardTitle>
+              <ShoppingCart className="h-4 w-4 text-muted-foreground" />
             </CardHeader>
             <CardContent>
-              <div className="text-2xl font-bold">
-                {products.reduce((sum, p) => sum + p.views, 0)}
-              </div>
-              <p className="text-xs text-muted-foreground">This month</p>
+              <div className="text-2xl font-bold">{metric('orders')}</div>
+              <p className="text-xs text-muted-foreground">{metric('orders_delivered')} delivered</p>
             </CardContent>
           </Card>
           <Card>
@@ -210,7 +218,7 @@ const SellerDashboard = () => {
               <MessageSquare className="h-4 w-4 text-muted-foreground" />
             </CardHeader>
             <CardContent>
-              <div className="text-2xl font-bold">{enquiries.length}</div>
+              <div className="text-2xl font-bold">{metric('enquiries_pending')}</div>
               <p className="text-xs text-muted-foreground">Pending responses</p>
             </CardContent>
           </Card>
@@ -220,8 +228,8 @@ const SellerDashboard = () => {
               <TrendingUp className="h-4 w-4 text-muted-foreground" />
             </CardHeader>
             <CardContent>
-              <div className="text-2xl font-bold">₹2.5L</div>
-              <p className="text-xs text-muted-foreground">This month</p>
+              <div className="text-2xl font-bold">₹{revenue.toLocaleString('en-IN')}</div>
+              <p className="text-xs text-muted-foreground">All time</p>
             </CardContent>
           </Card>
         </div>
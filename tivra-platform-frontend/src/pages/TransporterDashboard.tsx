@@ -9,15 +9,30 @@ import axios from 'axios';
 const TransporterDashboard = () => {
   const [deliveries, setDeliveries] = useState([]);
   const [availableJobs, setAvailableJobs] = useState([]);
+  const [stats, setStats] = useState({ metrics: {}, counts: {} });
+
+  // Stat cards: all-time totals, not the length of one page of deliveries
+  const fetchStats = () => {
+    const token = localStorage.getItem('access_token');
+    const apiUrl = import.meta.env.VITE_API_URL;
+    axios.get(`${apiUrl}dashboard/`, {
+      headers: { Authorization: `Bearer ${token}` },
+    })
+      .then((res) => setStats(res.data))
+      .catch((err) => { console.error('Dashboard error:', err, err?.response); });
+  };
+
+  const metric = (name) => stats.metrics[name]?.count ?? 0;
 
   useEffect(() => {
     const token = localStorage.getItem('access_token');
     const apiUrl = import.meta.env.VITE_API_URL;
+    fetchStats();
     // Fetch assigned deliveries (orders)
     axios.get(`${apiUrl}orders/`, {
       headers: { Authorization: `Bearer ${token}` },
     })
-      .then((res) => setDeliveries(res.data))
+      .then((res) => setDeliveries(res.data.results ?? res.data))
       .catch((err) => { console.error('Orders error:', err, err?.response); });
     // Optionally, fetch available jobs if needed from a different endpoint
   }, []);
@@ -33,7 +48,8 @@ const TransporterDashboard = () => {
       const res = await axios.get(`${apiUrl}orders/`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      setDeliveries(res.data);
+      setDeliveries(res.data.results ?? res.data);
+      fetchStats();
     } catch (err) {
       console.error('Update delivery status error:', err, err?.response);
     }
@@ -125,7 +141,7 @@ const TransporterDashboard = () => {
             </CardHeader>
             <CardContent>
               <div className="text-2xl font-bold">
-                {deliveries.filter(d => d.status !== 'delivered').length}
+                {metric('orders') - metric('orders_delivered')}
               </div>
               <p className="text-xs text-muted-foreground">In progress</p>
             </CardContent>
@@ -137,9 +153,9 @@ const TransporterDashboard = () => {
             </CardHeader>
             <CardContent>
               <div className="text-2xl font-bold">
-                {deliveries.filter(d => d.status === 'delivered').length}
+                {metric('orders_delivered')}
               </div>
-              <p className="text-xs text-muted-foreground">This month</p>
+              <p className="text-xs text-muted-foreground">All time</p>
             </CardContent>
           </Card>
           <Card>
@@ -148,7 +164,7 @@ const TransporterDashboard = () => {
               <Package className="h-4 w-4 text-muted-foreground" />
             </CardHeader>
             <CardContent>
-              <div className="text-2xl font-bold">{availableJobs.length}</div>
+              <div className="text-2xl font-bold">{stats.counts.available_jobs ?? 0}</div>
               <p className="text-xs text-muted-foreground">Ready to accept</p>
             </CardContent>
           </Card>
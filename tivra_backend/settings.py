@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -89,14 +90,47 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
+        'rest_framework.filters.OrderingFilter',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.CreatedAtCursorPagination',
+    'PAGE_SIZE': 50,
+}
+
+# Product catalog response cache: core.cache.LocalLRUCache (per process, version
+# in the database) or core.cache.DjangoCacheBackend (shared Django cache)
+CATALOG_CACHE = {
+    'BACKEND': config('CATALOG_CACHE_BACKEND', default='core.cache.LocalLRUCache'),
+    'OPTIONS': {
+        'ttl': config('CATALOG_CACHE_TTL', default=300, cast=int),
+    },
+}
+
+# Audit log writer (core.audit): entries are batched by a background thread;
+# AUDIT_LOG_ASYNC=False writes each entry on the request thread instead
+AUDIT_LOG = {
+    'ASYNC': config('AUDIT_LOG_ASYNC', default=True, cast=bool),
+    'BATCH_SIZE': config('AUDIT_LOG_BATCH_SIZE', default=500, cast=int),
+    'MAX_QUEUE': config('AUDIT_LOG_MAX_QUEUE', default=10000, cast=int),
+    'FLUSH_INTERVAL': config('AUDIT_LOG_FLUSH_INTERVAL', default=1.0, cast=float),
+    # Full months kept by `manage.py prune_audit_logs` besides the current one
+    'RETENTION_MONTHS': config('AUDIT_LOG_RETENTION_MONTHS', default=12, cast=int),
+}
+
+# Realtime events (/api/events/): core.realtime.InProcessBroker fans out within
+# one process; core.realtime.RedisBroker (needs redis) shares them across workers
+REALTIME = {
+    'BACKEND': config('REALTIME_BACKEND', default='core.realtime.InProcessBroker'),
+    'OPTIONS': {'url': config('REALTIME_REDIS_URL')} if config('REALTIME_REDIS_URL', default='') else {},
+    # Seconds between keep-alive comments on an idle stream
+    'HEARTBEAT': config('REALTIME_HEARTBEAT', default=15, cast=int),
+    'RETRY_MS': 3000,
 }
 
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', cast=Csv())
@@ -150,8 +184,14 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
+    'TOKEN_REFRESH_SERIALIZER': 'core.authentication.ClaimsTokenRefreshSerializer',
 }
 
+# Cache where token versions are published. Access-token claims are only
+# trusted when it is shared (Redis, Memcached, database); with a per-process
+# cache every request loads the user from the database
+TOKEN_VERSION_CACHE = config('TOKEN_VERSION_CACHE', default='default')
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -19,9 +19,10 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from core.views import (
     UserViewSet, ProfileViewSet, ProductViewSet, EnquiryViewSet, MessageViewSet,
-    OrderViewSet, TransactionViewSet, AuditLogViewSet, RouteViewSet
+    OrderViewSet, TransactionViewSet, AuditLogViewSet, RouteViewSet, InboxViewSet
 )
 from core import views as core_views
+from core import async_views
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework import permissions as drf_permissions
 from drf_yasg.views import get_schema_view
@@ -37,6 +38,7 @@ router.register(r'orders', OrderViewSet)
 router.register(r'transactions', TransactionViewSet)
 router.register(r'audit-logs', AuditLogViewSet)
 router.register(r'routes', RouteViewSet)
+router.register(r'inbox', InboxViewSet, basename='inbox')
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -54,6 +56,13 @@ urlpatterns = [
     path('api/auth/register/', core_views.register, name='register'),
     path('api/auth/login/', core_views.login, name='login'),
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/dashboard/', core_views.dashboard, name='dashboard'),
+    path('api/search/', core_views.search_view, name='search'),
+    path('api/async/products/', async_views.product_list, name='async-product-list'),
+    path('api/async/products/<int:pk>/', async_views.product_detail, name='async-product-detail'),
+    path('api/async/orders/available_jobs/', async_views.available_jobs, name='async-available-jobs'),
+    path('api/async/messages/', async_views.message_list, name='async-message-list'),
+    path('api/events/', async_views.event_stream, name='event-stream'),
 ]
 
 urlpatterns += [